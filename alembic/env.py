@@ -7,14 +7,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Импорт настроек и метаданных
 from app.core.config import settings
-from app.db.base import Base
+from app.db.session import _database_url
 
 # SQLAlchemy
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import create_engine, pool
 from alembic import context
 
-# Загружаем модели, чтобы Alembic увидел все таблицы
-import app.models  # noqa: F401
+# Метаданные моделей (та же база, что и у create_all в app.main)
+from app.models.models import Base
 
 # Alembic Config
 config = context.config
@@ -43,11 +43,8 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    # URL из настроек, как у приложения, а не из alembic.ini
+    connectable = create_engine(_database_url(), poolclass=pool.NullPool)
 
     with connectable.connect() as connection:
         context.configure(connection=connection, target_metadata=target_metadata)
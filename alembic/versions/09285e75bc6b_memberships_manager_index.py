@@ -0,0 +1,28 @@
+"""index on memberships.manager_membership_id
+
+Revision ID: 09285e75bc6b
+Revises: 5f2b9c1d7e40
+Create Date: 2026-10-18 19:10:00.000000
+
+Рекурсивный обход подчинённых идёт от руководителя к его прямым подчинённым:
+без индекса каждый шаг рекурсии — полный просмотр memberships.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '09285e75bc6b'
+down_revision: Union[str, None] = '5f2b9c1d7e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "ix_memberships_manager"
+
+
+def upgrade() -> None:
+    op.create_index(INDEX, "memberships", ["manager_membership_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX, table_name="memberships", if_exists=True)
@@ -0,0 +1,72 @@
+"""required/approved step counters on quest_assignments
+
+Revision ID: 2fb7fb14fbe9
+Revises: 653bf6f5e6a1
+Create Date: 2026-10-18 18:20:00.000000
+
+Назначения, сделанные до материализации ответов, получают недостающие
+PENDING-ответы по шагам квеста; затем счётчики заполняются по ответам так же,
+как scripts/recount_quest_progress.py. Статус назначений не меняется.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2fb7fb14fbe9'
+down_revision: Union[str, None] = '653bf6f5e6a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = ("required_steps_count", "approved_steps_count")
+INDEX = "ix_quest_assignments_quest_progress"
+
+
+def _has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def upgrade() -> None:
+    if not _has_column("quest_assignments", COUNTERS[0]):
+        for column in COUNTERS:
+            op.add_column(
+                "quest_assignments",
+                sa.Column(column, sa.Integer(), server_default="0", nullable=False),
+            )
+        op.execute(
+            """
+            INSERT INTO quest_step_submissions (id, quest_assignment_id, quest_step_id, status, created_at)
+            SELECT gen_random_uuid(), a.id, qs.id, 'PENDING', now()
+            FROM quest_assignments a
+            JOIN quest_steps qs ON qs.quest_id = a.quest_id
+            ON CONFLICT ON CONSTRAINT uq_submission_unique DO NOTHING
+            """
+        )
+        op.execute(
+            """
+            UPDATE quest_assignments a
+            SET required_steps_count = c.required,
+                approved_steps_count = c.approved,
+                progress_percent = CASE WHEN c.required > 0
+                    THEN round(CAST(c.approved * 100 AS numeric) / c.required, 2) ELSE 0 END
+            FROM (
+                SELECT s.quest_assignment_id AS id,
+                       count(*) AS required,
+                       count(*) FILTER (WHERE s.status = 'APPROVED') AS approved
+                FROM quest_step_submissions s
+                JOIN quest_steps qs ON qs.id = s.quest_step_id
+                WHERE qs.required
+                GROUP BY s.quest_assignment_id
+            ) c
+            WHERE a.id = c.id
+            """
+        )
+    op.create_index(INDEX, "quest_assignments", ["quest_id", "status", "progress_percent"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX, table_name="quest_assignments", if_exists=True)
+    for column in COUNTERS:
+        if _has_column("quest_assignments", column):
+            op.drop_column("quest_assignments", column)
@@ -0,0 +1,65 @@
+"""search_vector columns, GIN indexes for full-text search and a trigram index on users.email
+
+Revision ID: 325167fae687
+Revises: a5d5f9fc34d9
+Create Date: 2026-10-18 18:40:00.000000
+
+Колонки search_vector — хранимые генерируемые (как tsvector_of в моделях),
+поэтому Postgres сам заполняет их для существующих строк при добавлении.
+Поиск людей по email использует pg_trgm; расширение при откате не удаляется —
+им могут пользоваться и другие объекты базы.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '325167fae687'
+down_revision: Union[str, None] = 'a5d5f9fc34d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (таблица, индекс, поле заголовка, поле текста)
+DOCUMENTS = (
+    ("quests", "ix_quests_search", "title", "description"),
+    ("quest_steps", "ix_quest_steps_search", "title", None),
+    ("probation_tasks", "ix_probation_tasks_search", "title", "description"),
+)
+EMAIL_INDEX = "ix_users_email_trgm"
+
+
+def _has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def _tsvector(title: str, body: str | None) -> str:
+    expr = f"setweight(to_tsvector('simple', coalesce({title}, '')), 'A')"
+    if body:
+        expr += f" || setweight(to_tsvector('simple', coalesce({body}, '')), 'B')"
+    return expr
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, index, title, body in DOCUMENTS:
+        if not _has_column(table, "search_vector"):
+            op.add_column(
+                table,
+                sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(_tsvector(title, body), persisted=True),
+                          nullable=False),
+            )
+        op.create_index(index, table, ["search_vector"], postgresql_using="gin", if_not_exists=True)
+    op.create_index(
+        EMAIL_INDEX, "users", ["email"],
+        postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}, if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(EMAIL_INDEX, table_name="users", if_exists=True)
+    for table, index, _, _ in reversed(DOCUMENTS):
+        op.drop_index(index, table_name=table, if_exists=True)
+        if _has_column(table, "search_vector"):
+            op.drop_column(table, "search_vector")
@@ -0,0 +1,49 @@
+"""outbox_events: transactional outbox of domain events
+
+Revision ID: 39c3ec043676
+Revises: ffd3597146c6
+Create Date: 2026-10-18 20:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '39c3ec043676'
+down_revision: Union[str, None] = 'ffd3597146c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "outbox_events"
+
+
+def upgrade() -> None:
+    op.create_table(
+        TABLE,
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("event_type", sa.String(64), nullable=False),
+        sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("company_id", postgresql.UUID(as_uuid=True)),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("published_at", sa.DateTime(timezone=True)),
+        if_not_exists=True,
+    )
+    # Очередь релея: только неотправленные события
+    op.create_index(
+        "ix_outbox_events_pending", TABLE, ["available_at", "created_at"],
+        postgresql_where=sa.text("published_at IS NULL"), if_not_exists=True,
+    )
+    op.create_index(
+        "ix_outbox_events_published", TABLE, ["published_at"],
+        postgresql_where=sa.text("published_at IS NOT NULL"), if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE, if_exists=True)
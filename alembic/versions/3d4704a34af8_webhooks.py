@@ -0,0 +1,67 @@
+"""webhook_subscriptions and the per-endpoint webhook_deliveries queue
+
+Revision ID: 3d4704a34af8
+Revises: 39c3ec043676
+Create Date: 2026-10-18 20:10:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3d4704a34af8'
+down_revision: Union[str, None] = '39c3ec043676'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "webhook_subscriptions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("company_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("companies.id", ondelete="cascade"), nullable=False),
+        sa.Column("url", sa.String(2048), nullable=False),
+        sa.Column("secret", sa.String(128), nullable=False),
+        sa.Column("event_types", postgresql.ARRAY(sa.String(64)), server_default="{}", nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_by_member", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("memberships.id", ondelete="set null")),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_webhook_subscriptions_company", "webhook_subscriptions", ["company_id"], if_not_exists=True)
+
+    op.create_table(
+        "webhook_deliveries",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("subscription_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("webhook_subscriptions.id", ondelete="cascade"), nullable=False),
+        sa.Column("event_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("event_type", sa.String(64), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_status", sa.Integer()),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("delivered_at", sa.DateTime(timezone=True)),
+        # Цель ON CONFLICT в enqueue_deliveries: релей доставляет событие минимум один раз
+        sa.UniqueConstraint("subscription_id", "event_id", name="uq_webhook_deliveries_subscription_event"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_webhook_deliveries_pending", "webhook_deliveries", ["subscription_id", "available_at", "created_at"],
+        postgresql_where=sa.text("delivered_at IS NULL"), if_not_exists=True,
+    )
+    op.create_index(
+        "ix_webhook_deliveries_delivered", "webhook_deliveries", ["delivered_at"],
+        postgresql_where=sa.text("delivered_at IS NOT NULL"), if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("webhook_deliveries", if_exists=True)
+    op.drop_table("webhook_subscriptions", if_exists=True)
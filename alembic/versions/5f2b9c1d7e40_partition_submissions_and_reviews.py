@@ -0,0 +1,170 @@
+"""partition quest_step_submissions (hash) and probation_reviews (monthly range)
+
+Revision ID: 5f2b9c1d7e40
+Revises: 325167fae687
+Create Date: 2026-10-18 19:00:00.000000
+
+Ревизия переводит обычные таблицы базовой схемы в секционированные с
+переносом строк; уже секционированные таблицы она не трогает.
+quest_step_submissions.created_at добавляет c5c299a2d49d.
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2b9c1d7e40'
+down_revision: Union[str, None] = '325167fae687'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# DDL секций скопирован из app.db.partitions на момент ревизии: последующие
+# правки приложения не должны менять то, что делает историческая миграция
+SUBMISSIONS = "quest_step_submissions"
+REVIEWS = "probation_reviews"
+SUBMISSION_HASH_PARTITIONS = 16
+
+SUBMISSION_COLUMNS = (
+    "id", "quest_assignment_id", "quest_step_id", "status", "submitted_at",
+    "reviewed_by_member", "reviewed_at", "data_json", "created_at",
+)
+REVIEW_COLUMNS = ("id", "task_id", "reviewer_member", "score", "decision", "comments", "created_at")
+
+
+def _submission_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("quest_assignment_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("quest_assignments.id", ondelete="cascade"), nullable=False),
+        sa.Column("quest_step_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("quest_steps.id", ondelete="cascade"), nullable=False),
+        sa.Column("status", postgresql.ENUM(name="stepsubmissionstatus", create_type=False), nullable=False),
+        sa.Column("submitted_at", sa.DateTime(timezone=True)),
+        sa.Column("reviewed_by_member", postgresql.UUID(as_uuid=True), sa.ForeignKey("memberships.id")),
+        sa.Column("reviewed_at", sa.DateTime(timezone=True)),
+        sa.Column("data_json", postgresql.JSONB()),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+
+
+def _review_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("task_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("probation_tasks.id", ondelete="cascade"), nullable=False),
+        sa.Column("reviewer_member", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("memberships.id", ondelete="set null"), nullable=False),
+        sa.Column("score", sa.Numeric(3, 1)),
+        sa.Column("decision", postgresql.ENUM(name="reviewdecision", create_type=False), nullable=False),
+        sa.Column("comments", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+
+
+def _add_months(day: date, months: int) -> date:
+    year, month = divmod(day.month - 1 + months, 12)
+    return date(day.year + year, month + 1, 1)
+
+
+def _create_hash_partitions(table: str, modulus: int) -> None:
+    for remainder in range(modulus):
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_h{remainder:02d} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+        )
+
+
+def _create_month_partitions(table: str, first: date, last: date) -> None:
+    # Границы — начала месяцев по UTC
+    month = _add_months(first, 0)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_p{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month} 00:00+00') TO ('{_add_months(month, 1)} 00:00+00')"
+        )
+        month = _add_months(month, 1)
+
+
+def _relkind(table: str) -> str | None:
+    """'r' — обычная таблица, 'p' — секционированная, None — таблицы нет."""
+    return op.get_bind().scalar(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table})
+
+
+def _set_aside(table: str, indexes: Sequence[str] = ()) -> str:
+    # Имена ограничений и индексов освобождаем для новой таблицы, иначе
+    # Postgres выдаст ей имена с суффиксом (..._fkey1)
+    old = f"{table}_old"
+    op.rename_table(table, old)
+    constraints = op.get_bind().scalars(
+        sa.text("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t)"), {"t": old}
+    ).all()
+    for name in constraints:
+        op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {name} TO {name}_old")
+    for name in indexes:
+        op.drop_index(name, table_name=old)
+    return old
+
+
+def _copy(source: str, target: str, columns: Sequence[str], select_list: Sequence[str] | None = None) -> None:
+    op.execute(
+        f"INSERT INTO {target} ({', '.join(columns)}) "
+        f"SELECT {', '.join(select_list or columns)} FROM {source}"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if _relkind(SUBMISSIONS) == "r":
+        old = _set_aside(SUBMISSIONS)
+        op.create_table(
+            SUBMISSIONS,
+            *_submission_columns(),
+            sa.PrimaryKeyConstraint("id", "quest_assignment_id"),
+            sa.UniqueConstraint("quest_assignment_id", "quest_step_id", name="uq_submission_unique"),
+            postgresql_partition_by="HASH (quest_assignment_id)",
+        )
+        _create_hash_partitions(SUBMISSIONS, SUBMISSION_HASH_PARTITIONS)
+        _copy(old, SUBMISSIONS, SUBMISSION_COLUMNS)
+        op.drop_table(old)
+
+    if _relkind(REVIEWS) == "r":
+        old = _set_aside(REVIEWS, indexes=["ix_probation_reviews_task"])
+        op.create_table(
+            REVIEWS,
+            *_review_columns(),
+            sa.PrimaryKeyConstraint("id", "created_at"),
+            postgresql_partition_by="RANGE (created_at)",
+        )
+        op.create_index("ix_probation_reviews_task", REVIEWS, ["task_id"])
+        today = date.today()
+        first = bind.scalar(sa.text(f"SELECT min(created_at AT TIME ZONE 'UTC')::date FROM {old}")) or today
+        _create_month_partitions(REVIEWS, first, _add_months(today, 3))
+        # created_at стал ключом: пустые значения (если были) получают момент миграции
+        select_list = [c if c != "created_at" else "coalesce(created_at, now())" for c in REVIEW_COLUMNS]
+        _copy(old, REVIEWS, REVIEW_COLUMNS, select_list)
+        op.drop_table(old)
+
+
+def downgrade() -> None:
+    # Отсоединённые ранее секции (архив) не трогаем: их строки назад не вернутся
+    if _relkind(SUBMISSIONS) == "p":
+        old = _set_aside(SUBMISSIONS)
+        op.create_table(
+            SUBMISSIONS,
+            *_submission_columns(),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("quest_assignment_id", "quest_step_id", name="uq_submission_unique"),
+        )
+        _copy(old, SUBMISSIONS, SUBMISSION_COLUMNS)
+        op.drop_table(old)
+
+    if _relkind(REVIEWS) == "p":
+        old = _set_aside(REVIEWS, indexes=["ix_probation_reviews_task"])
+        op.create_table(REVIEWS, *_review_columns(), sa.PrimaryKeyConstraint("id"))
+        op.create_index("ix_probation_reviews_task", REVIEWS, ["task_id"])
+        _copy(old, REVIEWS, REVIEW_COLUMNS)
+        op.drop_table(old)
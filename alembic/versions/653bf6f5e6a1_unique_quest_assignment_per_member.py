@@ -0,0 +1,50 @@
+"""one assignment of a quest per member (uq_quest_assignments_quest_member)
+
+Revision ID: 653bf6f5e6a1
+Revises: c5c299a2d49d
+Create Date: 2026-10-18 18:10:00.000000
+
+До ограничения один квест можно было назначить участнику несколько раз.
+Из дублей остаётся одно назначение — с наибольшим прогрессом, при равенстве
+самое раннее; остальные удаляются вместе со своими ответами (каскад).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '653bf6f5e6a1'
+down_revision: Union[str, None] = 'c5c299a2d49d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = "uq_quest_assignments_quest_member"
+
+
+def _has_constraint(name: str) -> bool:
+    return bool(op.get_bind().scalar(sa.text("SELECT count(*) FROM pg_constraint WHERE conname = :n"), {"n": name}))
+
+
+def upgrade() -> None:
+    if _has_constraint(CONSTRAINT):
+        return
+    op.execute(
+        """
+        DELETE FROM quest_assignments a
+        USING (
+            SELECT id, row_number() OVER (
+                PARTITION BY quest_id, membership_id
+                ORDER BY progress_percent DESC, assigned_at, id
+            ) AS rank
+            FROM quest_assignments
+        ) d
+        WHERE a.id = d.id AND d.rank > 1
+        """
+    )
+    op.create_unique_constraint(CONSTRAINT, "quest_assignments", ["quest_id", "membership_id"])
+
+
+def downgrade() -> None:
+    if _has_constraint(CONSTRAINT):
+        op.drop_constraint(CONSTRAINT, "quest_assignments", type_="unique")
@@ -0,0 +1,35 @@
+"""partial due_at indexes over open quest assignments and probation tasks
+
+Revision ID: 90e0e8766b33
+Revises: b873e3eb0524
+Create Date: 2026-10-18 19:30:00.000000
+
+Свипер просроченных читает только открытые строки с истёкшим due_at;
+частичные индексы не растут вместе с архивом закрытых.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '90e0e8766b33'
+down_revision: Union[str, None] = 'b873e3eb0524'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (индекс, таблица, условие)
+INDEXES = (
+    ("ix_quest_assignments_open_due", "quest_assignments", "status IN ('ASSIGNED', 'IN_PROGRESS', 'OVERDUE')"),
+    ("ix_probation_tasks_open_due", "probation_tasks", "status IN ('TODO', 'IN_PROGRESS')"),
+)
+
+
+def upgrade() -> None:
+    for name, table, where in INDEXES:
+        op.create_index(name, table, ["due_at"], postgresql_where=sa.text(where), if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
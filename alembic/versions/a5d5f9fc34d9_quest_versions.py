@@ -0,0 +1,59 @@
+"""quest_versions, quests.current_version_id and quest_assignments.quest_version_id
+
+Revision ID: a5d5f9fc34d9
+Revises: 2fb7fb14fbe9
+Create Date: 2026-10-18 18:30:00.000000
+
+Существующие назначения остаются без версии и следуют за живым квестом, пока
+scripts/snapshot_published_quests.py не запишет версии опубликованных квестов
+и не закрепит за ними назначения.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d5f9fc34d9'
+down_revision: Union[str, None] = '2fb7fb14fbe9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def upgrade() -> None:
+    op.create_table(
+        "quest_versions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("quest_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("quests.id", ondelete="cascade"), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("snapshot", postgresql.JSONB(), nullable=False),
+        sa.Column("step_ids", postgresql.ARRAY(postgresql.UUID(as_uuid=True)), nullable=False),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("quest_id", "version", name="uq_quest_versions_quest_version"),
+        if_not_exists=True,
+    )
+    if not _has_column("quests", "current_version_id"):
+        op.add_column("quests", sa.Column("current_version_id", postgresql.UUID(as_uuid=True)))
+        op.create_foreign_key(
+            "fk_quests_current_version", "quests", "quest_versions",
+            ["current_version_id"], ["id"], ondelete="set null",
+        )
+    if not _has_column("quest_assignments", "quest_version_id"):
+        op.add_column(
+            "quest_assignments",
+            sa.Column("quest_version_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("quest_versions.id")),
+        )
+
+
+def downgrade() -> None:
+    if _has_column("quest_assignments", "quest_version_id"):
+        op.drop_column("quest_assignments", "quest_version_id")
+    if _has_column("quests", "current_version_id"):
+        op.drop_column("quests", "current_version_id")
+    op.drop_table("quest_versions", if_exists=True)
@@ -0,0 +1,224 @@
+"""baseline schema: the eleven original tables
+
+Revision ID: b1e4c2d8a7f3
+Revises:
+Create Date: 2026-10-18 17:50:00.000000
+
+Схема, которую до Alembic создавал create_all исходных моделей. На базе, где
+эти таблицы уже есть, ревизия ничего не делает — дальнейшие ревизии приводят
+её к текущим моделям; на пустой базе создаёт их с нуля.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1e4c2d8a7f3'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Метки — имена членов enum, как их записывает SQLAlchemy
+ENUMS = {
+    "globalrole": ("SUPER_ADMIN", "NONE"),
+    "companystatus": ("PENDING", "ACTIVE", "SUSPENDED", "ARCHIVED"),
+    "plantier": ("FREE", "PRO", "ENTERPRISE"),
+    "signupmode": ("SELF", "INVITE", "DOMAIN"),
+    "membershiprole": ("OWNER", "ADMIN", "HR", "MANAGER", "EMPLOYEE", "APPLICANT"),
+    "membershipstatus": ("INVITED", "APPLICANT", "ACTIVE", "SUSPENDED", "TERMINATED"),
+    "probationstatus": ("ONGOING", "EXTENDED", "PASSED", "FAILED"),
+    "queststatus": ("DRAFT", "PUBLISHED", "ARCHIVED"),
+    "queststepapprovalrole": ("NONE", "MANAGER", "HR"),
+    "questassignmentstatus": ("ASSIGNED", "IN_PROGRESS", "COMPLETED", "OVERDUE", "EXPIRED"),
+    "stepsubmissionstatus": ("PENDING", "SUBMITTED", "APPROVED", "REJECTED", "SKIPPED"),
+    "probationtaskstatus": ("TODO", "IN_PROGRESS", "DONE", "FAILED", "CANCELLED"),
+    "reviewdecision": ("PASS_", "EXTEND", "FAIL"),
+}
+TABLES = (
+    "users", "companies", "company_domains", "memberships", "membership_managers", "quests",
+    "quest_steps", "quest_assignments", "quest_step_submissions", "probation_tasks", "probation_reviews",
+)
+
+
+def _enum(name: str) -> postgresql.ENUM:
+    return postgresql.ENUM(*ENUMS[name], name=name)
+
+
+def _uuid(name: str, *args, **kwargs) -> sa.Column:
+    return sa.Column(name, postgresql.UUID(as_uuid=True), *args, **kwargs)
+
+
+def _timestamp(name: str, nullable: bool = False) -> sa.Column:
+    return sa.Column(name, sa.DateTime(timezone=True), nullable=nullable)
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("users"):
+        return
+
+    op.create_table(
+        "users",
+        _uuid("id", primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("password_hash", sa.String(255)),
+        _timestamp("email_verified_at", nullable=True),
+        sa.Column("locale", sa.String(10)),
+        sa.Column("global_role", _enum("globalrole"), nullable=False),
+        _timestamp("created_at"),
+        _timestamp("updated_at"),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    # default_quest_id ссылается на quests — внешний ключ добавляется после них
+    op.create_table(
+        "companies",
+        _uuid("id", primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("slug", sa.String(255), unique=True),
+        sa.Column("timezone", sa.String(64)),
+        sa.Column("plan_tier", _enum("plantier"), nullable=False),
+        sa.Column("signup_mode", _enum("signupmode"), nullable=False),
+        sa.Column("status", _enum("companystatus"), nullable=False),
+        sa.Column("default_quest_duration_days", sa.Integer()),
+        sa.Column("blocked_until_onboarding_complete", sa.Boolean(), nullable=False),
+        _uuid("default_quest_id"),
+        _uuid("created_by_user_id", sa.ForeignKey("users.id")),
+        _timestamp("created_at"),
+    )
+    op.create_index("ix_companies_name", "companies", ["name"])
+
+    op.create_table(
+        "company_domains",
+        _uuid("id", primary_key=True),
+        _uuid("company_id", sa.ForeignKey("companies.id", ondelete="cascade"), nullable=False),
+        sa.Column("domain", sa.String(255), unique=True, nullable=False),
+        sa.Column("is_verified", sa.Boolean(), nullable=False),
+        sa.Column("verification_token", sa.String(255)),
+        _timestamp("created_at"),
+    )
+    op.create_index("ix_company_domains_domain", "company_domains", ["domain"])
+
+    op.create_table(
+        "memberships",
+        _uuid("id", primary_key=True),
+        _uuid("user_id", sa.ForeignKey("users.id", ondelete="cascade"), nullable=False),
+        _uuid("company_id", sa.ForeignKey("companies.id", ondelete="cascade"), nullable=False),
+        sa.Column("role", _enum("membershiprole"), nullable=False),
+        sa.Column("status", _enum("membershipstatus"), nullable=False),
+        _uuid("manager_membership_id", sa.ForeignKey("memberships.id", ondelete="set null")),
+        sa.Column("employment_type", sa.String(32)),
+        sa.Column("probation_start_at", sa.Date()),
+        sa.Column("probation_end_at", sa.Date()),
+        sa.Column("probation_status", _enum("probationstatus"), nullable=False),
+        _timestamp("onboarding_completed_at", nullable=True),
+        _timestamp("created_at"),
+        _timestamp("updated_at"),
+        sa.UniqueConstraint("user_id", "company_id", name="uq_memberships_user_company"),
+    )
+    op.create_index("ix_memberships_company_role", "memberships", ["company_id", "role"])
+
+    op.create_table(
+        "membership_managers",
+        _uuid("member_id", sa.ForeignKey("memberships.id", ondelete="cascade"), primary_key=True),
+        _uuid("manager_member_id", sa.ForeignKey("memberships.id", ondelete="cascade"), primary_key=True),
+        sa.Column("relation", sa.String(32), nullable=False),
+    )
+    op.create_index("ix_membership_managers_manager", "membership_managers", ["manager_member_id"])
+
+    op.create_table(
+        "quests",
+        _uuid("id", primary_key=True),
+        _uuid("company_id", sa.ForeignKey("companies.id", ondelete="cascade"), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("duration_days", sa.Integer()),
+        sa.Column("is_mandatory", sa.Boolean(), nullable=False),
+        sa.Column("status", _enum("queststatus"), nullable=False),
+        _uuid("created_by_member", sa.ForeignKey("memberships.id")),
+        _timestamp("created_at"),
+        _timestamp("updated_at"),
+    )
+    op.create_index("ix_quests_company_status", "quests", ["company_id", "status"])
+    op.create_foreign_key(
+        "companies_default_quest_id_fkey", "companies", "quests",
+        ["default_quest_id"], ["id"], ondelete="set null",
+    )
+
+    op.create_table(
+        "quest_steps",
+        _uuid("id", primary_key=True),
+        _uuid("quest_id", sa.ForeignKey("quests.id", ondelete="cascade"), nullable=False),
+        sa.Column("sort_order", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("step_type", sa.String(32), nullable=False),
+        sa.Column("required", sa.Boolean(), nullable=False),
+        sa.Column("content_json", postgresql.JSONB()),
+        sa.Column("approval_required_role", _enum("queststepapprovalrole"), nullable=False),
+        _timestamp("created_at"),
+        sa.UniqueConstraint("quest_id", "sort_order", name="uq_quest_steps_order"),
+    )
+
+    op.create_table(
+        "quest_assignments",
+        _uuid("id", primary_key=True),
+        _uuid("quest_id", sa.ForeignKey("quests.id", ondelete="cascade"), nullable=False),
+        _uuid("membership_id", sa.ForeignKey("memberships.id", ondelete="cascade"), nullable=False),
+        _uuid("assigned_by_member", sa.ForeignKey("memberships.id")),
+        sa.Column("override_duration_days", sa.Integer()),
+        _timestamp("assigned_at"),
+        _timestamp("due_at", nullable=True),
+        _timestamp("completed_at", nullable=True),
+        sa.Column("status", _enum("questassignmentstatus"), nullable=False),
+        sa.Column("progress_percent", sa.Numeric(5, 2), nullable=False),
+    )
+    op.create_index("ix_quest_assignments_company", "quest_assignments", ["membership_id", "status"])
+
+    op.create_table(
+        "quest_step_submissions",
+        _uuid("id", primary_key=True),
+        _uuid("quest_assignment_id", sa.ForeignKey("quest_assignments.id", ondelete="cascade"), nullable=False),
+        _uuid("quest_step_id", sa.ForeignKey("quest_steps.id", ondelete="cascade"), nullable=False),
+        sa.Column("status", _enum("stepsubmissionstatus"), nullable=False),
+        _timestamp("submitted_at", nullable=True),
+        _uuid("reviewed_by_member", sa.ForeignKey("memberships.id")),
+        _timestamp("reviewed_at", nullable=True),
+        sa.Column("data_json", postgresql.JSONB()),
+        sa.UniqueConstraint("quest_assignment_id", "quest_step_id", name="uq_submission_unique"),
+    )
+
+    op.create_table(
+        "probation_tasks",
+        _uuid("id", primary_key=True),
+        _uuid("company_id", sa.ForeignKey("companies.id", ondelete="cascade"), nullable=False),
+        _uuid("created_by_member", sa.ForeignKey("memberships.id", ondelete="cascade"), nullable=False),
+        _uuid("assigned_to_member", sa.ForeignKey("memberships.id", ondelete="cascade"), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text()),
+        _timestamp("due_at", nullable=True),
+        sa.Column("status", _enum("probationtaskstatus"), nullable=False),
+        _timestamp("completed_at", nullable=True),
+        sa.Column("result_text", sa.Text()),
+    )
+    op.create_index("ix_probation_tasks_company_status", "probation_tasks", ["company_id", "status"])
+
+    op.create_table(
+        "probation_reviews",
+        _uuid("id", primary_key=True),
+        _uuid("task_id", sa.ForeignKey("probation_tasks.id", ondelete="cascade"), nullable=False),
+        _uuid("reviewer_member", sa.ForeignKey("memberships.id", ondelete="set null"), nullable=False),
+        sa.Column("score", sa.Numeric(3, 1)),
+        sa.Column("decision", _enum("reviewdecision"), nullable=False),
+        sa.Column("comments", sa.Text()),
+        _timestamp("created_at"),
+    )
+    op.create_index("ix_probation_reviews_task", "probation_reviews", ["task_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("companies_default_quest_id_fkey", "companies", type_="foreignkey")
+    for table in reversed(TABLES):
+        op.drop_table(table)
+    for name in ENUMS:
+        op.execute(f"DROP TYPE IF EXISTS {name}")
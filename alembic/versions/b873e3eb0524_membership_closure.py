@@ -0,0 +1,44 @@
+"""membership_closure: closure table of the line hierarchy
+
+Revision ID: b873e3eb0524
+Revises: 09285e75bc6b
+Create Date: 2026-10-18 19:20:00.000000
+
+Таблица заполняется здесь же по manager_membership_id — тем же пересчётом,
+что и scripts/rebuild_org_closure.py; дальше её ведут слушатели Membership.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.services.membership_service import rebuild_membership_closure
+
+# revision identifiers, used by Alembic.
+revision: str = 'b873e3eb0524'
+down_revision: Union[str, None] = '09285e75bc6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "membership_closure"
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table(TABLE):
+        return
+    op.create_table(
+        TABLE,
+        sa.Column("ancestor_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("memberships.id", ondelete="cascade"), primary_key=True),
+        sa.Column("descendant_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("memberships.id", ondelete="cascade"), primary_key=True),
+        sa.Column("relation", sa.String(32), primary_key=True),
+        sa.Column("depth", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_membership_closure_descendant", TABLE, ["descendant_id", "relation", "depth"])
+    rebuild_membership_closure(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE, if_exists=True)
@@ -0,0 +1,37 @@
+"""token_revocations: revoked access tokens and stale embedded claims
+
+Revision ID: c2e502b95d9b
+Revises: 90e0e8766b33
+Create Date: 2026-10-18 19:40:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e502b95d9b'
+down_revision: Union[str, None] = '90e0e8766b33'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "token_revocations"
+
+
+def upgrade() -> None:
+    op.create_table(
+        TABLE,
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("jti", sa.String(64)),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True)),
+        sa.Column("revoked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_token_revocations_revoked", TABLE, ["revoked_at"], if_not_exists=True)
+    op.create_index("ix_token_revocations_expires", TABLE, ["expires_at"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE, if_exists=True)
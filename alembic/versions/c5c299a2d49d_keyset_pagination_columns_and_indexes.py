@@ -0,0 +1,59 @@
+"""created_at/updated_at for keyset pagination and (created_at, id) indexes
+
+Revision ID: c5c299a2d49d
+Revises: b1e4c2d8a7f3
+Create Date: 2026-10-18 18:00:00.000000
+
+Первая ревизия после базовой схемы b1e4c2d8a7f3. Колонки добавляются с
+заполнением существующих строк моментом миграции: ключ курсора
+(created_at, id) не бывает пустым. Ревизия идемпотентна — на базе, где
+колонки и индексы уже есть, ничего не меняет.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5c299a2d49d'
+down_revision: Union[str, None] = 'b1e4c2d8a7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (таблица, колонка, чем заполнить существующие строки)
+TIMESTAMPS = (
+    ("probation_tasks", "created_at", "now()"),
+    ("probation_tasks", "updated_at", "created_at"),
+    ("quest_step_submissions", "created_at", "coalesce(submitted_at, now())"),
+)
+INDEXES = (
+    ("ix_users_created", "users", ["created_at", "id"]),
+    ("ix_companies_created", "companies", ["created_at", "id"]),
+    ("ix_memberships_company_created", "memberships", ["company_id", "created_at", "id"]),
+    ("ix_quests_company_created", "quests", ["company_id", "created_at", "id"]),
+    ("ix_probation_tasks_company_created", "probation_tasks", ["company_id", "created_at", "id"]),
+)
+
+
+def _has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def upgrade() -> None:
+    for table, column, backfill in TIMESTAMPS:
+        if _has_column(table, column):
+            continue
+        op.add_column(table, sa.Column(column, sa.DateTime(timezone=True)))
+        op.execute(f"UPDATE {table} SET {column} = {backfill}")
+        op.alter_column(table, column, nullable=False)
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    for table, column, _ in reversed(TIMESTAMPS):
+        if _has_column(table, column):
+            op.drop_column(table, column)
@@ -0,0 +1,38 @@
+"""refresh_tokens: hashed refresh tokens grouped into rotation families
+
+Revision ID: ffd3597146c6
+Revises: c2e502b95d9b
+Create Date: 2026-10-18 19:50:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'ffd3597146c6'
+down_revision: Union[str, None] = 'c2e502b95d9b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "refresh_tokens"
+
+
+def upgrade() -> None:
+    op.create_table(
+        TABLE,
+        sa.Column("token_hash", sa.String(64), primary_key=True),
+        sa.Column("family_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("users.id", ondelete="cascade"), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("used_at", sa.DateTime(timezone=True)),
+        if_not_exists=True,
+    )
+    op.create_index("ix_refresh_tokens_family", TABLE, ["family_id"], if_not_exists=True)
+    op.create_index("ix_refresh_tokens_expires", TABLE, ["expires_at"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE, if_exists=True)
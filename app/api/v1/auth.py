@@ -1,17 +1,19 @@
 from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.auth import RegisterRequest, LoginRequest, Token
+from app.schemas.auth import RegisterRequest, LoginRequest, RefreshRequest, Token
 from app.schemas.user import UserRead
 from app.services.auth_service import AuthService
 from app.services.base import UnitOfWork
 from app.utils.dependencies import get_db, get_current_user
+from app.utils.security import verify_token
+from app.utils.tokens import TokenClaims
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
 
 # Dependency to provide UnitOfWork using the current DB session
-def get_uow(db: Session = Depends(get_db)) -> UnitOfWork:
+def get_uow(db: AsyncSession = Depends(get_db)) -> UnitOfWork:
     return UnitOfWork(lambda: db)
 
 # Dependency to provide AuthService
@@ -19,24 +21,40 @@ def get_auth_service(uow: UnitOfWork = Depends(get_uow)) -> AuthService:
     return AuthService(uow)
 
 @router.post("/register", response_model=UserRead)
-def register(
+async def register(
     data: RegisterRequest,
     service: AuthService = Depends(get_auth_service)
 ) -> UserRead:
-    user = service.register(data)
+    user = await service.register(data)
     return user
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     data: LoginRequest,
     service: AuthService = Depends(get_auth_service)
 ) -> Token:
-    user = service.authenticate(data)
-    token = service.login(user)
+    user = await service.authenticate(data)
+    token = await service.login(user)
     return token
 
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    data: RefreshRequest,
+    service: AuthService = Depends(get_auth_service)
+) -> Token:
+    # Ротация refresh-токена: новая пара без проверки пароля (и без bcrypt)
+    return await service.refresh(data.refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    data: RefreshRequest | None = None,
+    claims: TokenClaims = Depends(verify_token),
+    service: AuthService = Depends(get_auth_service)
+) -> None:
+    await service.logout(claims, data.refresh_token if data else None)
+
 @router.get("/me", response_model=UserRead)
-def me(
+async def me(
     current_user=Depends(get_current_user)
 ) -> UserRead:
     # current_user is the authenticated User instance
@@ -1,45 +1,58 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from app.schemas.company import CompanyCreate, CompanyRead, CompanyUpdate
+from app.schemas.company import CompanyCreate, CompanyRead, CompanyUpdate, OnboardingSummary
+from app.schemas.pagination import Page
+from app.schemas.webhook import WebhookSubscriptionCreate, WebhookSubscriptionCreated, WebhookSubscriptionRead
 from app.services.company_service import CompanyService
+from app.services.webhook_service import WebhookService
 from app.services.base import UnitOfWork
-from app.utils.dependencies import get_db, get_current_user
+from app.models.enums import GlobalRole, MembershipRole
+from app.utils.dependencies import MembershipClaim, TokenClaims, get_db, get_current_user, get_token_claims
+from app.utils.pagination import PageParams, page_params, wants_ndjson, ndjson_response
 
 router = APIRouter(prefix="/api/v1/companies", tags=["companies"])
 
 # Dependency: UnitOfWork
-def get_uow(db: Session = Depends(get_db)) -> UnitOfWork:
+def get_uow(db: AsyncSession = Depends(get_db)) -> UnitOfWork:
     return UnitOfWork(lambda: db)
 
 # Dependency: CompanyService
 def get_company_service(uow: UnitOfWork = Depends(get_uow)) -> CompanyService:
     return CompanyService(uow)
 
+# Dependency: WebhookService
+def get_webhook_service(uow: UnitOfWork = Depends(get_uow)) -> WebhookService:
+    return WebhookService(uow)
+
 @router.post("/self-signup", response_model=CompanyRead, status_code=status.HTTP_201_CREATED)
-def self_signup(
+async def self_signup(
     data: CompanyCreate,
     current_user=Depends(get_current_user),
     service: CompanyService = Depends(get_company_service)
 ) -> CompanyRead:
-    company = service.create_self_signup(data, current_user.id)
+    company = await service.create_self_signup(data, current_user.id)
     return CompanyRead.model_validate(company)
 
-@router.get("/", response_model=list[CompanyRead])
-def list_companies(
+@router.get("/", response_model=Page[CompanyRead])
+async def list_companies(
+    request: Request,
+    page: PageParams = Depends(page_params),
     service: CompanyService = Depends(get_company_service)
-) -> list[CompanyRead]:
-    companies = service.list()
-    return [CompanyRead.model_validate(c) for c in companies]
+) -> Page[CompanyRead]:
+    if wants_ndjson(request):
+        return ndjson_response(service.stream(), CompanyRead)
+    companies, next_cursor = await service.page(page.cursor, page.limit)
+    return Page(items=[CompanyRead.model_validate(c) for c in companies], next_cursor=next_cursor)
 
 @router.get("/{company_id}", response_model=CompanyRead)
-def get_company(
+async def get_company(
     company_id: UUID,
     service: CompanyService = Depends(get_company_service)
 ) -> CompanyRead:
-    company = service.get_by_id(company_id)
+    company = await service.get_by_id(company_id)
     if not company:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,32 +61,93 @@ def get_company(
     return CompanyRead.model_validate(company)
 
 @router.patch("/{company_id}", response_model=CompanyRead)
-def update_company(
+async def update_company(
     company_id: UUID,
     data: CompanyUpdate,
     service: CompanyService = Depends(get_company_service)
 ) -> CompanyRead:
-    company = service.get_by_id(company_id)
+    company = await service.get_by_id(company_id)
     if not company:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Company not found"
         )
-    updated = service.update(company, data)
+    updated = await service.update(company, data)
     return CompanyRead.model_validate(updated)
 
 @router.delete("/{company_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_company(
+async def delete_company(
     company_id: UUID,
     service: CompanyService = Depends(get_company_service)
 ) -> None:
-    company = service.get_by_id(company_id)
+    company = await service.get_by_id(company_id)
     if not company:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Company not found"
         )
-    with service.uow as uow:
-        uow.session.delete(company)
-        uow.commit()
+    async with service.uow as uow:
+        await uow.session.delete(company)
+        await uow.commit()
     return
+
+# Роли, которым виден дашборд онбординга своей компании
+SUMMARY_ROLES = {MembershipRole.OWNER, MembershipRole.ADMIN, MembershipRole.HR, MembershipRole.MANAGER}
+
+@router.get("/{company_id}/onboarding-summary", response_model=OnboardingSummary)
+async def get_onboarding_summary(
+    company_id: UUID,
+    claims: TokenClaims = Depends(get_token_claims),
+    service: CompanyService = Depends(get_company_service)
+) -> OnboardingSummary:
+    membership = claims.membership_for(company_id)
+    allowed = membership is not None and membership.role in SUMMARY_ROLES
+    if not allowed and claims.global_role != GlobalRole.SUPER_ADMIN:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Недостаточно прав доступа")
+    return await service.onboarding_summary(company_id)
+
+# Роли, которые управляют вебхуками своей компании
+WEBHOOK_ROLES = {MembershipRole.OWNER, MembershipRole.ADMIN}
+
+def _webhook_admin(company_id: UUID, claims: TokenClaims) -> MembershipClaim | None:
+    membership = claims.membership_for(company_id)
+    if membership is not None and membership.role in WEBHOOK_ROLES:
+        return membership
+    if claims.global_role != GlobalRole.SUPER_ADMIN:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Недостаточно прав доступа")
+    return None
+
+@router.post(
+    "/{company_id}/webhooks",
+    response_model=WebhookSubscriptionCreated,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_webhook(
+    company_id: UUID,
+    data: WebhookSubscriptionCreate,
+    claims: TokenClaims = Depends(get_token_claims),
+    service: WebhookService = Depends(get_webhook_service)
+) -> WebhookSubscriptionCreated:
+    membership = _webhook_admin(company_id, claims)
+    subscription = await service.create(company_id, data, membership.id if membership else None)
+    # Секрет подписи показываем только здесь
+    return WebhookSubscriptionCreated.model_validate(subscription)
+
+@router.get("/{company_id}/webhooks", response_model=list[WebhookSubscriptionRead])
+async def list_webhooks(
+    company_id: UUID,
+    claims: TokenClaims = Depends(get_token_claims),
+    service: WebhookService = Depends(get_webhook_service)
+) -> list[WebhookSubscriptionRead]:
+    _webhook_admin(company_id, claims)
+    return [WebhookSubscriptionRead.model_validate(s) for s in await service.for_company(company_id)]
+
+@router.delete("/{company_id}/webhooks/{subscription_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_webhook(
+    company_id: UUID,
+    subscription_id: UUID,
+    claims: TokenClaims = Depends(get_token_claims),
+    service: WebhookService = Depends(get_webhook_service)
+) -> None:
+    _webhook_admin(company_id, claims)
+    await service.delete(company_id, subscription_id)
@@ -1,80 +1,106 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import io
+import tempfile
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from app.schemas.employee import EmployeeCreate, EmployeeRead
+from app.core.config import settings
+from app.schemas.employee import EmployeeCreate, EmployeeImportResult, EmployeeRead
+from app.schemas.pagination import Page
 from app.services.membership_service import MembershipService
 from app.services.base import UnitOfWork
+from app.services.import_service import CSV, NDJSON, EmployeeImportService, read_rows
 from app.models.enums import MembershipRole, MembershipStatus
 from app.models.models import Membership
-from app.utils.dependencies import get_db, get_current_user
+from app.utils.dependencies import (
+    MembershipClaim, get_db, get_active_membership, get_active_membership_claim, require_membership_roles,
+)
+from app.utils.pagination import NDJSON_MEDIA_TYPE, PageParams, page_params, wants_ndjson, ndjson_response
 
 router = APIRouter(prefix="/api/v1/employees", tags=["employees"])
 
 # Dependency: UnitOfWork
-def get_uow(db: Session = Depends(get_db)) -> UnitOfWork:
+def get_uow(db: AsyncSession = Depends(get_db)) -> UnitOfWork:
     return UnitOfWork(lambda: db)
 
 # Dependency: MembershipService
 def get_membership_service(uow: UnitOfWork = Depends(get_uow)) -> MembershipService:
     return MembershipService(uow)
 
+# Dependency: EmployeeImportService
+def get_import_service(uow: UnitOfWork = Depends(get_uow)) -> EmployeeImportService:
+    return EmployeeImportService(uow)
+
 @router.post("/", response_model=EmployeeRead, status_code=status.HTTP_201_CREATED)
-def create_new_employee(
+async def create_new_employee(
     data: EmployeeCreate,
-    current_user=Depends(get_current_user),
+    inviter: Membership | None = Depends(get_active_membership),
     service: MembershipService = Depends(get_membership_service)
 ) -> EmployeeRead:
-    # Find inviter membership for current user
-    with service.uow as uow:
-        inviter = uow.session.query(Membership).filter(
-            Membership.user_id == current_user.id,
-            Membership.status == MembershipStatus.ACTIVE
-        ).first()
-        if not inviter:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Current user cannot invite employees"
-            )
+    # Inviter is the current user's active membership
+    if not inviter:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Current user cannot invite employees"
+        )
     # Invite and activate new employee
-    member = service.invite_user(
+    member = await service.invite_user(
         email=data.email,
         role=MembershipRole.EMPLOYEE,
         inviter=inviter
     )
-    activated = service.activate_applicant(member)
+    activated = await service.activate_applicant(member)
     return EmployeeRead.model_validate(activated)
 
-@router.get("/", response_model=list[EmployeeRead])
-def list_employees(
-    current_user=Depends(get_current_user),
+@router.post("/import", response_model=EmployeeImportResult)
+async def import_employees(
+    request: Request,
+    importer: Membership = Depends(require_membership_roles(MembershipRole.HR, MembershipRole.ADMIN)),
+    service: EmployeeImportService = Depends(get_import_service)
+) -> EmployeeImportResult:
+    # Тело — CSV с заголовком (text/csv) или NDJSON (application/x-ndjson).
+    # Копим его во временный файл (в памяти — до IMPORT_SPOOL_MAX_MEMORY)
+    # и разбираем построчно: память не зависит от размера файла
+    fmt = NDJSON if NDJSON_MEDIA_TYPE in request.headers.get("content-type", "") else CSV
+    with tempfile.SpooledTemporaryFile(max_size=settings.IMPORT_SPOOL_MAX_MEMORY) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        stream = io.TextIOWrapper(spool, encoding="utf-8-sig", errors="replace", newline="")
+        return await service.import_rows(importer.company_id, read_rows(stream, fmt), importer.role)
+
+@router.get("/", response_model=Page[EmployeeRead])
+async def list_employees(
+    request: Request,
+    page: PageParams = Depends(page_params),
+    inviter: MembershipClaim | None = Depends(get_active_membership_claim),
     service: MembershipService = Depends(get_membership_service)
-) -> list[EmployeeRead]:
+) -> Page[EmployeeRead]:
     # Get current user's company
-    with service.uow as uow:
-        inviter = uow.session.query(Membership).filter(
-            Membership.user_id == current_user.id,
-            Membership.status == MembershipStatus.ACTIVE
-        ).first()
-        if not inviter:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Current user has no active membership"
-            )
-        employees = uow.session.query(Membership).filter(
-            Membership.company_id == inviter.company_id,
-            Membership.role == MembershipRole.EMPLOYEE,
-            Membership.status == MembershipStatus.ACTIVE
-        ).all()
-    return [EmployeeRead.model_validate(e) for e in employees]
+    if not inviter:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Current user has no active membership"
+        )
+    stmt = select(Membership).where(
+        Membership.company_id == inviter.company_id,
+        Membership.role == MembershipRole.EMPLOYEE,
+        Membership.status == MembershipStatus.ACTIVE
+    )
+    if wants_ndjson(request):
+        return ndjson_response(service._repo.stream(stmt), EmployeeRead)
+    employees, next_cursor = await service._repo.page(stmt, cursor=page.cursor, limit=page.limit)
+    return Page(items=[EmployeeRead.model_validate(e) for e in employees], next_cursor=next_cursor)
 
 @router.get("/{employee_id}", response_model=EmployeeRead)
-def get_employee(
+async def get_employee(
     employee_id: UUID,
     service: MembershipService = Depends(get_membership_service)
 ) -> EmployeeRead:
-    member = service._repo.get(employee_id)
+    member = await service._repo.get(employee_id)
     if not member or member.role != MembershipRole.EMPLOYEE:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
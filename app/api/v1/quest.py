@@ -1,23 +1,29 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
 from app.schemas.quest import (
-    QuestCreate, QuestRead, QuestUpdate,
+    QuestCreate, QuestDetail, QuestRead, QuestSnapshot, QuestUpdate,
+    QuestStepCreate, QuestStepRead,
     QuestAssignmentCreate, QuestAssignmentRead,
+    QuestBulkAssignCreate, QuestBulkAssignResult,
     QuestStepSubmissionUpdate, QuestStepSubmissionRead
 )
-from app.services.quest_service import QuestService
-from app.services.base import UnitOfWork
-from app.models.models import Membership, MembershipRole, MembershipStatus
-from app.utils.dependencies import get_db, get_current_user
+from app.services.quest_service import QuestService, fan_out_step
+from app.services.base import UnitOfWork, GenericRepository
+from app.schemas.pagination import Page
+from app.models.models import Membership, QuestAssignment, QuestStepSubmission
+from app.utils.dependencies import get_db, get_active_membership
+from app.utils.etag import etag_response, model_etag_response
+from app.utils.pagination import PageParams, page_params, wants_ndjson, ndjson_response
 
 router = APIRouter(prefix="/api/v1/quests", tags=["quests"])
 
 # Dependency: UnitOfWork
 
-def get_uow(db: Session = Depends(get_db)) -> UnitOfWork:
+def get_uow(db: AsyncSession = Depends(get_db)) -> UnitOfWork:
     return UnitOfWork(lambda: db)
 
 # Dependency: QuestService
@@ -25,115 +31,189 @@ def get_quest_service(uow: UnitOfWork = Depends(get_uow)) -> QuestService:
     return QuestService(uow)
 
 @router.post("/", response_model=QuestRead, status_code=status.HTTP_201_CREATED)
-def create_quest(
+async def create_quest(
     data: QuestCreate,
-    current_user=Depends(get_current_user),
-    uow: UnitOfWork = Depends(get_uow),
+    membership: Membership | None = Depends(get_active_membership),
     service: QuestService = Depends(get_quest_service)
 ) -> QuestRead:
     # Ensure user has active membership
-    with uow as u:
-        membership = (
-            u.session.query(Membership)
-            .filter(
-                Membership.user_id == current_user.id,
-                Membership.status == MembershipStatus.ACTIVE
-            )
-            .first()
-        )
-        if not membership:
-            raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
-    quest = service.create(data, membership)
+    if not membership:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
+    quest = await service.create(data, membership)
     return QuestRead.model_validate(quest)
 
-@router.get("/company/{company_id}", response_model=list[QuestRead])
-def list_company_quests(
+@router.get("/company/{company_id}", response_model=Page[QuestRead])
+async def list_company_quests(
     company_id: UUID,
+    request: Request,
+    page: PageParams = Depends(page_params),
     service: QuestService = Depends(get_quest_service)
-) -> list[QuestRead]:
-    quests = service.list(company_id=company_id)
-    return [QuestRead.model_validate(q) for q in quests]
+) -> Page[QuestRead]:
+    if wants_ndjson(request):
+        return ndjson_response(service.stream(company_id=company_id), QuestRead)
+    quests, next_cursor = await service.page(cursor=page.cursor, limit=page.limit, company_id=company_id)
+    page_out = Page(items=[QuestRead.model_validate(q) for q in quests], next_cursor=next_cursor)
+    # ETag по байтам страницы: запрос в БД остаётся, но неизменная страница не пересылается
+    return model_etag_response(request, page_out)
 
-@router.get("/{quest_id}", response_model=QuestRead)
-def get_quest(
+@router.get("/{quest_id}", response_model=QuestDetail)
+async def get_quest(
     quest_id: UUID,
+    request: Request,
     service: QuestService = Depends(get_quest_service)
-) -> QuestRead:
-    quest = service.get(quest_id)
-    if not quest:
+) -> Response:
+    # Опубликованные квесты — из кэша документов; If-None-Match → 304
+    document = await service.document(quest_id)
+    if document is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Quest not found")
-    return QuestRead.model_validate(quest)
+    return etag_response(request, document.body, document.etag)
+
+@router.get("/versions/{version_id}", response_model=QuestSnapshot)
+async def get_quest_version(
+    version_id: UUID,
+    request: Request,
+    service: QuestService = Depends(get_quest_service)
+) -> Response:
+    # Версия неизменяема: отдаём сохранённый JSON как есть
+    document = await service.version_document(version_id)
+    if document is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Quest version not found")
+    return etag_response(request, document.body, document.etag)
+
+@router.get("/assignments/{assignment_id}/quest", response_model=QuestSnapshot)
+async def get_assignment_quest(
+    assignment_id: UUID,
+    request: Request,
+    service: QuestService = Depends(get_quest_service)
+) -> Response:
+    # Квест в той версии, которая была назначена сотруднику
+    document = await service.assignment_document(assignment_id)
+    if document is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Assignment not found")
+    return etag_response(request, document.body, document.etag)
 
 @router.patch("/{quest_id}", response_model=QuestRead)
-def update_quest(
+async def update_quest(
     quest_id: UUID,
     data: QuestUpdate,
     service: QuestService = Depends(get_quest_service)
 ) -> QuestRead:
-    quest = service.get(quest_id)
+    quest = await service.get(quest_id)
     if not quest:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Quest not found")
-    updated = service.update(quest, data)
+    updated = await service.update(quest, data)
     return QuestRead.model_validate(updated)
 
+@router.post("/{quest_id}/steps", response_model=QuestStepRead, status_code=status.HTTP_201_CREATED)
+async def add_quest_step(
+    quest_id: UUID,
+    data: QuestStepCreate,
+    background_tasks: BackgroundTasks,
+    membership: Membership | None = Depends(get_active_membership),
+    service: QuestService = Depends(get_quest_service)
+) -> QuestStepRead:
+    if not membership:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
+    quest = await service.get(quest_id)
+    if not quest or quest.company_id != membership.company_id:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Quest not found")
+    step = await service.add_step(quest, data)
+    # Existing assignees get the new step after the response is sent
+    background_tasks.add_task(fan_out_step, step.id)
+    return QuestStepRead.model_validate(step)
+
 @router.post("/{quest_id}/publish", response_model=QuestRead)
-def publish_quest(
+async def publish_quest(
     quest_id: UUID,
     service: QuestService = Depends(get_quest_service)
 ) -> QuestRead:
-    quest = service.get(quest_id)
+    quest = await service.get(quest_id)
     if not quest:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Quest not found")
-    published = service.publish(quest)
+    published = await service.publish(quest)
     return QuestRead.model_validate(published)
 
 @router.post("/{quest_id}/assign", response_model=QuestAssignmentRead)
-def assign_quest(
+async def assign_quest(
     quest_id: UUID,
     data: QuestAssignmentCreate,
-    current_user=Depends(get_current_user),
-    uow: UnitOfWork = Depends(get_uow),
+    membership: Membership | None = Depends(get_active_membership),
     service: QuestService = Depends(get_quest_service)
 ) -> QuestAssignmentRead:
     # Ensure assigner has membership
-    with uow as u:
-        membership = (
-            u.session.query(Membership)
-            .filter(
-                Membership.user_id == current_user.id,
-                Membership.status == MembershipStatus.ACTIVE
-            )
-            .first()
-        )
-        if not membership:
-            raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
-    assignment = service.assign_quest(data, assigned_by=membership)
+    if not membership:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
+    if data.quest_id != quest_id:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "quest_id in the body does not match the path")
+    quest = await service.get(quest_id)
+    if not quest or quest.company_id != membership.company_id:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Quest not found")
+    assignment = await service.assign_quest(data, assigned_by=membership)
     return QuestAssignmentRead.model_validate(assignment)
 
-@router.patch("/assignments/{submission_id}", response_model=QuestStepSubmissionRead)
-def submit_quest_step(
+@router.post("/{quest_id}/assign/bulk", response_model=QuestBulkAssignResult)
+async def assign_quest_bulk(
+    quest_id: UUID,
+    data: QuestBulkAssignCreate,
+    membership: Membership | None = Depends(get_active_membership),
+    service: QuestService = Depends(get_quest_service)
+) -> QuestBulkAssignResult:
+    if not membership:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
+    quest = await service.get(quest_id)
+    if not quest or quest.company_id != membership.company_id:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Quest not found")
+    return await service.assign_bulk(quest, data, assigned_by=membership)
+
+@router.patch("/assignments/{assignment_id}/steps/{submission_id}", response_model=QuestStepSubmissionRead)
+async def submit_quest_step(
+    assignment_id: UUID,
     submission_id: UUID,
     data: QuestStepSubmissionUpdate,
     service: QuestService = Depends(get_quest_service)
 ) -> QuestStepSubmissionRead:
-    # Fetch submission via underlying repository
-    submission = service.uow.session.get(QuestStepSubmission, submission_id)  # type: ignore
+    # Назначение — ключ hash-секции: читается одна секция
+    return await _submit_step(
+        service, data,
+        QuestStepSubmission.quest_assignment_id == assignment_id,
+        QuestStepSubmission.id == submission_id,
+    )
+
+@router.patch("/assignments/{submission_id}", response_model=QuestStepSubmissionRead, deprecated=True)
+async def submit_quest_step_by_id(
+    submission_id: UUID,
+    data: QuestStepSubmissionUpdate,
+    service: QuestService = Depends(get_quest_service)
+) -> QuestStepSubmissionRead:
+    """Deprecated: use ``/assignments/{assignment_id}/steps/{submission_id}``."""
+    # Без ключа секции (назначения) проверяются все hash-секции
+    return await _submit_step(service, data, QuestStepSubmission.id == submission_id)
+
+async def _submit_step(service: QuestService, data: QuestStepSubmissionUpdate, *criteria) -> QuestStepSubmissionRead:
+    submission = await service.uow.session.scalar(select(QuestStepSubmission).where(*criteria))
     if not submission:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Submission not found")
-    updated = service.complete_step(submission, data)
+    updated = await service.complete_step(submission, data)
     return QuestStepSubmissionRead.model_validate(updated)
 
-@router.get("/{quest_id}/progress", response_model=list[QuestStepSubmissionRead])
-def get_quest_progress(
+@router.get("/{quest_id}/progress", response_model=Page[QuestStepSubmissionRead])
+async def get_quest_progress(
     quest_id: UUID,
+    request: Request,
+    page: PageParams = Depends(page_params),
     uow: UnitOfWork = Depends(get_uow)
-) -> list[QuestStepSubmissionRead]:
+) -> Page[QuestStepSubmissionRead]:
     # List all submissions for this quest assignment
-    with uow as u:
-        submissions = (
-            u.session.query(QuestStepSubmission)
-            .join(QuestAssignment)
-            .filter(QuestAssignment.quest_id == quest_id)
-            .all()
-        )
-    return [QuestStepSubmissionRead.model_validate(s) for s in submissions]
+    repo = GenericRepository[QuestStepSubmission](uow, QuestStepSubmission)
+    stmt = (
+        select(QuestStepSubmission)
+        .join(QuestAssignment)
+        .where(QuestAssignment.quest_id == quest_id)
+    )
+    if wants_ndjson(request):
+        return ndjson_response(repo.stream(stmt), QuestStepSubmissionRead)
+    submissions, next_cursor = await repo.page(stmt, cursor=page.cursor, limit=page.limit)
+    return Page(
+        items=[QuestStepSubmissionRead.model_validate(s) for s in submissions],
+        next_cursor=next_cursor,
+    )
@@ -0,0 +1,37 @@
+from __future__ import annotations
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.enums import SearchKind
+from app.schemas.pagination import Page
+from app.schemas.search import SearchHit
+from app.services.base import UnitOfWork
+from app.services.search_service import SearchService
+from app.utils.dependencies import MembershipClaim, get_active_membership_claim, get_db
+from app.utils.pagination import PageParams, page_params
+
+router = APIRouter(prefix="/api/v1/search", tags=["search"])
+
+# Dependency: UnitOfWork
+def get_uow(db: AsyncSession = Depends(get_db)) -> UnitOfWork:
+    return UnitOfWork(lambda: db)
+
+# Dependency: SearchService
+def get_search_service(uow: UnitOfWork = Depends(get_uow)) -> SearchService:
+    return SearchService(uow)
+
+@router.get("/", response_model=Page[SearchHit])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Слова ищутся по префиксу, email — по подстроке"),
+    kind: list[SearchKind] | None = Query(None, description="Ограничить выдачу типами результатов"),
+    page: PageParams = Depends(page_params),
+    membership: MembershipClaim | None = Depends(get_active_membership_claim),
+    service: SearchService = Depends(get_search_service),
+) -> Page[SearchHit]:
+    # Поиск всегда в пределах компании активного членства
+    if not membership:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
+    hits, next_cursor = await service.search(
+        membership.company_id, q, kinds=kind, cursor=page.cursor, limit=page.limit
+    )
+    return Page(items=hits, next_cursor=next_cursor)
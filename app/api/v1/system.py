@@ -0,0 +1,15 @@
+from __future__ import annotations
+from fastapi import APIRouter, Depends
+
+from app.schemas.system import PoolStats
+from app.utils.dependencies import require_super_admin
+from app.utils.metrics import pool_stats
+
+router = APIRouter(prefix="/api/v1/system", tags=["system"])
+
+@router.get("/pool", response_model=list[PoolStats])
+async def get_pool_stats(
+    current_user=Depends(require_super_admin)
+) -> list[PoolStats]:
+    # Статистика на процесс: для сайзинга суммировать по воркерам и репликам
+    return [PoolStats(**stats) for stats in pool_stats()]
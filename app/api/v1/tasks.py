@@ -1,20 +1,28 @@
 from __future__ import annotations
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from app.schemas.task import TaskCreate, TaskRead, TaskUpdate
+from app.schemas.task import (
+    TaskCreate, TaskRead, TaskUpdate,
+    ProbationEvaluationRequest, ProbationEvaluationReport,
+)
+from app.schemas.pagination import Page
 from app.services.probation_service import ProbationService
 from app.services.base import UnitOfWork
 from app.models.models import Membership, ProbationTask
-from app.models.enums import MembershipStatus, ProbationTaskStatus
-from app.utils.dependencies import get_db, get_current_user
+from app.models.enums import MembershipRole, ProbationTaskStatus
+from app.utils.dependencies import (
+    MembershipClaim, get_db, get_current_user, get_active_membership,
+    get_active_membership_claim, require_membership_roles,
+)
+from app.utils.pagination import PageParams, page_params, wants_ndjson, ndjson_response
 
 router = APIRouter(prefix="/api/v1/tasks", tags=["tasks"])
 
 # Dependency: UnitOfWork
-def get_uow(db: Session = Depends(get_db)) -> UnitOfWork:
+def get_uow(db: AsyncSession = Depends(get_db)) -> UnitOfWork:
     return UnitOfWork(lambda: db)
 
 # Dependency: ProbationService
@@ -22,24 +30,20 @@ def get_task_service(uow: UnitOfWork = Depends(get_uow)) -> ProbationService:
     return ProbationService(uow)
 
 @router.post("/", response_model=TaskRead, status_code=status.HTTP_201_CREATED)
-def create_task(
+async def create_task(
     data: TaskCreate,
-    current_user=Depends(get_current_user),
+    creator: Membership | None = Depends(get_active_membership),
     uow: UnitOfWork = Depends(get_uow),
     service: ProbationService = Depends(get_task_service)
 ) -> TaskRead:
     # Verify current user membership
-    with uow as u:
-        creator = u.session.query(Membership).filter(
-            Membership.user_id == current_user.id,
-            Membership.status == MembershipStatus.ACTIVE
-        ).first()
-        if not creator:
-            raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
-        assignee = u.session.get(Membership, data.assigned_to_member)
+    if not creator:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
+    async with uow as u:
+        assignee = await u.session.get(Membership, data.assigned_to_member)
         if not assignee:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "Assignee not found")
-    task = service.create_task(
+    task = await service.create_task(
         creator=creator,
         assignee=assignee,
         title=data.title,
@@ -48,42 +52,55 @@ def create_task(
     )
     return TaskRead.model_validate(task)
 
-@router.get("/", response_model=list[TaskRead])
-def list_tasks(
-    current_user=Depends(get_current_user),
-    uow: UnitOfWork = Depends(get_uow)
-) -> list[TaskRead]:
-    with uow as u:
-        membership = u.session.query(Membership).filter(
-            Membership.user_id == current_user.id,
-            Membership.status == MembershipStatus.ACTIVE
-        ).first()
-        if not membership:
-            raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
-        tasks = u.session.query(ProbationTask).filter(
-            ProbationTask.company_id == membership.company_id
-        ).all()
-    return [TaskRead.model_validate(t) for t in tasks]
+@router.get("/", response_model=Page[TaskRead])
+async def list_tasks(
+    request: Request,
+    page: PageParams = Depends(page_params),
+    membership: MembershipClaim | None = Depends(get_active_membership_claim),
+    service: ProbationService = Depends(get_task_service)
+) -> Page[TaskRead]:
+    if not membership:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "No active membership")
+    if wants_ndjson(request):
+        return ndjson_response(service.stream(company_id=membership.company_id), TaskRead)
+    tasks, next_cursor = await service.page(
+        cursor=page.cursor, limit=page.limit, company_id=membership.company_id
+    )
+    return Page(items=[TaskRead.model_validate(t) for t in tasks], next_cursor=next_cursor)
+
+@router.post("/evaluate", response_model=ProbationEvaluationReport)
+async def evaluate_probation(
+    data: ProbationEvaluationRequest,
+    membership: Membership = Depends(require_membership_roles(MembershipRole.HR, MembershipRole.ADMIN)),
+    service: ProbationService = Depends(get_task_service)
+) -> ProbationEvaluationReport:
+    # Пересчёт статуса испытательного срока по всей компании (или окну probation_end_at)
+    return await service.evaluate_company(
+        membership.company_id,
+        probation_end_from=data.probation_end_from,
+        probation_end_to=data.probation_end_to,
+        dry_run=data.dry_run,
+    )
 
 @router.get("/{task_id}", response_model=TaskRead)
-def get_task(
+async def get_task(
     task_id: UUID,
     service: ProbationService = Depends(get_task_service)
 ) -> TaskRead:
-    task = service._repo.get(task_id)
+    task = await service.get(task_id)
     if not task:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Task not found")
     return TaskRead.model_validate(task)
 
 @router.patch("/{task_id}", response_model=TaskRead)
-def update_task(
+async def update_task(
     task_id: UUID,
     data: TaskUpdate,
     current_user=Depends(get_current_user),
     uow: UnitOfWork = Depends(get_uow)
 ) -> TaskRead:
-    with uow as u:
-        task = u.session.get(ProbationTask, task_id)
+    async with uow as u:
+        task = await u.session.get(ProbationTask, task_id)
         if not task:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "Task not found")
         updates = data.model_dump(exclude_unset=True)
@@ -91,18 +108,18 @@ def update_task(
             setattr(task, field, value)
         if updates.get("status") == ProbationTaskStatus.DONE:
             task.completed_at = datetime.utcnow()
-        u.commit()
+        await u.commit()
     return TaskRead.model_validate(task)
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_task(
+async def delete_task(
     task_id: UUID,
     service: ProbationService = Depends(get_task_service)
 ) -> None:
-    task = service._repo.get(task_id)
+    task = await service.get(task_id)
     if not task:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Task not found")
-    with service.uow as u:
-        service.remove(task)
-        u.commit()
+    async with service.uow as u:
+        await service.remove(task)
+        await u.commit()
     return
\ No newline at end of file
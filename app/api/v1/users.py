@@ -1,19 +1,21 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
 from app.schemas.user import UserCreate, UserRead, UserUpdate
+from app.schemas.pagination import Page
 from app.services.auth_service import AuthService
 from app.services.base import UnitOfWork, GenericRepository
 from app.models.models import User
 from app.models.enums import GlobalRole
 from app.utils.dependencies import get_db, get_current_user
+from app.utils.pagination import PageParams, page_params, wants_ndjson, ndjson_response
 
 router = APIRouter(prefix="/api/v1/users", tags=["users"])
 
 # Dependency: UnitOfWork
-def get_uow(db: Session = Depends(get_db)) -> UnitOfWork:
+def get_uow(db: AsyncSession = Depends(get_db)) -> UnitOfWork:
     return UnitOfWork(lambda: db)
 
 # Dependency: AuthService
@@ -25,47 +27,50 @@ def get_user_repo(uow: UnitOfWork = Depends(get_uow)) -> GenericRepository[User]
     return GenericRepository(uow, User)
 
 @router.get("/me", response_model=UserRead)
-def read_current_user(
+async def read_current_user(
     current_user = Depends(get_current_user)
 ) -> UserRead:
     return UserRead.model_validate(current_user)
 
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(
+async def register_user(
     data: UserCreate,
     service: AuthService = Depends(get_auth_service)
 ) -> UserRead:
-    user = service.register(data)
+    user = await service.register(data)
     return UserRead.model_validate(user)
 
-@router.get("/", response_model=list[UserRead])
-def list_users(
+@router.get("/", response_model=Page[UserRead])
+async def list_users(
+    request: Request,
+    page: PageParams = Depends(page_params),
     current_user=Depends(get_current_user),
-    uow: UnitOfWork = Depends(get_uow)
-) -> list[UserRead]:
+    repo: GenericRepository[User] = Depends(get_user_repo)
+) -> Page[UserRead]:
     # Only super-admin can list all users
     if current_user.global_role != GlobalRole.SUPER_ADMIN:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Недостаточно прав доступа")
-    with uow as u:
-        users = u.session.query(User).all()
-    return [UserRead.model_validate(uobj) for uobj in users]
+    if wants_ndjson(request):
+        return ndjson_response(repo.stream(), UserRead)
+    users, next_cursor = await repo.page(cursor=page.cursor, limit=page.limit)
+    return Page(items=[UserRead.model_validate(uobj) for uobj in users], next_cursor=next_cursor)
 
 @router.get("/{user_id}", response_model=UserRead)
-def get_user(
+async def get_user(
     user_id: UUID,
     current_user=Depends(get_current_user),
     uow: UnitOfWork = Depends(get_uow)
 ) -> UserRead:
     if current_user.global_role != GlobalRole.SUPER_ADMIN:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Недостаточно прав доступа")
-    with uow as u:
-        user = u.session.get(User, user_id)
+    async with uow as u:
+        user = await u.session.get(User, user_id)
         if not user:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "Пользователь не найден")
     return UserRead.model_validate(user)
 
 @router.patch("/{user_id}", response_model=UserRead)
-def update_user(
+async def update_user(
     user_id: UUID,
     data: UserUpdate,
     current_user=Depends(get_current_user),
@@ -73,28 +78,28 @@ def update_user(
 ) -> UserRead:
     if current_user.global_role != GlobalRole.SUPER_ADMIN:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Недостаточно прав доступа")
-    with uow as u:
-        user = u.session.get(User, user_id)
+    async with uow as u:
+        user = await u.session.get(User, user_id)
         if not user:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "Пользователь не найден")
         updates = data.model_dump(exclude_unset=True)
         for field, value in updates.items():
             setattr(user, field, value)
-        u.commit()
+        await u.commit()
     return UserRead.model_validate(user)
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(
+async def delete_user(
     user_id: UUID,
     current_user=Depends(get_current_user),
     uow: UnitOfWork = Depends(get_uow)
 ) -> None:
     if current_user.global_role != GlobalRole.SUPER_ADMIN:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Недостаточно прав доступа")
-    with uow as u:
-        user = u.session.get(User, user_id)
+    async with uow as u:
+        user = await u.session.get(User, user_id)
         if not user:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "Пользователь не найден")
-        u.session.delete(user)
-        u.commit()
+        await u.session.delete(user)
+        await u.commit()
     return
\ No newline at end of file
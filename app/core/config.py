@@ -11,10 +11,111 @@ class Settings(BaseSettings):
     # URL подключения к базе данных PostgreSQL
     DATABASE_URL: PostgresDsn = Field(..., env="DATABASE_URL")
 
+    # Пул соединений на процесс: size + max_overflow соединений на движок,
+    # при сайзинге умножать на число воркеров/реплик и сверять с max_connections
+    DB_POOL_SIZE: int = Field(10, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(10, env="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: float = Field(30, env="DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE: int = Field(1800, env="DB_POOL_RECYCLE")  # секунды; -1 — не пересоздавать
+    DB_POOL_USE_LIFO: bool = Field(True, env="DB_POOL_USE_LIFO")
+    # Пинг перед каждой выдачей из пула; без него разрыв ловится на первом запросе,
+    # а от «протухших» соединений защищают recycle и LIFO
+    DB_POOL_PRE_PING: bool = Field(True, env="DB_POOL_PRE_PING")
+    # Режим за pgbouncer (transaction pooling): без своего пула и без prepared statements
+    DB_NULL_POOL: bool = Field(False, env="DB_NULL_POOL")
+    DB_DISABLE_PREPARED_STATEMENTS: bool = Field(False, env="DB_DISABLE_PREPARED_STATEMENTS")
+
+    # Реплики для чтения (CSV URL): GET/HEAD-запросы читают с них, запись — primary.
+    # Реплика с отставанием больше DB_REPLICA_MAX_LAG_SECONDS (или недоступная)
+    # не используется; пользователь после своей записи READ_YOUR_WRITES_SECONDS
+    # читает с primary
+    DATABASE_REPLICA_URLS: str = Field("", env="DATABASE_REPLICA_URLS")
+    DB_REPLICA_MAX_LAG_SECONDS: float = Field(5, env="DB_REPLICA_MAX_LAG_SECONDS")
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = Field(2, env="DB_REPLICA_CHECK_INTERVAL_SECONDS")
+    READ_YOUR_WRITES_SECONDS: float = Field(5, env="READ_YOUR_WRITES_SECONDS")
+
     # Параметры JWT
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
     ALGORITHM: str = Field("HS256", env="ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    # Refresh-токен (ротируется при каждом /auth/refresh), дни
+    REFRESH_TOKEN_EXPIRE_DAYS: int = Field(30, env="REFRESH_TOKEN_EXPIRE_DAYS")
+    # Ротация ключей подписи: CSV пар kid:secret и kid, которым подписываем новые
+    # токены; без JWT_ACTIVE_KID подписываем SECRET_KEY (токены без kid)
+    JWT_SIGNING_KEYS: str = Field("", env="JWT_SIGNING_KEYS")
+    JWT_ACTIVE_KID: str = Field("", env="JWT_ACTIVE_KID")
+    # Кэш разобранных токенов (LRU по хешу токена, до exp) и период
+    # подтягивания списка отзыва из БД в память процесса
+    TOKEN_CACHE_MAX_SIZE: int = Field(10_000, env="TOKEN_CACHE_MAX_SIZE")
+    TOKEN_REVOCATION_SYNC_SECONDS: float = Field(5, env="TOKEN_REVOCATION_SYNC_SECONDS")
+
+    # Индекс подтверждённых доменов для регистрации по домену: период полной
+    # перезагрузки (изменения других процессов); свои применяются сразу
+    DOMAIN_INDEX_REFRESH_SECONDS: float = Field(60, env="DOMAIN_INDEX_REFRESH_SECONDS")
+
+    # Кэш идентичности (User + активные Membership) по JWT sub; 0 — отключить
+    IDENTITY_CACHE_TTL_SECONDS: int = Field(30, env="IDENTITY_CACHE_TTL_SECONDS")
+    IDENTITY_CACHE_MAX_SIZE: int = Field(10_000, env="IDENTITY_CACHE_MAX_SIZE")
+
+    # Кэш сводки онбординга компании (дашборд HR), секунды; 0 — отключить
+    ONBOARDING_SUMMARY_TTL_SECONDS: int = Field(60, env="ONBOARDING_SUMMARY_TTL_SECONDS")
+    ONBOARDING_SUMMARY_MAX_SIZE: int = Field(1024, env="ONBOARDING_SUMMARY_MAX_SIZE")
+
+    # Кэш опубликованных квестов (документ со шагами) по id + версии updated_at;
+    # TTL ограничивает лишь память, свежесть проверяется по версии; 0 — отключить
+    QUEST_CACHE_MAX_SIZE: int = Field(1024, env="QUEST_CACHE_MAX_SIZE")
+    QUEST_CACHE_TTL_SECONDS: int = Field(3600, env="QUEST_CACHE_TTL_SECONDS")
+
+    # Свипер просроченных назначений/задач: период (0 — не запускать в процессе
+    # API), размер пачки и сколько дней после due_at до EXPIRED / FAILED
+    SWEEPER_INTERVAL_SECONDS: int = Field(60, env="SWEEPER_INTERVAL_SECONDS")
+    SWEEPER_BATCH_SIZE: int = Field(500, env="SWEEPER_BATCH_SIZE")
+    QUEST_EXPIRE_AFTER_DAYS: int = Field(30, env="QUEST_EXPIRE_AFTER_DAYS")
+    PROBATION_TASK_FAIL_AFTER_DAYS: int = Field(7, env="PROBATION_TASK_FAIL_AFTER_DAYS")
+
+    # Массовый импорт сотрудников: строк на один INSERT ... ON CONFLICT,
+    # сколько ошибок строк возвращать и сколько байт тела держать в памяти
+    # до сброса во временный файл
+    IMPORT_BATCH_SIZE: int = Field(1000, env="IMPORT_BATCH_SIZE")
+    IMPORT_MAX_ERRORS: int = Field(1000, env="IMPORT_MAX_ERRORS")
+    IMPORT_SPOOL_MAX_MEMORY: int = Field(8 * 1024 * 1024, env="IMPORT_SPOOL_MAX_MEMORY")
+
+    # Outbox доменных событий: период опроса релея (0 — не запускать в процессе
+    # API), размер пачки, число попыток доставки и сколько часов хранить
+    # отправленные события до удаления свипером
+    OUTBOX_RELAY_INTERVAL_SECONDS: float = Field(1.0, env="OUTBOX_RELAY_INTERVAL_SECONDS")
+    OUTBOX_BATCH_SIZE: int = Field(100, env="OUTBOX_BATCH_SIZE")
+    OUTBOX_MAX_ATTEMPTS: int = Field(10, env="OUTBOX_MAX_ATTEMPTS")
+    OUTBOX_RETENTION_HOURS: int = Field(72, env="OUTBOX_RETENTION_HOURS")
+
+    # Исходящие вебхуки: период опроса очереди (0 — отдельным воркером),
+    # событий в одном POST, общий предел одновременных POST, соединений на хост,
+    # таймаут запроса, число попыток доставки, сколько часов хранить доставки,
+    # исчерпавшие попытки, и как часто закрывать клиенты хостов без подписок
+    WEBHOOK_DELIVERY_INTERVAL_SECONDS: float = Field(1.0, env="WEBHOOK_DELIVERY_INTERVAL_SECONDS")
+    WEBHOOK_BATCH_SIZE: int = Field(50, env="WEBHOOK_BATCH_SIZE")
+    WEBHOOK_MAX_CONCURRENCY: int = Field(32, env="WEBHOOK_MAX_CONCURRENCY")
+    WEBHOOK_MAX_CONNECTIONS_PER_HOST: int = Field(4, env="WEBHOOK_MAX_CONNECTIONS_PER_HOST")
+    WEBHOOK_TIMEOUT_SECONDS: float = Field(10.0, env="WEBHOOK_TIMEOUT_SECONDS")
+    WEBHOOK_MAX_ATTEMPTS: int = Field(12, env="WEBHOOK_MAX_ATTEMPTS")
+    WEBHOOK_FAILED_RETENTION_HOURS: int = Field(7 * 24, env="WEBHOOK_FAILED_RETENTION_HOURS")
+    WEBHOOK_CLIENT_PRUNE_SECONDS: float = Field(60.0, env="WEBHOOK_CLIENT_PRUNE_SECONDS")
+
+    # Обслуживание секций: период (0 — отдельным воркером), на сколько месяцев
+    # вперёд держать секции probation_reviews и через сколько месяцев
+    # отсоединять старые (таблицы остаются архивом; 0 — не отсоединять)
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = Field(6 * 3600, env="PARTITION_MAINTENANCE_INTERVAL_SECONDS")
+    PARTITION_PREMAKE_MONTHS: int = Field(3, env="PARTITION_PREMAKE_MONTHS")
+    PROBATION_REVIEW_RETENTION_MONTHS: int = Field(24, env="PROBATION_REVIEW_RETENTION_MONTHS")
+
+    # Логировать SQL запросов, выполнивших больше N statements; 0 — выключено
+    SLOW_REQUEST_QUERY_THRESHOLD: int = Field(0, env="SLOW_REQUEST_QUERY_THRESHOLD")
+
+    # Хеширование паролей: стоимость bcrypt, размер пула процессов
+    # (0 — пул потоков) и предел очереди, после которого отвечаем 503
+    BCRYPT_ROUNDS: int = Field(12, env="BCRYPT_ROUNDS")
+    PASSWORD_HASH_WORKERS: int = Field(2, env="PASSWORD_HASH_WORKERS")
+    PASSWORD_HASH_MAX_PENDING: int = Field(64, env="PASSWORD_HASH_MAX_PENDING")
 
     # Host/port для Uvicorn или Docker
     SERVER_HOST: str = Field("0.0.0.0", env="SERVER_HOST")
@@ -36,6 +137,17 @@ class Settings(BaseSettings):
         # Иначе возвращаем пустой список
         return []
 
+    @property
+    def signing_keys(self) -> dict[str, str]:
+        # "kid:secret,kid:secret" → {kid: secret}
+        pairs = (item.split(":", 1) for item in self.JWT_SIGNING_KEYS.split(",") if item.strip())
+        return {kid.strip(): secret.strip() for kid, secret in pairs}
+
+    @property
+    def replica_urls(self) -> List[str]:
+        # Строка CSV, а не список: pydantic-settings разбирает списки из ENV как JSON
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
     class Config:
         env_file = ".env.local"
         env_file_encoding = "utf-8"
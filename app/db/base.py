@@ -10,6 +10,7 @@ from app.models.models import (  # noqa: F401
     CompanyDomain,
     Membership,
     MembershipManager,
+    MembershipClosure,
     Quest,
     QuestStep,
     QuestAssignment,
@@ -0,0 +1,91 @@
+"""DDL декларативного партиционирования: создание и отсоединение секций.
+
+Функции работают с синхронным Connection и знают только имена таблиц, поэтому
+годятся и для DDL-событий моделей, и для миграций Alembic, и для воркера.
+"""
+from __future__ import annotations
+import re
+from datetime import date
+
+from sqlalchemy import Connection, text
+
+SUBMISSIONS = "quest_step_submissions"
+REVIEWS = "probation_reviews"
+
+# Модуль hash-секций фиксируется при создании таблицы: поменять его можно
+# только пересозданием, поэтому это константа, а не настройка
+SUBMISSION_HASH_PARTITIONS = 16
+
+_MONTH_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month ``months`` after the month of ``day``."""
+    year, month = divmod(day.month - 1 + months, 12)
+    return date(day.year + year, month + 1, 1)
+
+
+def month_partition(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partitions(connection: Connection, table: str) -> list[str]:
+    """Names of the partitions currently attached to ``table``."""
+    return list(connection.scalars(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+        ),
+        {"table": table},
+    ))
+
+
+def create_hash_partitions(connection: Connection, table: str, modulus: int) -> None:
+    for remainder in range(modulus):
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {table}_h{remainder:02d} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+        ))
+
+
+def create_month_partitions(connection: Connection, table: str, first: date, last: date) -> list[str]:
+    """Create the missing monthly partitions of ``table`` for the months ``first``..``last``.
+
+    Bounds are UTC month starts; returns the names of the partitions created.
+    """
+    attached = set(partitions(connection, table))
+    created: list[str] = []
+    month = add_months(first, 0)
+    while month <= last:
+        name = month_partition(table, month)
+        if name not in attached:
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month} 00:00+00') TO ('{add_months(month, 1)} 00:00+00')"
+            ))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def detach_month_partitions(
+    connection: Connection,
+    table: str,
+    before: date,
+    concurrently: bool = False,
+) -> list[str]:
+    """Detach the monthly partitions of ``table`` that end on or before ``before``.
+
+    Detached partitions stay in the database as plain tables (an archive to
+    dump or drop later). ``concurrently`` needs an autocommit connection.
+    """
+    detached: list[str] = []
+    for name in partitions(connection, table):
+        match = _MONTH_SUFFIX.search(name)
+        if match is None or add_months(date(int(match[1]), int(match[2]), 1), 1) > before:
+            continue
+        connection.execute(text(
+            f"ALTER TABLE {table} DETACH PARTITION {name}{' CONCURRENTLY' if concurrently else ''}"
+        ))
+        detached.append(name)
+    return detached
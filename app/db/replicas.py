@@ -0,0 +1,85 @@
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import math
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.utils.cache import TTLCache
+from app.utils.metrics import REPLICA_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики в секундах; 0, если всё полученное WAL уже применено
+# (иначе на простаивающем primary «отставание» росло бы без новых транзакций).
+# На не-реплике (pg_is_in_recovery() = false) тоже 0
+_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReplicaSet:
+    """Read replicas of the primary together with their last measured lag.
+
+    A replica is eligible for reads only after a lag check has seen it within
+    ``max_lag`` seconds; unchecked or unreachable replicas count as infinitely
+    behind, so without the monitor running every read goes to the primary.
+    Users who have just written are pinned to the primary for ``pin_seconds``.
+    """
+
+    def __init__(
+        self,
+        engines: dict[str, AsyncEngine],
+        *,
+        max_lag: float,
+        pin_seconds: float,
+        max_pins: int = 100_000,
+    ) -> None:
+        self.engines = engines
+        self.max_lag = max_lag
+        self.lag: dict[str, float] = {name: math.inf for name in engines}
+        self._pins: TTLCache[str, bool] = TTLCache(maxsize=max_pins, ttl=pin_seconds)
+        self._turn = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self) -> AsyncEngine | None:
+        """Next replica within ``max_lag`` (round robin), or None to use the primary."""
+        healthy = [name for name, lag in self.lag.items() if lag <= self.max_lag]
+        if not healthy:
+            return None
+        return self.engines[healthy[next(self._turn) % len(healthy)]]
+
+    def pin(self, user_key: str) -> None:
+        self._pins.set(user_key, True)
+
+    def is_pinned(self, user_key: str | None) -> bool:
+        return user_key is not None and self._pins.get(user_key) is not None
+
+    async def check(self) -> dict[str, float]:
+        """Measure the lag of every replica; unreachable ones get ``inf``."""
+        for name, engine in self.engines.items():
+            try:
+                async with engine.connect() as conn:
+                    lag = await conn.scalar(_LAG_SQL)
+                self.lag[name] = math.inf if lag is None else float(lag)
+            except Exception:
+                logger.warning("replica %s lag check failed", name, exc_info=True)
+                self.lag[name] = math.inf
+            REPLICA_LAG_SECONDS.labels(name).set(self.lag[name])
+        return dict(self.lag)
+
+    async def monitor(self, interval: float) -> None:
+        """Re-check lag every ``interval`` seconds until cancelled."""
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
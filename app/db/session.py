@@ -1,18 +1,77 @@
 from __future__ import annotations
-from typing import Generator
+import time
+from typing import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import TextClause, create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.core.config import settings
+from app.db.replicas import ReplicaSet
+from app.utils.metrics import instrument_engine, record_pool_wait, register_engine
+
+
+def _database_url(url: str | None = None) -> URL:
+    # psycopg 3 обслуживает и синхронный, и асинхронный движок
+    return make_url(url or str(settings.DATABASE_URL)).set(drivername="postgresql+psycopg")
+
+
+class _TimedCheckout:
+    # Замер ожидания свободного соединения из пула (метрика db_pool_wait_seconds);
+    # logging_name переживает recreate() и служит меткой пула
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            record_pool_wait(self.logging_name or "default", time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
 
-# Настройка движка: проверка живости соединения
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-)
 
-# Фабрика сессий
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def _engine_options(name: str, queue_pool: type[Pool]) -> dict:
+    """Параметры пула из настроек; name — метка пула в метриках и /system/pool."""
+    options: dict = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_logging_name": name,
+    }
+    if settings.DB_DISABLE_PREPARED_STATEMENTS:
+        # psycopg 3: не готовить запросы на сервере (pgbouncer в transaction mode)
+        options["connect_args"] = {"prepare_threshold": None}
+    if settings.DB_NULL_POOL:
+        options["poolclass"] = TimedNullPool
+    else:
+        options.update(
+            poolclass=queue_pool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_use_lifo=settings.DB_POOL_USE_LIFO,
+        )
+    return options
+
+
+# Синхронный движок: скрипты, create_all, Alembic
+engine = create_engine(_database_url(), **_engine_options("sync", TimedQueuePool))
+instrument_engine(engine)
+register_engine("sync", engine)
+
+# Фабрика синхронных сессий
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -20,10 +79,95 @@ SessionLocal = sessionmaker(
     class_=Session,
 )
 
-# Dependency для FastAPI
+# Асинхронный движок для API: запрос не занимает поток пула на время ожидания БД
+async_engine = create_async_engine(_database_url(), **_engine_options("primary", TimedAsyncQueuePool))
+instrument_engine(async_engine.sync_engine)
+register_engine("primary", async_engine.sync_engine)
+
+# Реплики для чтения; пустой набор — всё идёт на primary
+replicas = ReplicaSet(
+    {
+        f"replica-{i}": create_async_engine(
+            _database_url(url), **_engine_options(f"replica-{i}", TimedAsyncQueuePool)
+        )
+        for i, url in enumerate(settings.replica_urls, start=1)
+    },
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    pin_seconds=settings.READ_YOUR_WRITES_SECONDS,
+)
+for _name, _replica in replicas.engines.items():
+    instrument_engine(_replica.sync_engine)
+    register_engine(_name, _replica.sync_engine)
+
+
+def _is_write(clause) -> bool:
+    # DML, SELECT ... FOR UPDATE и сырой text() считаем записью
+    return (
+        clause is None
+        or isinstance(clause, (UpdateBase, TextClause))
+        or getattr(clause, "_for_update_arg", None) is not None
+    )
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of a read-only unit of work to a replica.
+
+    ``info["read_only"]`` (set by ``get_async_db`` for GET/HEAD) enables
+    routing; ``info["user_key"]`` (set by the principal dependency) names the
+    user for read-your-writes pinning. Flushes, DML and locking reads always
+    go to the primary, and after the first of them the rest of the session
+    stays there so it sees its own writes. Services are unaware of all this.
+    """
+
+    def get_bind(self, mapper=None, *, clause=None, **kw) -> Engine:
+        if self._flushing or _is_write(clause):
+            self.info["wrote"] = True
+            self.info["read_only"] = False
+        elif self.info.get("read_only") and not replicas.is_pinned(self.info.get("user_key")):
+            # Одна реплика на сессию: запросы запроса видят один снимок
+            replica = self.info.get("replica") or replicas.pick()
+            if replica is not None:
+                self.info["replica"] = replica
+                return replica.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_writer(session: Session) -> None:
+    # Автор записи ещё READ_YOUR_WRITES_SECONDS читает с primary
+    if session.info.pop("wrote", False) and session.info.get("user_key") and replicas:
+        replicas.pin(session.info["user_key"])
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_write(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+# Фабрика асинхронных сессий; expire_on_commit=False, чтобы объекты
+# оставались читаемыми после commit без неявного lazy-load
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Методы, которые не пишут: их единица работы читает с реплики
+READ_ONLY_METHODS = frozenset({"GET", "HEAD"})
+
+# Dependency для FastAPI (синхронная)
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Dependency для FastAPI (асинхронная); GET/HEAD читают с реплики, если она есть
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        db.info["read_only"] = bool(replicas) and request.method in READ_ONLY_METHODS
+        yield db
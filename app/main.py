@@ -1,19 +1,65 @@
 from __future__ import annotations
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
 import uvicorn
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.db.base import Base
-from app.db.session import engine
+from app.db.session import engine, replicas
+from app.utils.hashing import password_hasher
+from app.utils.metrics import METRICS_CONTENT_TYPE, InstrumentationMiddleware, render_metrics
+from app.services.outbox_service import run_outbox_relay
+from app.services.partition_service import run_partition_maintenance
+from app.services.sweeper_service import run_sweeper
+from app.services.webhook_service import WebhookDispatcher
+from app.utils.domains import run_domain_index_sync
+from app.utils.tokens import run_revocation_sync
 from app.api.v1 import (
     auth, users, companies, employees,
-    quests, tasks, evaluations,
-    pulse, development
+    quest, tasks, system, search,
 )
 
-app = FastAPI(title="HR Onboard Platform")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Свипер просроченных; при SWEEPER_INTERVAL_SECONDS=0 запускается отдельным воркером
+    sweeper = None
+    if settings.SWEEPER_INTERVAL_SECONDS > 0:
+        sweeper = asyncio.create_task(run_sweeper(settings.SWEEPER_INTERVAL_SECONDS))
+    # Релей outbox; при OUTBOX_RELAY_INTERVAL_SECONDS=0 — отдельным воркером
+    outbox_relay = None
+    if settings.OUTBOX_RELAY_INTERVAL_SECONDS > 0:
+        outbox_relay = asyncio.create_task(run_outbox_relay(settings.OUTBOX_RELAY_INTERVAL_SECONDS))
+    # Доставка вебхуков; обработчик событий outbox регистрируется импортом выше
+    webhooks = None
+    if settings.WEBHOOK_DELIVERY_INTERVAL_SECONDS > 0:
+        webhooks = asyncio.create_task(WebhookDispatcher().run(settings.WEBHOOK_DELIVERY_INTERVAL_SECONDS))
+    # Замер отставания реплик; пока его нет, чтение идёт на primary
+    lag_monitor = None
+    if replicas:
+        lag_monitor = asyncio.create_task(replicas.monitor(settings.DB_REPLICA_CHECK_INTERVAL_SECONDS))
+    # Список отзыва токенов: подтягиваем из БД отзывы, сделанные другими процессами
+    revocation_sync = asyncio.create_task(run_revocation_sync(settings.TOKEN_REVOCATION_SYNC_SECONDS))
+    # Секции probation_reviews на месяцы вперёд; при 0 — отдельным воркером
+    partitions = None
+    if settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS > 0:
+        partitions = asyncio.create_task(run_partition_maintenance(settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS))
+    # Подтверждённые домены для регистрации по домену: загрузка сейчас и периодически
+    domain_sync = asyncio.create_task(run_domain_index_sync(settings.DOMAIN_INDEX_REFRESH_SECONDS))
+    yield
+    # Останавливаем фоновые ресурсы процесса
+    for task in (sweeper, outbox_relay, webhooks, lag_monitor, revocation_sync, domain_sync, partitions):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    password_hasher.shutdown()
+
+app = FastAPI(title="HR Onboard Platform", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -23,6 +69,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Счётчик SQL/время БД на запрос: /metrics и заголовок Server-Timing
+app.add_middleware(InstrumentationMiddleware)
 
 # Create tables based on models (development only)
 Base.metadata.create_all(bind=engine)
@@ -32,16 +80,19 @@ app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(companies.router)
 app.include_router(employees.router)
-app.include_router(quests.router)
+app.include_router(quest.router)
 app.include_router(tasks.router)
-app.include_router(evaluations.router)
-app.include_router(pulse.router)
-app.include_router(development.router)
+app.include_router(search.router)
+app.include_router(system.router)
 
 @app.get("/", tags=["root"])
 async def root() -> dict[str, str]:
     return {"message": "✅ HR Onboard backend is running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
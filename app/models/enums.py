@@ -90,3 +90,18 @@ class StepSubmissionStatus(str, Enum):
     APPROVED = "approved"
     REJECTED = "rejected"
     SKIPPED = "skipped"
+
+
+class EventType(str, Enum):
+    QUEST_ASSIGNED = "quest.assigned"
+    QUEST_STEP_UPDATED = "quest.step_updated"
+    QUEST_COMPLETED = "quest.completed"
+    PROBATION_TASK_REVIEWED = "probation.task_reviewed"
+    MEMBERSHIP_INVITED = "membership.invited"
+
+
+class SearchKind(str, Enum):
+    QUEST = "quest"
+    QUEST_STEP = "quest_step"
+    PROBATION_TASK = "probation_task"
+    PERSON = "person"
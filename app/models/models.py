@@ -6,6 +6,8 @@ from sqlalchemy import (
     Boolean,
     CheckConstraint,
     Column,
+    Computed,
+    DDL,
     Date,
     DateTime,
     Enum as PgEnum,
@@ -16,8 +18,10 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    event,
+    text,
 )
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship, declarative_base
 
 from .enums import (
@@ -31,6 +35,19 @@ from .enums import (
 Base = declarative_base()
 now = datetime.utcnow
 
+# Триграммный индекс по email требует pg_trgm до создания таблиц
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+def tsvector_of(title: str, body: str | None = None) -> Computed:
+    """Хранимый tsvector для полнотекстового поиска: заголовок весит больше текста.
+
+    Конфигурация 'simple' без стемминга: тексты бывают и русскими, и английскими.
+    """
+    expr = f"setweight(to_tsvector('simple', coalesce({title}, '')), 'A')"
+    if body:
+        expr += f" || setweight(to_tsvector('simple', coalesce({body}, '')), 'B')"
+    return Computed(expr, persisted=True)
+
 # Users
 class User(Base):
     __tablename__ = "users"
@@ -46,6 +63,12 @@ class User(Base):
 
     memberships: Mapped[list["Membership"]] = relationship(back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_users_created", "created_at", "id"),
+        # Поиск людей по подстроке/опечатке в email (ILIKE '%..%', similarity)
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
+
 # Companies and domains
 class Company(Base):
     __tablename__ = "companies"
@@ -66,10 +89,12 @@ class Company(Base):
 
     domains: Mapped[list["CompanyDomain"]] = relationship(back_populates="company", cascade="all, delete-orphan")
     memberships: Mapped[list["Membership"]] = relationship(back_populates="company", cascade="all, delete-orphan")
-    quests: Mapped[list["Quest"]] = relationship(back_populates="company", cascade="all, delete-orphan")
+    quests: Mapped[list["Quest"]] = relationship(back_populates="company", cascade="all, delete-orphan", foreign_keys="Quest.company_id")
+    webhook_subscriptions: Mapped[list["WebhookSubscription"]] = relationship(back_populates="company", cascade="all, delete-orphan")
 
     __table_args__ = (
         Index("ix_companies_name", "name"),
+        Index("ix_companies_created", "created_at", "id"),
     )
 
 class CompanyDomain(Base):
@@ -110,13 +135,15 @@ class Membership(Base):
     company: Mapped["Company"] = relationship(back_populates="memberships")
     manager: Mapped["Membership"] = relationship(remote_side="Membership.id", back_populates="subordinates")
     subordinates: Mapped[list["Membership"]] = relationship(back_populates="manager")
-    quest_assignments: Mapped[list["QuestAssignment"]] = relationship(back_populates="membership", cascade="all, delete-orphan")
+    quest_assignments: Mapped[list["QuestAssignment"]] = relationship(back_populates="membership", cascade="all, delete-orphan", foreign_keys="QuestAssignment.membership_id")
     created_tasks: Mapped[list["ProbationTask"]] = relationship(back_populates="creator", cascade="all, delete-orphan", foreign_keys="ProbationTask.created_by_member")
     assigned_tasks: Mapped[list["ProbationTask"]] = relationship(back_populates="assignee", foreign_keys="ProbationTask.assigned_to_member")
 
     __table_args__ = (
         UniqueConstraint("user_id", "company_id", name="uq_memberships_user_company"),
         Index("ix_memberships_company_role", "company_id", "role"),
+        Index("ix_memberships_manager", "manager_membership_id"),
+        Index("ix_memberships_company_created", "company_id", "created_at", "id"),
     )
 
 class MembershipManager(Base):
@@ -130,6 +157,22 @@ class MembershipManager(Base):
         Index("ix_membership_managers_manager", "manager_member_id"),
     )
 
+# Closure table of the line hierarchy (memberships.manager_membership_id):
+# one row per (ancestor, descendant) pair, including the (self, self, 0) row
+LINE_RELATION = "line"
+
+class MembershipClosure(Base):
+    __tablename__ = "membership_closure"
+
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("memberships.id", ondelete="cascade"), primary_key=True)
+    descendant_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("memberships.id", ondelete="cascade"), primary_key=True)
+    relation: Mapped[str] = mapped_column(String(32), primary_key=True, default=LINE_RELATION)
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_membership_closure_descendant", "descendant_id", "relation", "depth"),
+    )
+
 # Quests
 class Quest(Base):
     __tablename__ = "quests"
@@ -142,14 +185,38 @@ class Quest(Base):
     is_mandatory: Mapped[bool] = mapped_column(Boolean, default=True)
     status: Mapped[QuestStatus] = mapped_column(PgEnum(QuestStatus), default=QuestStatus.DRAFT)
     created_by_member: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("memberships.id"))
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, tsvector_of("title", "description"), deferred=True)
+    # Последняя опубликованная версия; сама строка quests — рабочий черновик
+    current_version_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("quest_versions.id", ondelete="set null", use_alter=True, name="fk_quests_current_version"),
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now, onupdate=now)
 
-    company: Mapped["Company"] = relationship(back_populates="quests")
+    company: Mapped["Company"] = relationship(back_populates="quests", foreign_keys=[company_id])
     steps: Mapped[list["QuestStep"]] = relationship(back_populates="quest", cascade="all, delete-orphan", order_by="QuestStep.sort_order")
 
     __table_args__ = (
         Index("ix_quests_company_status", "company_id", "status"),
+        Index("ix_quests_company_created", "company_id", "created_at", "id"),
+        Index("ix_quests_search", "search_vector", postgresql_using="gin"),
+    )
+
+# Immutable published versions: the serialized quest document with its
+# ordered steps, written once by publish and pinned by assignments
+class QuestVersion(Base):
+    __tablename__ = "quest_versions"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    quest_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("quests.id", ondelete="cascade"), nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    snapshot: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    step_ids: Mapped[list[uuid.UUID]] = mapped_column(ARRAY(UUID(as_uuid=True)), nullable=False)
+    published_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
+
+    __table_args__ = (
+        UniqueConstraint("quest_id", "version", name="uq_quest_versions_quest_version"),
     )
 
 class QuestStep(Base):
@@ -163,12 +230,14 @@ class QuestStep(Base):
     required: Mapped[bool] = mapped_column(Boolean, default=True)
     content_json: Mapped[dict | None] = mapped_column(JSONB)
     approval_required_role: Mapped[QuestStepApprovalRole] =            mapped_column(PgEnum(QuestStepApprovalRole), default=QuestStepApprovalRole.NONE)
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, tsvector_of("title"), deferred=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
 
     quest: Mapped["Quest"] = relationship(back_populates="steps")
 
     __table_args__ = (
         UniqueConstraint("quest_id", "sort_order", name="uq_quest_steps_order"),
+        Index("ix_quest_steps_search", "search_vector", postgresql_using="gin"),
     )
 
 class QuestAssignment(Base):
@@ -177,6 +246,8 @@ class QuestAssignment(Base):
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     quest_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("quests.id", ondelete="cascade"))
     membership_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("memberships.id", ondelete="cascade"))
+    # Версия квеста, которую видит исполнитель; NULL — назначения до версионирования
+    quest_version_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("quest_versions.id"))
     assigned_by_member: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("memberships.id"))
     override_duration_days: Mapped[int | None] = mapped_column(Integer)
     assigned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
@@ -184,31 +255,43 @@ class QuestAssignment(Base):
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     status: Mapped[QuestAssignmentStatus] = mapped_column(PgEnum(QuestAssignmentStatus), default=QuestAssignmentStatus.ASSIGNED)
     progress_percent: Mapped[float] = mapped_column(Numeric(5, 2), default=0.0)
+    # Счётчики обязательных шагов; обновляются атомарно в SQL (QuestService)
+    required_steps_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    approved_steps_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
-    membership: Mapped["Membership"] = relationship(back_populates="quest_assignments")
+    membership: Mapped["Membership"] = relationship(back_populates="quest_assignments", foreign_keys=[membership_id])
     quest: Mapped["Quest"] = relationship()
     submissions: Mapped[list["QuestStepSubmission"]] = relationship(back_populates="quest_assignment", cascade="all, delete-orphan")
 
     __table_args__ = (
+        UniqueConstraint("quest_id", "membership_id", name="uq_quest_assignments_quest_member"),
         Index("ix_quest_assignments_company", "membership_id", "status"),
+        Index("ix_quest_assignments_quest_progress", "quest_id", "status", "progress_percent"),
+        # Только открытые назначения: свипер просроченных читает O(due rows)
+        Index("ix_quest_assignments_open_due", "due_at",
+              postgresql_where=text("status IN ('ASSIGNED', 'IN_PROGRESS', 'OVERDUE')")),
     )
 
+# Hash-секции по назначению: ключ секционирования входит в PK и в уникальность
+# (назначение, шаг), так что ON CONFLICT и выборки по назначению работают в одной секции
 class QuestStepSubmission(Base):
     __tablename__ = "quest_step_submissions"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    quest_assignment_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("quest_assignments.id", ondelete="cascade"))
+    quest_assignment_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("quest_assignments.id", ondelete="cascade"), primary_key=True)
     quest_step_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("quest_steps.id", ondelete="cascade"))
     status: Mapped[StepSubmissionStatus] = mapped_column(PgEnum(StepSubmissionStatus), default=StepSubmissionStatus.PENDING)
     submitted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     reviewed_by_member: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("memberships.id"))
     reviewed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     data_json: Mapped[dict | None] = mapped_column(JSONB)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
 
     quest_assignment: Mapped["QuestAssignment"] = relationship(back_populates="submissions")
 
     __table_args__ = (
         UniqueConstraint("quest_assignment_id", "quest_step_id", name="uq_submission_unique"),
+        {"postgresql_partition_by": "HASH (quest_assignment_id)"},
     )
 
 class ProbationTask(Base):
@@ -224,6 +307,9 @@ class ProbationTask(Base):
     status: Mapped[ProbationTaskStatus] = mapped_column(PgEnum(ProbationTaskStatus), default=ProbationTaskStatus.TODO)
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     result_text: Mapped[str | None] = mapped_column(Text)
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, tsvector_of("title", "description"), deferred=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now, onupdate=now)
 
     creator: Mapped["Membership"] = relationship(back_populates="created_tasks", foreign_keys=[created_by_member])
     assignee: Mapped["Membership"] = relationship(back_populates="assigned_tasks", foreign_keys=[assigned_to_member])
@@ -231,8 +317,14 @@ class ProbationTask(Base):
 
     __table_args__ = (
         Index("ix_probation_tasks_company_status", "company_id", "status"),
+        Index("ix_probation_tasks_company_created", "company_id", "created_at", "id"),
+        Index("ix_probation_tasks_search", "search_vector", postgresql_using="gin"),
+        Index("ix_probation_tasks_open_due", "due_at",
+              postgresql_where=text("status IN ('TODO', 'IN_PROGRESS')")),
     )
 
+# Помесячные секции по created_at: отзывы только добавляются, старые месяцы
+# отсоединяет воркер обслуживания секций
 class ProbationReview(Base):
     __tablename__ = "probation_reviews"
 
@@ -242,19 +334,205 @@ class ProbationReview(Base):
     score: Mapped[float | None] = mapped_column(Numeric(3, 1))
     decision: Mapped[ReviewDecision] = mapped_column(PgEnum(ReviewDecision))
     comments: Mapped[str | None] = mapped_column(Text)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now, primary_key=True)
 
     task: Mapped["ProbationTask"] = relationship(back_populates="reviews")
 
     __table_args__ = (
         Index("ix_probation_reviews_task", "task_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+# Refresh tokens: only the sha256 of the opaque token is stored. Rotation
+# marks the presented token used and issues a successor in the same family;
+# presenting a used token again revokes the whole family
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    token_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    family_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="cascade"), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    used_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_family", "family_id"),
+        Index("ix_refresh_tokens_expires", "expires_at"),
+    )
+
+# Token revocations: a revoked access token (jti), or — with jti NULL — the
+# embedded claims of every token of user_id issued before revoked_at
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    jti: Mapped[str | None] = mapped_column(String(64))
+    user_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    revoked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_token_revocations_revoked", "revoked_at"),
+        Index("ix_token_revocations_expires", "expires_at"),
     )
 
-# Listener to auto-calculate due_at for quest assignments
-from sqlalchemy import event
+# Transactional outbox: domain events written in the same commit as the
+# change they describe, dispatched afterwards by the relay worker
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    aggregate_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    company_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text)
+    published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # Очередь релея: только неотправленные события
+        Index("ix_outbox_events_pending", "available_at", "created_at",
+              postgresql_where=text("published_at IS NULL")),
+        Index("ix_outbox_events_published", "published_at",
+              postgresql_where=text("published_at IS NOT NULL")),
+    )
+
+# Outbound webhooks: a company's endpoints and the per-endpoint delivery queue
+class WebhookSubscription(Base):
+    __tablename__ = "webhook_subscriptions"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("companies.id", ondelete="cascade"), nullable=False)
+    url: Mapped[str] = mapped_column(String(2048), nullable=False)
+    secret: Mapped[str] = mapped_column(String(128), nullable=False)
+    # Пустой список — все типы событий
+    event_types: Mapped[list[str]] = mapped_column(ARRAY(String(64)), default=list, server_default="{}", nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    created_by_member: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("memberships.id", ondelete="set null"))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
+
+    company: Mapped["Company"] = relationship(back_populates="webhook_subscriptions")
+
+    __table_args__ = (
+        Index("ix_webhook_subscriptions_company", "company_id"),
+    )
+
+class WebhookDelivery(Base):
+    __tablename__ = "webhook_deliveries"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    subscription_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("webhook_subscriptions.id", ondelete="cascade"), nullable=False)
+    event_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    last_status: Mapped[int | None] = mapped_column(Integer)
+    last_error: Mapped[str | None] = mapped_column(Text)
+    delivered_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # Релей outbox доставляет событие минимум один раз — дубли отсекает ключ
+        UniqueConstraint("subscription_id", "event_id", name="uq_webhook_deliveries_subscription_event"),
+        Index("ix_webhook_deliveries_pending", "subscription_id", "available_at", "created_at",
+              postgresql_where=text("delivered_at IS NULL")),
+        Index("ix_webhook_deliveries_delivered", "delivered_at",
+              postgresql_where=text("delivered_at IS NOT NULL")),
+    )
+
+from sqlalchemy import event, func, inspect, literal, select, true
+
+from app.core.config import settings
+from app.db.partitions import SUBMISSION_HASH_PARTITIONS, add_months, create_hash_partitions, create_month_partitions
+
+# Секции для таблиц, созданных через create_all; дальше месяцы досоздаёт воркер
+@event.listens_for(QuestStepSubmission.__table__, "after_create")
+def _create_submission_partitions(target, connection, **kw):  # type: ignore
+    create_hash_partitions(connection, target.name, SUBMISSION_HASH_PARTITIONS)
+
+@event.listens_for(ProbationReview.__table__, "after_create")
+def _create_review_partitions(target, connection, **kw):  # type: ignore
+    today = now().date()
+    create_month_partitions(connection, target.name, today, add_months(today, settings.PARTITION_PREMAKE_MONTHS))
+
+def assignment_duration_days(override_days, quest_days):
+    """SQL-выражение срока назначения в днях: override → квест → компания → 14.
+
+    quest_days — колонка или literal; Company (компания участника) должна быть во FROM.
+    """
+    return func.coalesce(literal(override_days, Integer), quest_days, Company.default_quest_duration_days, 14)
 
 @event.listens_for(QuestAssignment, "before_insert")
 def set_due_at(mapper, connection, target):  # type: ignore
+    # У pending-объекта связи не подгружаются — считаем срок одним запросом
     if target.due_at is None:
-        dur = target.override_duration_days or (target.quest.duration_days if target.quest else None) or target.membership.company.default_quest_duration_days or 14
-        target.due_at = (target.assigned_at or now()) + timedelta(days=dur)
+        target.assigned_at = target.assigned_at or now()
+        dur = connection.scalar(
+            select(assignment_duration_days(target.override_duration_days, Quest.duration_days))
+            .select_from(Membership)
+            .join(Company, Company.id == Membership.company_id)
+            .join(Quest, Quest.id == target.quest_id)
+            .where(Membership.id == target.membership_id)
+        )
+        target.due_at = target.assigned_at + timedelta(days=dur or 14)
+
+
+# Listeners keeping membership_closure in sync with manager_membership_id
+def _closure_attach(connection, member_id, manager_id) -> None:
+    """Link the subtree rooted at member_id under manager_id and all of its ancestors."""
+    closure = MembershipClosure.__table__
+    sup, sub = closure.alias("sup"), closure.alias("sub")
+    connection.execute(
+        closure.insert().from_select(
+            ["ancestor_id", "descendant_id", "depth", "relation"],
+            select(sup.c.ancestor_id, sub.c.descendant_id, sup.c.depth + sub.c.depth + 1, literal(LINE_RELATION))
+            # every ancestor of the manager × every node of the moved subtree
+            .select_from(sup.join(sub, true()))
+            .where(
+                sup.c.descendant_id == manager_id, sup.c.relation == LINE_RELATION,
+                sub.c.ancestor_id == member_id, sub.c.relation == LINE_RELATION,
+            ),
+        )
+    )
+
+def _closure_detach(connection, member_id) -> None:
+    """Unlink the subtree rooted at member_id from its former ancestors."""
+    closure = MembershipClosure.__table__
+    subtree = select(closure.c.descendant_id).where(closure.c.ancestor_id == member_id, closure.c.relation == LINE_RELATION)
+    ancestors = select(closure.c.ancestor_id).where(
+        closure.c.descendant_id == member_id, closure.c.ancestor_id != member_id, closure.c.relation == LINE_RELATION,
+    )
+    connection.execute(
+        closure.delete().where(
+            closure.c.relation == LINE_RELATION,
+            closure.c.descendant_id.in_(subtree),
+            closure.c.ancestor_id.in_(ancestors),
+        )
+    )
+
+@event.listens_for(Membership, "after_insert")
+def closure_on_insert(mapper, connection, target):  # type: ignore
+    connection.execute(
+        MembershipClosure.__table__.insert().values(
+            ancestor_id=target.id, descendant_id=target.id, depth=0, relation=LINE_RELATION,
+        )
+    )
+    if target.manager_membership_id is not None:
+        _closure_attach(connection, target.id, target.manager_membership_id)
+
+@event.listens_for(Membership, "after_update")
+def closure_on_update(mapper, connection, target):  # type: ignore
+    if not inspect(target).attrs.manager_membership_id.history.has_changes():
+        return
+    _closure_detach(connection, target.id)
+    if target.manager_membership_id is not None:
+        _closure_attach(connection, target.id, target.manager_membership_id)
+
+@event.listens_for(Membership, "before_delete")
+def closure_on_delete(mapper, connection, target):  # type: ignore
+    # Rows of the member itself go away with the FK cascade
+    _closure_detach(connection, target.id)
@@ -22,6 +22,13 @@ class Token(BaseModel):
 
     access_token: str
     token_type: str = Field("bearer")
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    refresh_token: str
 
 
 class TokenPayload(BaseModel):
@@ -6,7 +6,10 @@ from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict
 
-from app.models.enums import PlanTier, SignupMode, CompanyStatus
+from app.models.enums import (
+    PlanTier, SignupMode, CompanyStatus,
+    ProbationStatus, ProbationTaskStatus, QuestAssignmentStatus,
+)
 
 
 class CompanyBase(BaseModel):
@@ -45,4 +48,26 @@ class CompanyRead(CompanyBase):
     default_quest_id: UUID | None = None
     created_by_user_id: UUID | None = None
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime | None = None
+
+
+class ManagerRollup(BaseModel):
+    manager_membership_id: UUID
+    headcount: int  # direct reports
+    assignments: int
+    completed: int
+    overdue: int
+    average_progress: float
+
+
+class OnboardingSummary(BaseModel):
+    """Aggregated onboarding state of a company for HR dashboards."""
+    company_id: UUID
+    assignments_by_status: dict[QuestAssignmentStatus, int]
+    overdue_assignments: int
+    average_progress: float
+    probation_by_status: dict[ProbationStatus, int]
+    tasks_by_status: dict[ProbationTaskStatus, int]
+    overdue_tasks: int
+    managers: list[ManagerRollup]
+    generated_at: datetime
@@ -0,0 +1,59 @@
+from __future__ import annotations
+from datetime import date
+
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator, model_validator
+
+from app.models.enums import MembershipRole
+from app.schemas.membership import MembershipRead
+
+
+class EmployeeCreate(BaseModel):
+    """Request model for adding an existing user as an employee."""
+    model_config = ConfigDict(from_attributes=True)
+
+    email: EmailStr
+
+
+class EmployeeRead(MembershipRead):
+    """Response model for an employee membership."""
+    pass
+
+
+class EmployeeImportRow(BaseModel):
+    """One CSV row / NDJSON object of a bulk employee import."""
+    email: EmailStr
+    role: MembershipRole = MembershipRole.EMPLOYEE
+    manager_email: EmailStr | None = None
+    employment_type: str | None = Field(None, max_length=32)
+    probation_start_at: date | None = None
+    probation_end_at: date | None = None
+    # Вернуть в ACTIVE уже существующее (уволенное, приостановленное) членство
+    reactivate: bool = False
+
+    @field_validator("role")
+    @classmethod
+    def _importable_role(cls, role: MembershipRole) -> MembershipRole:
+        if role in (MembershipRole.OWNER, MembershipRole.APPLICANT):
+            raise ValueError(f"role {role.value} cannot be imported")
+        return role
+
+    @model_validator(mode="after")
+    def _not_own_manager(self) -> EmployeeImportRow:
+        if self.manager_email == self.email:
+            raise ValueError("an employee cannot be their own manager")
+        return self
+
+
+class EmployeeImportError(BaseModel):
+    line: int  # line of the CSV record / NDJSON object, 1-based
+    email: str | None = None
+    detail: str
+
+
+class EmployeeImportResult(BaseModel):
+    users_created: int = 0
+    memberships_created: int = 0
+    memberships_updated: int = 0
+    managers_linked: int = 0
+    error_count: int = 0
+    errors: list[EmployeeImportError] = []  # the first IMPORT_MAX_ERRORS of them
@@ -1,9 +1,10 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict
 from app.models.enums import (
+    MembershipRole,
     QuestStatus,
     QuestStepApprovalRole,
     QuestAssignmentStatus,
@@ -37,6 +38,7 @@ class QuestUpdate(BaseModel):
 class QuestRead(QuestBase):
     id: UUID
     created_by_member: UUID | None = None
+    current_version_id: UUID | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -70,6 +72,16 @@ class QuestStepRead(QuestStepBase):
     id: UUID
     created_at: datetime
 
+class QuestDetail(QuestRead):
+    """Quest template together with its steps in ``sort_order``."""
+    steps: list[QuestStepRead] = []
+
+class QuestSnapshot(QuestDetail):
+    """Immutable published version of a quest, stored as JSONB in ``quest_versions``."""
+    version_id: UUID
+    version: int
+    published_at: datetime
+
 # Quest Assignment schemas
 class QuestAssignmentBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -83,12 +95,33 @@ class QuestAssignmentCreate(QuestAssignmentBase):
 
 class QuestAssignmentRead(QuestAssignmentBase):
     id: UUID
+    quest_version_id: UUID | None = None
     assigned_by_member: UUID | None = None
     assigned_at: datetime
     due_at: datetime | None = None
     completed_at: datetime | None = None
     status: QuestAssignmentStatus
     progress_percent: float
+    required_steps_count: int = 0
+    approved_steps_count: int = 0
+
+class QuestBulkAssignCreate(BaseModel):
+    """Request model for assigning a quest to a cohort of members.
+
+    Members are picked by explicit ids and/or filters (combined with AND);
+    only active members of the quest's company are assigned.
+    """
+    membership_ids: list[UUID] | None = None
+    role: MembershipRole | None = None
+    manager_membership_id: UUID | None = None  # the manager's whole line subtree
+    probation_start_from: date | None = None
+    probation_start_to: date | None = None
+    override_duration_days: int | None = None
+
+class QuestBulkAssignResult(BaseModel):
+    assigned: list[UUID]  # membership ids that received a new assignment
+    skipped: list[UUID]  # already had this quest
+    not_found: list[UUID]  # requested ids that are not active members of the company
 
 # Quest Step Submission schemas
 class QuestStepSubmissionBase(BaseModel):
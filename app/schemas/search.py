@@ -0,0 +1,17 @@
+from __future__ import annotations
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict
+
+from app.models.enums import SearchKind
+
+
+class SearchHit(BaseModel):
+    """One ranked search result; ``parent_id`` is the quest of a step."""
+    model_config = ConfigDict(from_attributes=True)
+
+    kind: SearchKind
+    id: UUID
+    title: str
+    parent_id: UUID | None = None
+    rank: float
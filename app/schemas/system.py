@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    """Connection pool occupancy and checkout wait of one engine in this process."""
+    name: str
+    pool_class: str
+    size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    timeout: float | None = None
+    wait_count: int
+    wait_seconds_total: float
+    wait_histogram: dict[str, float]  # cumulative counts by upper bound "le", seconds
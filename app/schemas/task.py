@@ -1,9 +1,9 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict
-from app.models.enums import ProbationTaskStatus
+from app.models.enums import ProbationStatus, ProbationTaskStatus
 
 
 class TaskBase(BaseModel):
@@ -41,4 +41,24 @@ class TaskRead(TaskBase):
     completed_at: datetime | None = None
     result_text: str | None = None
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+
+class ProbationEvaluationRequest(BaseModel):
+    """Request model for evaluating probation of a company's members in bulk."""
+    probation_end_from: date | None = None
+    probation_end_to: date | None = None
+    dry_run: bool = False
+
+
+class ProbationChange(BaseModel):
+    membership_id: UUID
+    old_status: ProbationStatus
+    new_status: ProbationStatus
+
+
+class ProbationEvaluationReport(BaseModel):
+    """Response model: how many members were evaluated and whose status changed."""
+    evaluated: int
+    changed: list[ProbationChange]
+    dry_run: bool
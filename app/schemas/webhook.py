@@ -0,0 +1,42 @@
+from __future__ import annotations
+from datetime import datetime
+from uuid import UUID
+
+from pydantic import AnyHttpUrl, BaseModel, ConfigDict, field_validator
+
+from app.models.enums import EventType
+from app.utils.network import ip_literal, is_local_hostname, is_public_address
+
+
+class WebhookSubscriptionCreate(BaseModel):
+    """Request model for registering a company webhook endpoint."""
+    url: AnyHttpUrl
+    event_types: list[EventType] = []  # empty: every event type
+
+    @field_validator("url")
+    @classmethod
+    def _public_https(cls, url: AnyHttpUrl) -> AnyHttpUrl:
+        # Имена проверяются по DNS при создании и перед каждой отправкой
+        if url.scheme != "https":
+            raise ValueError("webhook URL must use https")
+        host = url.host or ""
+        literal = ip_literal(host)
+        if is_local_hostname(host) or (literal is not None and not is_public_address(literal)):
+            raise ValueError("webhook URL must point to a public host")
+        return url
+
+
+class WebhookSubscriptionRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    company_id: UUID
+    url: str
+    event_types: list[str]
+    is_active: bool
+    created_at: datetime
+
+
+class WebhookSubscriptionCreated(WebhookSubscriptionRead):
+    """Returned once on creation: the only time the signing secret is shown."""
+    secret: str
@@ -1,16 +1,27 @@
 from __future__ import annotations
-from datetime import timedelta
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.base import GenericRepository, UnitOfWork
-from app.models.models import User
+from app.models.enums import MembershipRole, MembershipStatus
+from app.models.models import Membership, RefreshToken, User
 from app.schemas.auth import RegisterRequest, LoginRequest, Token
-from app.utils.security import hash_password, verify_password, create_access_token
+from app.utils.hashing import password_hasher
+from app.utils.domains import verified_domains
+from app.utils.security import create_access_token
+from app.utils.tokens import TokenClaims, embedded_claims, revoke
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class AuthService:
     """Service for user registration, authentication, and token issuance."""
@@ -19,36 +30,158 @@ class AuthService:
         self.uow = uow
         self._repo = GenericRepository[User](uow, User)
 
-    def register(self, data: RegisterRequest) -> User:
-        """Register a new user."""
-        with self.uow as uow:
+    async def register(self, data: RegisterRequest) -> User:
+        """Register a new user.
+
+        An email on a verified domain of a company with domain signup also
+        gets an applicant membership there; the domain is resolved in memory.
+        """
+        async with self.uow as uow:
             # Check for existing email
-            existing = uow.session.query(User).filter(User.email == data.email).first()
+            existing = await uow.session.scalar(select(User).where(User.email == data.email))
             if existing:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="User with this email already exists",
                 )
-            # Hash password and create user
-            hashed = hash_password(data.password)
+            # Hash password in the hashing pool and create user
+            hashed = await password_hasher.hash(data.password)
             user = User(email=data.email, password_hash=hashed, locale=data.locale)
             uow.session.add(user)
-            uow.commit()
+            company_id = verified_domains.resolve_email(data.email)
+            if company_id is not None:
+                uow.session.add(Membership(
+                    user=user,
+                    company_id=company_id,
+                    role=MembershipRole.APPLICANT,
+                    status=MembershipStatus.APPLICANT,
+                ))
+            await uow.commit()
             return user
 
-    def authenticate(self, data: LoginRequest) -> User:
+    async def authenticate(self, data: LoginRequest) -> User:
         """Verify credentials and return the user."""
-        with self.uow as uow:
-            user = uow.session.query(User).filter(User.email == data.email).first()
-            if not user or not verify_password(data.password, user.password_hash):
+        async with self.uow as uow:
+            user = await uow.session.scalar(select(User).where(User.email == data.email))
+            if user and user.password_hash:
+                valid, new_hash = await password_hasher.verify_and_update(data.password, user.password_hash)
+            else:
+                valid, new_hash = False, None
+            if not valid:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Incorrect email or password",
                 )
+            # Upgrade the stored hash when BCRYPT_ROUNDS has changed
+            if new_hash:
+                user.password_hash = new_hash
+                await uow.commit()
             return user
 
-    def login(self, user: User) -> Token:
-        """Generate access token for an authenticated user."""
-        expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        token_str = create_access_token(data={"sub": str(user.id)}, expires_delta=expires)
-        return Token(access_token=token_str)
\ No newline at end of file
+    async def login(self, user: User, family_id: uuid.UUID | None = None) -> Token:
+        """Issue an access token and a refresh token for an authenticated user.
+
+        The access token embeds the global role and active memberships so hot
+        read paths can authorize without a database round trip. The refresh
+        token opens a new family unless ``family_id`` continues one.
+        """
+        async with self.uow as uow:
+            memberships = await uow.session.scalars(
+                select(Membership)
+                .where(Membership.user_id == user.id, Membership.status == MembershipStatus.ACTIVE)
+                .order_by(Membership.created_at)
+            )
+            expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+            token_str = create_access_token(
+                data={"sub": str(user.id), **embedded_claims(user, memberships)},
+                expires_delta=expires,
+            )
+            refresh_token = secrets.token_urlsafe(32)
+            uow.session.add(RefreshToken(
+                token_hash=_hash_refresh_token(refresh_token),
+                family_id=family_id or uuid.uuid4(),
+                user_id=user.id,
+                expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            ))
+            return Token(access_token=token_str, refresh_token=refresh_token)
+
+    async def refresh(self, refresh_token: str) -> Token:
+        """Rotate a refresh token into a new token pair, without password hashing.
+
+        The presented token is consumed by one conditional UPDATE. If it was
+        already consumed, someone is replaying it: the whole family is revoked
+        and both parties have to log in again.
+        """
+        token_hash = _hash_refresh_token(refresh_token)
+        async with self.uow as uow:
+            table = RefreshToken.__table__
+            consumed = (
+                await uow.session.execute(
+                    update(table)
+                    .where(
+                        table.c.token_hash == token_hash,
+                        table.c.used_at.is_(None),
+                        table.c.expires_at > func.now(),
+                    )
+                    .values(used_at=func.now())
+                    .returning(table.c.user_id, table.c.family_id)
+                )
+            ).first()
+            user = await uow.session.get(User, consumed.user_id) if consumed else None
+            if user is None:
+                await self._revoke_if_reused(uow.session, token_hash)
+                await uow.commit()
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid refresh token",
+                )
+            return await self.login(user, family_id=consumed.family_id)
+
+    @staticmethod
+    async def _revoke_if_reused(session: AsyncSession, token_hash: str) -> None:
+        family_id = await session.scalar(
+            select(RefreshToken.family_id).where(
+                RefreshToken.token_hash == token_hash, RefreshToken.used_at.is_not(None)
+            )
+        )
+        if family_id is not None:
+            logger.warning("refresh token reuse detected, revoking family %s", family_id)
+            await session.execute(delete(RefreshToken.__table__).where(RefreshToken.family_id == family_id))
+
+    async def logout(self, claims: TokenClaims, refresh_token: str | None = None) -> None:
+        """Revoke the presented access token and, if given, its refresh token family."""
+        async with self.uow as uow:
+            revoke(uow.session, claims)
+            if refresh_token:
+                family = (
+                    select(RefreshToken.family_id)
+                    .where(
+                        RefreshToken.token_hash == _hash_refresh_token(refresh_token),
+                        RefreshToken.user_id == claims.user_id,
+                    )
+                    .scalar_subquery()
+                )
+                await uow.session.execute(
+                    delete(RefreshToken.__table__).where(RefreshToken.family_id == family)
+                )
+
+
+def _hash_refresh_token(refresh_token: str) -> str:
+    # Токен случайный (256 бит) — соль и медленный хеш не нужны
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+async def purge_expired_refresh_tokens(session: AsyncSession, batch_size: int) -> int:
+    """Delete one batch of expired refresh tokens; returns the number deleted."""
+    t = RefreshToken.__table__
+    expired = (
+        select(t.c.token_hash)
+        .where(t.c.expires_at < func.now())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(t).where(t.c.token_hash.in_(expired.scalar_subquery())),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
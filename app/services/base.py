@@ -1,21 +1,73 @@
-
-
 from __future__ import annotations
+import base64
 import contextlib
-from typing import Any, Callable, Generic, Optional, Sequence, TypeVar
-from sqlalchemy.orm import Session
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Generic, Optional, Sequence, TypeVar
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 
 T = TypeVar("T")
 
+def encode_cursor(created_at: datetime, id: Any) -> str:
+    """Opaque keyset cursor for the ``(created_at, id)`` position of a row."""
+    raw = json.dumps([created_at.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+async def paginate(
+    session: AsyncSession,
+    stmt: Select,
+    created_col: InstrumentedAttribute,
+    id_col: InstrumentedAttribute,
+    cursor: str | None,
+    limit: int,
+) -> tuple[list[Any], str | None]:
+    """Fetch one keyset page of ``stmt`` ordered by ``(created_col, id_col)``.
+
+    Returns the rows and the cursor of the next page (None on the last page).
+    """
+    if cursor:
+        stmt = stmt.where(tuple_(created_col, id_col) > decode_cursor(cursor))
+    # One extra row tells whether another page exists
+    stmt = stmt.order_by(created_col, id_col).limit(limit + 1)
+    rows = list(await session.scalars(stmt))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+
 class UnitOfWork(contextlib.AbstractAsyncContextManager):
     """Async unit of work for database sessions."""
-    def __init__(self, session_factory: Callable[[], Session]) -> None:
+    def __init__(self, session_factory: Callable[[], AsyncSession]) -> None:
         self._session_factory = session_factory
-        self.session: Session | None = None
+        self._session: AsyncSession | None = None
+        self._depth = 0
+
+    @property
+    def session(self) -> AsyncSession:
+        # Open the session lazily so repositories also work outside ``async with``
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
 
     async def __aenter__(self) -> UnitOfWork:
-        # Create a new session at the start of the context
-        self.session = self._session_factory()
+        self._depth += 1
         return self
 
     async def __aexit__(
@@ -24,43 +76,71 @@ class UnitOfWork(contextlib.AbstractAsyncContextManager):
         exc: BaseException | None,
         tb: Any,
     ) -> None:
-        # Commit on success, rollback on exception
-        if self.session is None:
+        # Only the outermost block commits on success or rolls back on exception;
+        # the session itself is closed by whoever created it (e.g. ``get_db``)
+        self._depth -= 1
+        if self._depth or self._session is None:
             return
         if exc:
-            self.session.rollback()
+            await self._session.rollback()
         else:
-            self.session.commit()
-        self.session.close()
+            await self._session.commit()
 
-    def commit(self) -> None:
-        if self.session:
-            self.session.commit()
+    async def commit(self) -> None:
+        if self._session:
+            await self._session.commit()
 
-    def rollback(self) -> None:
-        if self.session:
-            self.session.rollback()
+    async def rollback(self) -> None:
+        if self._session:
+            await self._session.rollback()
 
 class GenericRepository(Generic[T]):
-    """Generic repository for CRUD operations on SQLAlchemy models."""
+    """Generic async repository for CRUD operations on SQLAlchemy models."""
     def __init__(self, uow: UnitOfWork, model: type[T]) -> None:
         self.uow = uow
         self.model = model
 
     def add(self, obj: T) -> T:
-        assert self.uow.session is not None, "Session is not initialized"
         self.uow.session.add(obj)
         return obj
 
-    def get(self, id: Any) -> Optional[T]:
-        assert self.uow.session is not None, "Session is not initialized"
-        return self.uow.session.get(self.model, id)
+    async def get(self, id: Any) -> Optional[T]:
+        return await self.uow.session.get(self.model, id)
+
+    def query(self, **filters: Any) -> Select:
+        return select(self.model).filter_by(**filters)
+
+    async def list(self, **filters: Any) -> Sequence[T]:
+        result = await self.uow.session.scalars(self.query(**filters))
+        return result.all()
 
-    def list(self, **filters: Any) -> Sequence[T]:
-        assert self.uow.session is not None, "Session is not initialized"
-        query = self.uow.session.query(self.model)
-        return query.filter_by(**filters).all()
+    async def page(
+        self,
+        stmt: Select | None = None,
+        *,
+        cursor: str | None = None,
+        limit: int = 50,
+        **filters: Any,
+    ) -> tuple[list[T], str | None]:
+        """Keyset page over ``(created_at, id)`` of ``stmt`` or of ``filters``."""
+        stmt = self.query(**filters) if stmt is None else stmt
+        return await paginate(
+            self.uow.session, stmt, self.model.created_at, self.model.id, cursor, limit
+        )
+
+    async def stream(
+        self,
+        stmt: Select | None = None,
+        *,
+        yield_per: int = 500,
+        **filters: Any,
+    ) -> AsyncIterator[T]:
+        """Yield rows in ``(created_at, id)`` order through a server-side cursor."""
+        stmt = self.query(**filters) if stmt is None else stmt
+        stmt = stmt.order_by(self.model.created_at, self.model.id)
+        result = await self.uow.session.stream_scalars(stmt.execution_options(yield_per=yield_per))
+        async for obj in result:
+            yield obj
 
-    def remove(self, obj: T) -> None:
-        assert self.uow.session is not None, "Session is not initialized"
-        self.uow.session.delete(obj)
\ No newline at end of file
+    async def remove(self, obj: T) -> None:
+        await self.uow.session.delete(obj)
@@ -1,12 +1,24 @@
 from __future__ import annotations
+from typing import AsyncIterator
+
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, literal_column, select
 from uuid import UUID
 
+from app.core.config import settings
 from app.services.base import UnitOfWork, GenericRepository
-from app.models.models import Company, Membership
-from app.models.enums import MembershipRole, MembershipStatus
-from app.schemas.company import CompanyCreate, CompanyUpdate
+from app.models.models import Company, Membership, ProbationTask, QuestAssignment, now
+from app.models.enums import (
+    MembershipRole, MembershipStatus, ProbationStatus, ProbationTaskStatus, QuestAssignmentStatus,
+)
+from app.schemas.company import CompanyCreate, CompanyUpdate, ManagerRollup, OnboardingSummary
+from app.utils.cache import TTLCache
+from app.utils.domains import verified_domains
+
+# Сводка онбординга по company_id: самый тяжёлый экран, допускает короткое отставание
+summary_cache: TTLCache[UUID, OnboardingSummary] = TTLCache(
+    maxsize=settings.ONBOARDING_SUMMARY_MAX_SIZE, ttl=settings.ONBOARDING_SUMMARY_TTL_SECONDS
+)
 
 
 class CompanyService:
@@ -16,13 +28,13 @@ class CompanyService:
         self.uow = uow
         self._repo = GenericRepository[Company](uow, Company)
 
-    def create_self_signup(self, data: CompanyCreate, owner_user_id: UUID) -> Company:
+    async def create_self_signup(self, data: CompanyCreate, owner_user_id: UUID) -> Company:
         """Create a new company and assign the owner user as CompanyOwner."""
-        with self.uow as uow:
+        async with self.uow as uow:
             # Create company
             company = Company(**data.model_dump())
             uow.session.add(company)
-            uow.commit()
+            await uow.session.flush()
             # Assign owner membership
             membership = Membership(
                 user_id=owner_user_id,
@@ -31,22 +43,123 @@ class CompanyService:
                 status=MembershipStatus.ACTIVE
             )
             uow.session.add(membership)
-            uow.commit()
+            await uow.commit()
             return company
 
-    def get_by_id(self, company_id: UUID) -> Company | None:
+    async def get_by_id(self, company_id: UUID) -> Company | None:
         """Fetch a company by its ID."""
-        return self._repo.get(company_id)
+        return await self._repo.get(company_id)
 
-    def list(self) -> list[Company]:
+    async def list(self) -> list[Company]:
         """List all companies."""
-        return self._repo.list()
+        return list(await self._repo.list())
+
+    async def page(self, cursor: str | None = None, limit: int = 50) -> tuple[list[Company], str | None]:
+        """One keyset page of companies."""
+        return await self._repo.page(cursor=cursor, limit=limit)
+
+    def stream(self) -> AsyncIterator[Company]:
+        """Stream all companies without materialising the list."""
+        return self._repo.stream()
 
-    def update(self, company: Company, data: CompanyUpdate) -> Company:
+    async def onboarding_summary(self, company_id: UUID) -> OnboardingSummary:
+        """Onboarding dashboard figures for a company, cached for a short TTL.
+
+        Every figure is a grouped aggregate; all of them are fetched by one
+        SELECT of scalar subqueries, i.e. one round trip and one plan.
+        """
+        cached = summary_cache.get(company_id)
+        if cached is not None:
+            return cached
+        row = (await self.uow.session.execute(onboarding_summary_query(company_id))).one()
+        summary = OnboardingSummary(
+            company_id=company_id,
+            assignments_by_status=_by_name(QuestAssignmentStatus, row.assignments_by_status),
+            overdue_assignments=row.overdue_assignments,
+            average_progress=float(row.average_progress or 0),
+            probation_by_status=_by_name(ProbationStatus, row.probation_by_status),
+            tasks_by_status=_by_name(ProbationTaskStatus, row.tasks_by_status),
+            overdue_tasks=row.overdue_tasks,
+            managers=[ManagerRollup(**m) for m in row.managers or ()],
+            generated_at=now(),
+        )
+        summary_cache.set(company_id, summary)
+        return summary
+
+    async def update(self, company: Company, data: CompanyUpdate) -> Company:
         """Update fields of an existing company."""
-        with self.uow as uow:
+        async with self.uow as uow:
             updates = data.model_dump(exclude_unset=True)
             for field, value in updates.items():
                 setattr(company, field, value)
-            uow.commit()
-            return company
\ No newline at end of file
+            await uow.commit()
+            # Режим регистрации и статус решают, принимают ли домены компании регистрацию
+            if updates.keys() & {"signup_mode", "status"}:
+                await verified_domains.refresh_company(uow.session, company.id)
+            return company
+
+
+def _by_name(enum: type, counts: dict[str, int] | None) -> dict:
+    # Enum-колонки хранят имена членов (ASSIGNED), схема отдаёт значения
+    return {enum[name]: n for name, n in (counts or {}).items()}
+
+
+def _counts_by(column, *criteria, join=None):
+    """Scalar subquery: JSON object {column value: row count} over the filtered rows."""
+    grouped = select(column.label("key"), func.count().label("n"))
+    if join is not None:
+        grouped = grouped.join(*join)
+    grouped = grouped.where(*criteria).group_by(column).subquery()
+    return select(
+        func.coalesce(func.json_object_agg(grouped.c.key, grouped.c.n), literal_column("'{}'::json"))
+    ).scalar_subquery()
+
+
+def onboarding_summary_query(company_id: UUID):
+    """One SELECT returning every onboarding dashboard aggregate of a company."""
+    in_company = QuestAssignment.membership_id == Membership.id
+    overdue = and_(QuestAssignment.completed_at.is_(None), QuestAssignment.due_at < func.now())
+    assignments = (
+        select(
+            func.count().filter(overdue).label("overdue"),
+            func.avg(QuestAssignment.progress_percent).label("average_progress"),
+        )
+        .join(Membership, in_company)
+        .where(Membership.company_id == company_id)
+        .subquery("assignments")
+    )
+    rollup = (
+        select(
+            Membership.manager_membership_id.label("manager_membership_id"),
+            func.count(Membership.id.distinct()).label("headcount"),
+            func.count(QuestAssignment.id).label("assignments"),
+            func.count(QuestAssignment.id).filter(
+                QuestAssignment.status == QuestAssignmentStatus.COMPLETED
+            ).label("completed"),
+            func.count(QuestAssignment.id).filter(overdue).label("overdue"),
+            func.coalesce(func.avg(QuestAssignment.progress_percent), 0).label("average_progress"),
+        )
+        .outerjoin(QuestAssignment, in_company)
+        .where(Membership.company_id == company_id, Membership.manager_membership_id.is_not(None))
+        .group_by(Membership.manager_membership_id)
+        .subquery("rollup")
+    )
+    return select(
+        _counts_by(
+            QuestAssignment.status, Membership.company_id == company_id, join=(Membership, in_company)
+        ).label("assignments_by_status"),
+        select(assignments.c.overdue).scalar_subquery().label("overdue_assignments"),
+        select(assignments.c.average_progress).scalar_subquery().label("average_progress"),
+        _counts_by(
+            Membership.probation_status,
+            Membership.company_id == company_id,
+            Membership.status == MembershipStatus.ACTIVE,
+        ).label("probation_by_status"),
+        _counts_by(ProbationTask.status, ProbationTask.company_id == company_id).label("tasks_by_status"),
+        select(func.count()).where(
+            ProbationTask.company_id == company_id,
+            ProbationTask.due_at < func.now(),
+            ProbationTask.status.in_([ProbationTaskStatus.TODO, ProbationTaskStatus.IN_PROGRESS]),
+        ).scalar_subquery().label("overdue_tasks"),
+        select(func.json_agg(literal_column("rollup"))).select_from(rollup).scalar_subquery().label("managers"),
+    )
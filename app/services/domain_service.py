@@ -6,6 +6,7 @@ from fastapi import HTTPException, status
 
 from app.services.base import UnitOfWork, GenericRepository
 from app.models.models import CompanyDomain
+from app.utils.domains import normalize_domain, verified_domains
 
 
 class DomainService:
@@ -15,22 +16,23 @@ class DomainService:
         self.uow = uow
         self._repo = GenericRepository[CompanyDomain](uow, CompanyDomain)
 
-    def add_domain(self, company_id: UUID, domain: str) -> CompanyDomain:
+    async def add_domain(self, company_id: UUID, domain: str) -> CompanyDomain:
         """Create a new domain entry with a verification token."""
-        with self.uow as uow:
+        async with self.uow as uow:
             token = uuid.uuid4().hex
             domain_obj = CompanyDomain(
                 company_id=company_id,
-                domain=domain,
+                domain=normalize_domain(domain),
                 verification_token=token
             )
             uow.session.add(domain_obj)
-            uow.commit()
+            await uow.commit()
+            await verified_domains.refresh_company(uow.session, company_id)
             return domain_obj
 
-    def verify_domain(self, domain_id: UUID, token: str) -> CompanyDomain:
+    async def verify_domain(self, domain_id: UUID, token: str) -> CompanyDomain:
         """Verify the domain by matching the token."""
-        domain_obj = self._repo.get(domain_id)
+        domain_obj = await self._repo.get(domain_id)
         if not domain_obj:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -41,7 +43,8 @@ class DomainService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid verification token"
             )
-        with self.uow as uow:
+        async with self.uow as uow:
             domain_obj.is_verified = True
-            uow.commit()
+            await uow.commit()
+            await verified_domains.refresh_company(uow.session, domain_obj.company_id)
             return domain_obj
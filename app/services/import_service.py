@@ -0,0 +1,362 @@
+from __future__ import annotations
+import csv
+import json
+from datetime import datetime
+from typing import IO, Iterable, Iterator
+from uuid import UUID, uuid4
+
+from pydantic import ValidationError
+from sqlalchemy import (
+    Boolean, Column, Integer, MetaData, String, Table, any_, delete, exists, false, func,
+    literal, literal_column, select, update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, Insert, insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.enums import GlobalRole, MembershipRole, MembershipStatus, ProbationStatus
+from app.models.models import LINE_RELATION, Membership, MembershipClosure, User, now
+from app.schemas.employee import EmployeeImportError, EmployeeImportResult, EmployeeImportRow
+from app.services.base import UnitOfWork
+from app.services.membership_service import rebuild_membership_closure
+from app.utils.security import identity_cache
+from app.utils.tokens import mark_claims_stale
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+# Ссылки на руководителей ждут второго прохода во временной таблице,
+# а не в памяти процесса; таблица исчезает вместе с транзакцией импорта
+_pending_managers = Table(
+    "import_pending_managers",
+    MetaData(),
+    Column("membership_id", PG_UUID(as_uuid=True), primary_key=True),
+    Column("email", String(255), nullable=False),
+    Column("manager_email", String(255), nullable=False),
+    Column("line", Integer, nullable=False),
+    Column("manager_id", PG_UUID(as_uuid=True)),
+    Column("cyclic", Boolean, nullable=False, server_default=false()),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+# Старшинство ролей: импорт не выдаёт роль выше своей и не трогает членства
+# старше себя; владельца импорт не меняет никогда
+ROLE_RANK = {
+    MembershipRole.APPLICANT: 0,
+    MembershipRole.EMPLOYEE: 1,
+    MembershipRole.MANAGER: 2,
+    MembershipRole.HR: 3,
+    MembershipRole.ADMIN: 4,
+    MembershipRole.OWNER: 5,
+}
+
+
+def manageable_roles(importer_role: MembershipRole) -> list[MembershipRole]:
+    """Roles an importer with ``importer_role`` may grant and overwrite (never OWNER)."""
+    return [
+        role for role, rank in ROLE_RANK.items()
+        if rank <= ROLE_RANK[importer_role] and role != MembershipRole.OWNER
+    ]
+
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[tuple[int, dict | str]]:
+    """Lazily yield ``(line, fields)`` of a CSV (with header) or NDJSON stream.
+
+    Records that cannot be parsed yield an error message instead of fields.
+    Empty CSV cells are left out, so the row takes the field's default.
+    """
+    if fmt == CSV:
+        reader = csv.DictReader(stream)
+        reader.fieldnames  # читает заголовок: line_num дальше — конец последней записи
+        line = reader.line_num + 1
+        for record in reader:
+            if None in record:
+                yield line, "Too many fields"
+            else:
+                yield line, {key.strip(): value.strip() for key, value in record.items() if value and value.strip()}
+            line = reader.line_num + 1
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            fields = json.loads(text)
+        except ValueError as exc:
+            yield line, f"Invalid JSON: {exc}"
+            continue
+        yield line, fields if isinstance(fields, dict) else "Expected a JSON object"
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in exc.errors())
+
+
+class EmployeeImportService:
+    """Bulk upsert of users and memberships from a streamed CSV/NDJSON file.
+
+    Rows are validated one by one and written in batches of
+    ``IMPORT_BATCH_SIZE`` with ``INSERT ... ON CONFLICT``, each batch under
+    its own savepoint, so a bad row or batch is reported without aborting
+    the import. Manager references are resolved in a second pass once every
+    row is in, which lets a file list reports before their managers. Memory
+    stays bounded by the batch size and ``IMPORT_MAX_ERRORS``.
+
+    Rows may not grant a role above ``importer_role``, and memberships whose
+    current role is above it are left alone.
+    """
+
+    def __init__(self, uow: UnitOfWork) -> None:
+        self.uow = uow
+
+    async def import_rows(
+        self,
+        company_id: UUID,
+        rows: Iterable[tuple[int, dict | str]],
+        importer_role: MembershipRole,
+        batch_size: int = settings.IMPORT_BATCH_SIZE,
+    ) -> EmployeeImportResult:
+        result = EmployeeImportResult()
+        manageable = manageable_roles(importer_role)
+        # Пользователи, чьи членства переписал импорт
+        stale_users: set[UUID] = set()
+        async with self.uow as uow:
+            session = uow.session
+            await session.run_sync(lambda s: _pending_managers.create(s.connection()))
+            # По email: повтор в пределах пачки заменяет прежнюю строку, как и между пачками
+            batch: dict[str, tuple[int, EmployeeImportRow]] = {}
+            for line, fields in rows:
+                if isinstance(fields, str):
+                    _error(result, line, None, fields)
+                    continue
+                try:
+                    row = EmployeeImportRow.model_validate(fields)
+                except ValidationError as exc:
+                    email = fields.get("email")
+                    _error(result, line, email if isinstance(email, str) else None, _describe(exc))
+                    continue
+                if row.role not in manageable:
+                    _error(result, line, row.email, f"Role {row.role.value} is above the importer's role")
+                    continue
+                batch.pop(row.email, None)
+                batch[row.email] = (line, row)
+                if len(batch) >= batch_size:
+                    await self._write_batch(session, company_id, list(batch.values()), manageable, result, stale_users)
+                    batch.clear()
+            if batch:
+                await self._write_batch(session, company_id, list(batch.values()), manageable, result, stale_users)
+            await self._link_managers(session, company_id, result)
+            await uow.commit()
+        # Core INSERT ... ON CONFLICT bypasses the ORM flush hook that keeps the identity cache fresh
+        for user_id in stale_users:
+            identity_cache.invalidate(str(user_id))
+        return result
+
+    async def _write_batch(
+        self,
+        session: AsyncSession,
+        company_id: UUID,
+        batch: list[tuple[int, EmployeeImportRow]],
+        manageable: list[MembershipRole],
+        result: EmployeeImportResult,
+        stale_users: set[UUID],
+    ) -> None:
+        try:
+            async with session.begin_nested():
+                counts = await _upsert(session, company_id, batch, manageable)
+        except DBAPIError as exc:
+            detail = f"Batch rejected by the database: {exc.orig or exc}"
+            for line, row in batch:
+                _error(result, line, row.email, detail)
+            return
+        created_users, created, updated, skipped, written_users = counts
+        stale_users.update(written_users)
+        result.users_created += created_users
+        result.memberships_created += created
+        result.memberships_updated += updated
+        for line, row in skipped:
+            _error(result, line, row.email, "The membership's current role is above the importer's")
+
+    async def _link_managers(self, session: AsyncSession, company_id: UUID, result: EmployeeImportResult) -> None:
+        """Second pass: point imported members at their managers, then rebuild the closure."""
+        members = Membership.__table__
+        pending = _pending_managers
+        await session.execute(
+            update(pending)
+            .where(
+                User.email == pending.c.manager_email,
+                members.c.user_id == User.id,
+                members.c.company_id == company_id,
+            )
+            .values(manager_id=members.c.id)
+        )
+        await session.execute(
+            update(members)
+            .where(members.c.id == pending.c.membership_id, pending.c.manager_id.is_not(None))
+            .values(manager_membership_id=pending.c.manager_id)
+        )
+        await session.run_sync(lambda s: rebuild_membership_closure(s.connection(), company_id))
+
+        # Ссылка, замыкающая цикл: руководитель оказался в поддереве сотрудника
+        closure = MembershipClosure.__table__
+        cyclic = await session.execute(
+            update(pending)
+            .where(exists().where(
+                closure.c.ancestor_id == pending.c.membership_id,
+                closure.c.descendant_id == pending.c.manager_id,
+                closure.c.relation == LINE_RELATION,
+            ))
+            .values(cyclic=True),
+            execution_options={"preserve_rowcount": True},
+        )
+        if cyclic.rowcount:
+            await session.execute(
+                update(members)
+                .where(members.c.id == pending.c.membership_id, pending.c.cyclic)
+                .values(manager_membership_id=None)
+            )
+            await session.run_sync(lambda s: rebuild_membership_closure(s.connection(), company_id))
+
+        unresolved = pending.c.manager_id.is_(None) | pending.c.cyclic
+        result.managers_linked = await session.scalar(
+            select(func.count()).select_from(pending).where(~unresolved)
+        )
+        failed = await session.execute(
+            select(pending.c.line, pending.c.email, pending.c.manager_email, pending.c.cyclic)
+            .where(unresolved)
+            .order_by(pending.c.line)
+            .limit(settings.IMPORT_MAX_ERRORS)
+        )
+        for line, email, manager_email, is_cyclic in failed:
+            detail = (
+                f"Manager {manager_email} would create a management cycle"
+                if is_cyclic
+                else f"Manager {manager_email} is not a member of the company"
+            )
+            _error(result, line, email, detail)
+        # Ошибки сверх лимита только считаем
+        total = await session.scalar(select(func.count()).select_from(pending).where(unresolved))
+        result.error_count += total - min(total, settings.IMPORT_MAX_ERRORS)
+
+
+def _error(result: EmployeeImportResult, line: int, email: str | None, detail: str) -> None:
+    result.error_count += 1
+    if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+        result.errors.append(EmployeeImportError(line=line, email=email, detail=detail))
+
+
+def membership_upsert(
+    company_id: UUID,
+    batch: list[tuple[int, EmployeeImportRow]],
+    user_ids: dict[str, UUID],
+    manageable: list[MembershipRole],
+    stamp: datetime,
+) -> Insert:
+    """INSERT ... ON CONFLICT of the batch's memberships, returning (id, user_id, inserted).
+
+    New memberships start ACTIVE; existing ones keep their status (reactivation
+    is a separate UPDATE) and are only overwritten while their current role
+    is in ``manageable``.
+    """
+    members = Membership.__table__
+    stmt = insert(members).values([
+        {
+            "id": uuid4(),
+            "user_id": user_ids[row.email],
+            "company_id": company_id,
+            "role": row.role,
+            "status": MembershipStatus.ACTIVE,
+            "employment_type": row.employment_type,
+            "probation_start_at": row.probation_start_at,
+            "probation_end_at": row.probation_end_at,
+            "probation_status": ProbationStatus.ONGOING,
+            "created_at": stamp,
+            "updated_at": stamp,
+        }
+        for _, row in batch
+    ])
+    return stmt.on_conflict_do_update(
+        constraint="uq_memberships_user_company",
+        set_={
+            "role": stmt.excluded.role,
+            # Пустые ячейки не затирают уже известные значения
+            "employment_type": func.coalesce(stmt.excluded.employment_type, members.c.employment_type),
+            "probation_start_at": func.coalesce(stmt.excluded.probation_start_at, members.c.probation_start_at),
+            "probation_end_at": func.coalesce(stmt.excluded.probation_end_at, members.c.probation_end_at),
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=members.c.role.in_(manageable),
+    ).returning(members.c.id, members.c.user_id, literal_column("xmax = 0").label("inserted"))
+
+
+async def _upsert(
+    session: AsyncSession,
+    company_id: UUID,
+    batch: list[tuple[int, EmployeeImportRow]],
+    manageable: list[MembershipRole],
+) -> tuple[int, int, int, list[tuple[int, EmployeeImportRow]], list[UUID]]:
+    """Write one batch; returns users created, memberships created/updated, skipped rows
+    and the users whose memberships were written."""
+    stamp = now()
+    emails = [row.email for _, row in batch]
+
+    users = User.__table__
+    created_users = set(await session.scalars(
+        insert(users)
+        .values([
+            {"id": uuid4(), "email": email, "global_role": GlobalRole.NONE, "created_at": stamp, "updated_at": stamp}
+            for email in emails
+        ])
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(users.c.id)
+    ))
+    user_ids = dict((await session.execute(
+        select(users.c.email, users.c.id).where(users.c.email == any_(literal(emails, ARRAY(String))))
+    )).all())
+
+    members = Membership.__table__
+    stmt = membership_upsert(company_id, batch, user_ids, manageable, stamp)
+    written = (await session.execute(stmt)).all()
+
+    membership_ids = {user_id: id for id, user_id, _ in written}
+    created = [id for id, _, inserted in written if inserted]
+    # Уволенных и приостановленных возвращает только явный reactivate в файле
+    reactivated = [
+        membership_ids[user_ids[row.email]]
+        for _, row in batch
+        if row.reactivate and user_ids[row.email] in membership_ids
+    ]
+    if reactivated:
+        await session.execute(
+            update(members)
+            .where(members.c.id.in_(reactivated), members.c.status != MembershipStatus.ACTIVE)
+            .values(status=MembershipStatus.ACTIVE, updated_at=stamp)
+        )
+    if created:
+        closure = MembershipClosure.__table__
+        await session.execute(closure.insert().values([
+            {"ancestor_id": id, "descendant_id": id, "depth": 0, "relation": LINE_RELATION} for id in created
+        ]))
+    # У уже существовавших пользователей могли быть токены со старыми членствами
+    existing = [user_id for user_id in membership_ids if user_id not in created_users]
+    await session.run_sync(lambda s: mark_claims_stale(s.connection(), *existing))
+
+    pending = _pending_managers
+    await session.execute(delete(pending).where(pending.c.membership_id.in_(membership_ids.values())))
+    links = [
+        {
+            "membership_id": membership_ids[user_ids[row.email]],
+            "email": row.email,
+            "manager_email": row.manager_email,
+            "line": line,
+        }
+        for line, row in batch
+        if row.manager_email and user_ids[row.email] in membership_ids
+    ]
+    if links:
+        await session.execute(insert(pending).values(links))
+
+    skipped = [(line, row) for line, row in batch if user_ids[row.email] not in membership_ids]
+    return len(created_users), len(created), len(written) - len(created), skipped, list(membership_ids)
@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 from typing import List
+from uuid import UUID
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import Connection, Subquery, any_, exists, func, literal, not_, select, union_all
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.base import UnitOfWork, GenericRepository
-from app.models.models import Membership, User
-from app.models.enums import MembershipRole, MembershipStatus
+from app.services.outbox_service import record_event
+from app.models.models import LINE_RELATION, Membership, MembershipClosure, MembershipManager, User
+from app.models.enums import EventType, MembershipRole, MembershipStatus
 from app.schemas.membership import MembershipCreate
 
 
@@ -19,28 +23,27 @@ class MembershipService:
         self.uow = uow
         self._repo = GenericRepository[Membership](uow, Membership)
 
-    def invite_user(
+    async def invite_user(
         self,
         email: str,
         role: MembershipRole,
         inviter: Membership
     ) -> Membership:
         """Invite an existing user to a company as a membership."""
-        with self.uow as uow:
-            user = uow.session.query(User).filter(User.email == email).first()
+        async with self.uow as uow:
+            user = await uow.session.scalar(select(User).where(User.email == email))
             if not user:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found",
                 )
             # Check if already a member
-            exists = (
-                uow.session.query(Membership)
-                .filter(
+            exists = await uow.session.scalar(
+                select(Membership)
+                .where(
                     Membership.user_id == user.id,
                     Membership.company_id == inviter.company_id
                 )
-                .first()
             )
             if exists:
                 raise HTTPException(
@@ -54,16 +57,23 @@ class MembershipService:
                 status=MembershipStatus.INVITED,
             )
             uow.session.add(member)
-            uow.commit()
+            await uow.session.flush()
+            record_event(uow.session, EventType.MEMBERSHIP_INVITED, member.id, {
+                "membership_id": member.id,
+                "user_id": user.id,
+                "role": role,
+                "invited_by_member": inviter.id,
+            }, company_id=inviter.company_id)
+            await uow.commit()
             return member
 
-    def activate_applicant(
+    async def activate_applicant(
         self,
         member: Membership,
         role: MembershipRole = MembershipRole.EMPLOYEE
     ) -> Membership:
         """Activate an applicant to become an employee or other role."""
-        with self.uow as uow:
+        async with self.uow as uow:
             if member.status != MembershipStatus.APPLICANT:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -71,21 +81,21 @@ class MembershipService:
                 )
             member.role = role
             member.status = MembershipStatus.ACTIVE
-            uow.commit()
+            await uow.commit()
             return member
 
-    def change_role(
+    async def change_role(
         self,
         member: Membership,
         new_role: MembershipRole
     ) -> Membership:
         """Change the membership's role."""
-        with self.uow as uow:
+        async with self.uow as uow:
             member.role = new_role
-            uow.commit()
+            await uow.commit()
             return member
 
-    def set_manager(
+    async def set_manager(
         self,
         member: Membership,
         manager: Membership
@@ -96,36 +106,201 @@ class MembershipService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Manager and member must belong to the same company",
             )
-        with self.uow as uow:
+        async with self.uow as uow:
+            if await self.is_in_chain(member, manager):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Manager cannot be the member or one of their subordinates",
+                )
             member.manager_membership_id = manager.id
-            uow.commit()
+            await uow.commit()
             return member
 
-    def get_subordinates(
+    async def is_in_chain(self, ancestor: Membership, member: Membership) -> bool:
+        """Whether ``ancestor`` is ``member`` itself or above it in the line hierarchy."""
+        return bool(
+            await self.uow.session.scalar(
+                select(
+                    exists().where(
+                        MembershipClosure.ancestor_id == ancestor.id,
+                        MembershipClosure.descendant_id == member.id,
+                        MembershipClosure.relation == LINE_RELATION,
+                    )
+                )
+            )
+        )
+
+    async def get_ancestors(self, member: Membership) -> List[Membership]:
+        """Return the management chain of a member, nearest manager first."""
+        return list(
+            await self.uow.session.scalars(
+                select(Membership)
+                .join(MembershipClosure, MembershipClosure.ancestor_id == Membership.id)
+                .where(
+                    MembershipClosure.descendant_id == member.id,
+                    MembershipClosure.relation == LINE_RELATION,
+                    MembershipClosure.depth > 0,
+                )
+                .order_by(MembershipClosure.depth)
+            )
+        )
+
+    async def get_subordinates(
         self,
         manager: Membership,
-        recursive: bool = True
+        recursive: bool = True,
+        *,
+        max_depth: int | None = None,
+        include_matrix: bool = False,
+        limit: int | None = None,
+        offset: int = 0,
     ) -> List[Membership]:
-        """Return direct or recursive subordinates of a manager."""
-        with self.uow as uow:
-            session: Session = uow.session  # type: ignore
-            if recursive:
-                subs: list[Membership] = []
-                stack: list[Membership] = [manager]
-                while stack:
-                    current = stack.pop()
-                    direct = (
-                        session.query(Membership)
-                        .filter(Membership.manager_membership_id == current.id)
-                        .all()
-                    )
-                    subs.extend(direct)
-                    stack.extend(direct)
-                # exclude the manager itself
-                return [m for m in subs if m.id != manager.id]
+        """Return direct or recursive subordinates of a manager.
+
+        Line subordinates are read from ``membership_closure`` with one indexed
+        query. With ``include_matrix`` the subtree is resolved by a recursive
+        CTE that also follows ``membership_managers`` links. Results are
+        ordered by depth for stable pagination.
+        """
+        if not recursive:
+            max_depth = 1
+        async with self.uow as uow:
+            session: AsyncSession = uow.session
+            if include_matrix:
+                subtree = subordinates_subquery(
+                    manager.id, max_depth=max_depth, include_matrix=True
+                )
             else:
-                return (
-                    session.query(Membership)
-                    .filter(Membership.manager_membership_id == manager.id)
-                    .all()
-                )
\ No newline at end of file
+                subtree = closure_subquery(manager.id, max_depth=max_depth)
+            stmt = (
+                select(Membership)
+                .join(subtree, Membership.id == subtree.c.id)
+                .order_by(subtree.c.depth, Membership.created_at, Membership.id)
+                .offset(offset)
+            )
+            if limit is not None:
+                stmt = stmt.limit(limit)
+            return list(await session.scalars(stmt))
+
+
+def closure_subquery(manager_id: UUID, *, max_depth: int | None = None) -> Subquery:
+    """Subquery of ``(id, depth)`` for every line subordinate, read from the closure table."""
+    stmt = (
+        select(
+            MembershipClosure.descendant_id.label("id"),
+            MembershipClosure.depth.label("depth"),
+        )
+        .where(
+            MembershipClosure.ancestor_id == manager_id,
+            MembershipClosure.relation == LINE_RELATION,
+            MembershipClosure.depth > 0,
+        )
+    )
+    if max_depth is not None:
+        stmt = stmt.where(MembershipClosure.depth <= max_depth)
+    return stmt.subquery("subtree")
+
+
+def _manager_edges(include_matrix: bool) -> Subquery:
+    """(member_id, manager_id) pairs of the line hierarchy, plus matrix links if requested."""
+    edges = (
+        select(
+            Membership.id.label("member_id"),
+            Membership.manager_membership_id.label("manager_id"),
+        )
+        .where(Membership.manager_membership_id.is_not(None))
+    )
+    if include_matrix:
+        edges = union_all(
+            edges,
+            select(MembershipManager.member_id, MembershipManager.manager_member_id),
+        )
+    return edges.subquery("edges")
+
+
+def subordinates_subquery(
+    manager_id: UUID,
+    *,
+    max_depth: int | None = None,
+    include_matrix: bool = False,
+) -> Subquery:
+    """Subquery of ``(id, depth)`` for every membership below ``manager_id``.
+
+    ``depth`` is the length of the shortest path from the manager (1 = direct report).
+    """
+    edges = _manager_edges(include_matrix)
+    tree = (
+        select(
+            edges.c.member_id.label("id"),
+            literal(1).label("depth"),
+            array([edges.c.manager_id, edges.c.member_id]).label("path"),
+        )
+        .where(edges.c.manager_id == manager_id)
+        .cte("subordinates", recursive=True)
+    )
+    step = (
+        select(
+            edges.c.member_id,
+            tree.c.depth + 1,
+            func.array_append(tree.c.path, edges.c.member_id),
+        )
+        .join(tree, edges.c.manager_id == tree.c.id)
+        # cycle detection: never revisit a node already on the path
+        .where(not_(edges.c.member_id == any_(tree.c.path)))
+    )
+    if max_depth is not None:
+        step = step.where(tree.c.depth < max_depth)
+    tree = tree.union_all(step)
+    return (
+        select(tree.c.id, func.min(tree.c.depth).label("depth"))
+        .group_by(tree.c.id)
+        .subquery("subtree")
+    )
+
+
+def rebuild_membership_closure(connection: Connection, company_id: UUID | None = None) -> int:
+    """Recompute ``membership_closure`` from ``manager_membership_id``.
+
+    Used to backfill existing data or repair drift after bulk writes that
+    bypass the ORM. Returns the number of rows written.
+    """
+    closure = MembershipClosure.__table__
+    members = select(Membership.id, Membership.manager_membership_id)
+    stale = closure.delete().where(closure.c.relation == LINE_RELATION)
+    if company_id is not None:
+        members = members.where(Membership.company_id == company_id)
+        stale = stale.where(
+            closure.c.descendant_id.in_(select(Membership.id).where(Membership.company_id == company_id))
+        )
+    members = members.subquery("m")
+
+    paths = (
+        select(
+            members.c.id.label("ancestor_id"),
+            members.c.id.label("descendant_id"),
+            literal(0).label("depth"),
+            array([members.c.id]).label("path"),
+        )
+        .cte("paths", recursive=True)
+    )
+    paths = paths.union_all(
+        select(
+            paths.c.ancestor_id,
+            members.c.id,
+            paths.c.depth + 1,
+            func.array_append(paths.c.path, members.c.id),
+        )
+        .join(paths, members.c.manager_membership_id == paths.c.descendant_id)
+        # guard against cycles that may exist in legacy data
+        .where(not_(members.c.id == any_(paths.c.path)))
+    )
+
+    connection.execute(stale)
+    result = connection.execute(
+        closure.insert().from_select(
+            ["ancestor_id", "descendant_id", "depth", "relation"],
+            select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth, literal(LINE_RELATION)),
+        ),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
@@ -0,0 +1,146 @@
+from __future__ import annotations
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable
+from uuid import UUID
+
+from pydantic_core import to_jsonable_python
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.enums import EventType
+from app.models.models import OutboxEvent, now
+from app.utils.metrics import OUTBOX_EVENTS
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[OutboxEvent], Awaitable[None]]
+
+
+class EventBus:
+    """In-process registry of outbox event handlers.
+
+    Delivery is at-least-once: an event is retried until every handler of
+    its type has succeeded in the same attempt, so handlers must be idempotent
+    (``event.id`` is a stable deduplication key).
+    """
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+
+    def subscribe(self, event_type: EventType) -> Callable[[Handler], Handler]:
+        def register(handler: Handler) -> Handler:
+            self._handlers[event_type.value].append(handler)
+            return handler
+        return register
+
+    async def dispatch(self, event: OutboxEvent) -> None:
+        for handler in self._handlers.get(event.event_type, ()):
+            await handler(event)
+
+
+event_bus = EventBus()
+
+
+def record_event(
+    session: AsyncSession,
+    event_type: EventType,
+    aggregate_id: UUID,
+    payload: dict[str, Any],
+    company_id: UUID | None = None,
+) -> OutboxEvent:
+    """Add an event to the outbox; it is written by the caller's commit, or not at all."""
+    event = OutboxEvent(
+        event_type=event_type.value,
+        aggregate_id=aggregate_id,
+        company_id=company_id,
+        payload=to_jsonable_python(payload),
+    )
+    session.add(event)
+    return event
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff after the ``attempts``-th failure, capped at an hour."""
+    return timedelta(seconds=min(2 ** attempts, 3600))
+
+
+async def relay_batch(session: AsyncSession, batch_size: int, bus: EventBus = event_bus) -> int:
+    """Dispatch one batch of due events in creation order; returns the batch size.
+
+    Rows are claimed with ``FOR UPDATE SKIP LOCKED``, so several relays can
+    run side by side. A failed event is retried later with backoff until
+    ``OUTBOX_MAX_ATTEMPTS``, then left in the table with its last error.
+    """
+    events = list(await session.scalars(
+        select(OutboxEvent)
+        .where(
+            OutboxEvent.published_at.is_(None),
+            OutboxEvent.available_at <= func.now(),
+            OutboxEvent.attempts < settings.OUTBOX_MAX_ATTEMPTS,
+        )
+        .order_by(OutboxEvent.available_at, OutboxEvent.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ))
+    for event in events:
+        try:
+            await bus.dispatch(event)
+        except Exception as exc:
+            event.attempts += 1
+            event.last_error = repr(exc)[:2000]
+            event.available_at = now() + retry_delay(event.attempts)
+            OUTBOX_EVENTS.labels(event.event_type, "failed").inc()
+            logger.warning("outbox event %s (%s) failed, attempt %d", event.id, event.event_type,
+                           event.attempts, exc_info=True)
+        else:
+            event.published_at = now()
+            OUTBOX_EVENTS.labels(event.event_type, "published").inc()
+    return len(events)
+
+
+async def relay_once(
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    batch_size: int | None = None,
+    bus: EventBus = event_bus,
+) -> int:
+    """Drain due events, one short transaction per batch; returns the number handled."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    total = 0
+    while True:
+        async with session_factory() as session:
+            n = await relay_batch(session, batch_size, bus)
+            await session.commit()
+        total += n
+        if n < batch_size:
+            return total
+
+
+async def run_outbox_relay(interval: float) -> None:
+    """Relay due events every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            await relay_once()
+        except Exception:
+            logger.exception("outbox relay tick failed")
+        await asyncio.sleep(interval)
+
+
+async def purge_published_events(session: AsyncSession, batch_size: int = 1000) -> int:
+    """Delete one batch of events published more than ``OUTBOX_RETENTION_HOURS`` ago."""
+    t = OutboxEvent.__table__
+    expired = (
+        select(t.c.id)
+        .where(t.c.published_at < func.now() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(t).where(t.c.id.in_(expired.scalar_subquery())),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
@@ -0,0 +1,60 @@
+from __future__ import annotations
+import asyncio
+import logging
+
+from sqlalchemy import Connection, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.db.partitions import REVIEWS, add_months, create_month_partitions, detach_month_partitions
+from app.db.session import async_engine
+from app.models.models import now
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки: одновременно обслуживает секции один процесс
+LOCK_KEY = 0x70617274
+
+
+def _maintain(connection: Connection) -> dict[str, list[str]]:
+    today = now().date()
+    result = {
+        "created": create_month_partitions(
+            connection, REVIEWS, today, add_months(today, settings.PARTITION_PREMAKE_MONTHS)
+        ),
+        "detached": [],
+    }
+    if settings.PROBATION_REVIEW_RETENTION_MONTHS > 0:
+        cutoff = add_months(today, -settings.PROBATION_REVIEW_RETENTION_MONTHS)
+        result["detached"] = detach_month_partitions(connection, REVIEWS, cutoff, concurrently=True)
+    return result
+
+
+async def maintain_partitions(engine: AsyncEngine = async_engine) -> dict[str, list[str]]:
+    """Pre-create the coming monthly partitions of probation_reviews and detach expired ones.
+
+    Runs on an autocommit connection, since ``DETACH ... CONCURRENTLY`` cannot
+    run inside a transaction, under an advisory lock: when another process
+    holds it this tick does nothing. Hash partitions need no upkeep.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not await conn.scalar(select(func.pg_try_advisory_lock(LOCK_KEY))):
+            return {"created": [], "detached": []}
+        try:
+            result = await conn.run_sync(_maintain)
+        finally:
+            await conn.execute(select(func.pg_advisory_unlock(LOCK_KEY)))
+    if result["created"] or result["detached"]:
+        logger.info("partitions created %s, detached %s", result["created"], result["detached"])
+    return result
+
+
+async def run_partition_maintenance(interval: float) -> None:
+    """Maintain partitions now and every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            await maintain_partitions()
+        except Exception:
+            logger.exception("partition maintenance failed")
+        await asyncio.sleep(interval)
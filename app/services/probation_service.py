@@ -1,14 +1,19 @@
 
 
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
+from uuid import UUID
 
 from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, Select, and_, case, func, literal, select, update
 
 from app.services.base import UnitOfWork, GenericRepository
+from app.services.outbox_service import record_event
 from app.models.models import ProbationTask, ProbationReview, Membership
-from app.models.enums import ReviewDecision, ProbationStatus, ProbationTaskStatus
+from app.models.enums import EventType, ReviewDecision, ProbationStatus, ProbationTaskStatus
+from app.schemas.task import ProbationChange, ProbationEvaluationReport
+from app.utils.security import identity_cache
 
 
 class ProbationService(GenericRepository[ProbationTask]):
@@ -18,7 +23,7 @@ class ProbationService(GenericRepository[ProbationTask]):
         super().__init__(uow, ProbationTask)
         self.uow = uow
 
-    def create_task(
+    async def create_task(
         self,
         creator: Membership,
         assignee: Membership,
@@ -28,7 +33,7 @@ class ProbationService(GenericRepository[ProbationTask]):
         due_at: datetime | None = None
     ) -> ProbationTask:
         """Create a probation task for an employee under probation period."""
-        with self.uow as uow:
+        async with self.uow as uow:
             task = ProbationTask(
                 company_id=creator.company_id,
                 created_by_member=creator.id,
@@ -39,10 +44,10 @@ class ProbationService(GenericRepository[ProbationTask]):
                 status=ProbationTaskStatus.TODO
             )
             uow.session.add(task)
-            uow.commit()
+            await uow.commit()
             return task
 
-    def review_task(
+    async def review_task(
         self,
         task: ProbationTask,
         reviewer: Membership,
@@ -56,7 +61,7 @@ class ProbationService(GenericRepository[ProbationTask]):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Task must be marked done before review"
             )
-        with self.uow as uow:
+        async with self.uow as uow:
             review = ProbationReview(
                 task_id=task.id,
                 reviewer_member=reviewer.id,
@@ -66,31 +71,111 @@ class ProbationService(GenericRepository[ProbationTask]):
                 created_at=datetime.utcnow(),
             )
             uow.session.add(review)
-            uow.commit()
+            await uow.session.flush()
+            record_event(uow.session, EventType.PROBATION_TASK_REVIEWED, task.id, {
+                "task_id": task.id,
+                "review_id": review.id,
+                "assigned_to_member": task.assigned_to_member,
+                "reviewer_member": reviewer.id,
+                "score": score,
+                "decision": decision,
+            }, company_id=task.company_id)
+            await uow.commit()
             return review
 
-    def evaluate_member(self, member: Membership) -> ProbationStatus:
+    async def evaluate_member(self, member: Membership) -> ProbationStatus:
         """Evaluate overall probation status based on tasks and reviews."""
-        with self.uow as uow:
-            # Load all tasks and associated reviews
-            tasks = (
-                uow.session.query(ProbationTask)
-                .filter(ProbationTask.assigned_to_member == member.id)
-                .all()
+        await self.evaluate_batch(Membership.id == member.id)
+        await self.uow.session.refresh(member, attribute_names=["probation_status"])
+        return member.probation_status
+
+    async def evaluate_company(
+        self,
+        company_id: UUID,
+        *,
+        probation_end_from: date | None = None,
+        probation_end_to: date | None = None,
+        dry_run: bool = False,
+    ) -> ProbationEvaluationReport:
+        """Evaluate every member of a company, optionally only those whose probation ends in a range."""
+        criteria = [Membership.company_id == company_id]
+        if probation_end_from is not None:
+            criteria.append(Membership.probation_end_at >= probation_end_from)
+        if probation_end_to is not None:
+            criteria.append(Membership.probation_end_at <= probation_end_to)
+        return await self.evaluate_batch(*criteria, dry_run=dry_run)
+
+    async def evaluate_batch(
+        self,
+        *criteria: ColumnElement[bool],
+        dry_run: bool = False,
+    ) -> ProbationEvaluationReport:
+        """Evaluate probation of all memberships matching ``criteria`` in one statement.
+
+        Rules, in order: any FAIL review → FAILED; all tasks DONE → PASSED;
+        any EXTEND review → EXTENDED; otherwise the status is kept. The
+        aggregate, the bulk UPDATE of changed rows and the diff report are a
+        single round trip; ``dry_run`` only computes the diff.
+        """
+        evaluation = probation_evaluation(*criteria).cte("evaluation")
+        columns = (evaluation.c.id, evaluation.c.old_status, evaluation.c.new_status)
+        if dry_run:
+            changed = evaluation.c.new_status != evaluation.c.old_status
+            stmt = select(*columns, changed.label("changed"), literal(None).label("user_id"))
+        else:
+            table = Membership.__table__
+            updated = (
+                update(table)
+                .where(table.c.id == evaluation.c.id, evaluation.c.new_status != evaluation.c.old_status)
+                .values(probation_status=evaluation.c.new_status)
+                .returning(table.c.id, table.c.user_id)
+                .cte("updated")
+            )
+            stmt = (
+                select(*columns, updated.c.id.is_not(None).label("changed"), updated.c.user_id)
+                .outerjoin(updated, updated.c.id == evaluation.c.id)
             )
-            all_reviews = []
-            for task in tasks:
-                all_reviews.extend(task.reviews)
+        async with self.uow as uow:
+            rows = (await uow.session.execute(stmt)).all()
+            await uow.commit()
+        changes = [row for row in rows if row.changed]
+        # Bulk UPDATE bypasses the ORM flush hook that keeps the identity cache fresh
+        for row in changes:
+            if row.user_id is not None:
+                identity_cache.invalidate(str(row.user_id))
+        return ProbationEvaluationReport(
+            evaluated=len(rows),
+            changed=[
+                ProbationChange(membership_id=row.id, old_status=row.old_status, new_status=row.new_status)
+                for row in changes
+            ],
+            dry_run=dry_run,
+        )
 
-            # If any review is a fail, probation failed
-            if any(r.decision == ReviewDecision.FAIL for r in all_reviews):
-                status = ProbationStatus.FAILED
-            # If all tasks done and no fail, passed
-            elif tasks and all(t.status == ProbationTaskStatus.DONE for t in tasks) and not any(r.decision == ReviewDecision.FAIL for r in all_reviews):
-                status = ProbationStatus.PASSED
-            else:
-                status = member.probation_status
 
-            member.probation_status = status
-            uow.commit()
-            return status
\ No newline at end of file
+def probation_evaluation(*criteria: ColumnElement[bool]) -> Select:
+    """Per-membership ``(id, old_status, new_status)`` from one aggregate over tasks and reviews."""
+    any_fail = func.bool_or(ProbationReview.decision == ReviewDecision.FAIL)
+    any_extend = func.bool_or(ProbationReview.decision == ReviewDecision.EXTEND)
+    tasks = func.count(ProbationTask.id.distinct())
+    done = func.count(ProbationTask.id.distinct()).filter(ProbationTask.status == ProbationTaskStatus.DONE)
+    status_type = Membership.__table__.c.probation_status.type
+    new_status = case(
+        (any_fail.is_(True), literal(ProbationStatus.FAILED, status_type)),
+        (and_(tasks > 0, done == tasks), literal(ProbationStatus.PASSED, status_type)),
+        (any_extend.is_(True), literal(ProbationStatus.EXTENDED, status_type)),
+        else_=Membership.probation_status,
+    )
+    return (
+        select(
+            Membership.id.label("id"),
+            Membership.probation_status.label("old_status"),
+            new_status.label("new_status"),
+        )
+        .outerjoin(ProbationTask, ProbationTask.assigned_to_member == Membership.id)
+        # Без условия на created_at: у задач, созданных до ревизии c5c299a2d49d,
+        # это момент миграции, и более ранние отзывы пропали бы из оценки
+        .outerjoin(ProbationReview, ProbationReview.task_id == ProbationTask.id)
+        .where(*criteria)
+        .group_by(Membership.id)
+    )
\ No newline at end of file
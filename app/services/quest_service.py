@@ -1,18 +1,65 @@
 from __future__ import annotations
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Sequence
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    ColumnElement, Connection, Integer, Interval, Numeric, Text, Update,
+    and_, any_, case, cast, exists, func, literal, or_, select, update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
 from app.services.base import UnitOfWork, GenericRepository
-from app.models.models import Quest, QuestStep, QuestAssignment, QuestStepSubmission, Membership
+from app.services.membership_service import closure_subquery
+from app.services.outbox_service import record_event
+from app.models.models import (
+    Company, Quest, QuestStep, QuestAssignment, QuestStepSubmission, QuestVersion, Membership,
+    assignment_duration_days, now,
+)
 from app.schemas.quest import (
-    QuestCreate, QuestUpdate,
-    QuestStepCreate, QuestStepUpdate,
+    QuestCreate, QuestDetail, QuestRead, QuestSnapshot, QuestUpdate,
+    QuestStepCreate, QuestStepRead, QuestStepUpdate,
     QuestAssignmentCreate,
+    QuestBulkAssignCreate, QuestBulkAssignResult,
     QuestStepSubmissionUpdate
 )
-from app.models.enums import QuestStatus, StepSubmissionStatus
+from app.models.enums import EventType, MembershipStatus, QuestAssignmentStatus, QuestStatus, StepSubmissionStatus
+from app.utils.cache import TTLCache
+from app.utils.etag import strong_etag
+
+
+# Назначения, которым ещё нужно раздавать новые шаги
+LIVE_ASSIGNMENT_STATUSES = (
+    QuestAssignmentStatus.ASSIGNED,
+    QuestAssignmentStatus.IN_PROGRESS,
+    QuestAssignmentStatus.OVERDUE,
+)
+
+
+
+@dataclass(frozen=True)
+class QuestDocument:
+    """Serialized ``QuestDetail`` of one quest version, ready to send."""
+    version: datetime
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_snapshot(cls, version_id: UUID, published_at: datetime, snapshot: str) -> QuestDocument:
+        # Версии неизменяемы: id версии — готовый сильный ETag
+        return cls(version=published_at, body=snapshot.encode(), etag=f'"{version_id}"')
+
+
+# Опубликованные квесты со шагами; запись годна, пока совпадает updated_at
+quest_cache: TTLCache[UUID, QuestDocument] = TTLCache(
+    maxsize=settings.QUEST_CACHE_MAX_SIZE, ttl=settings.QUEST_CACHE_TTL_SECONDS
+)
 
 
 class QuestService(GenericRepository[Quest]):
@@ -22,69 +69,567 @@ class QuestService(GenericRepository[Quest]):
         super().__init__(uow, Quest)
         self.uow = uow
 
-    def create(self, data: QuestCreate, creator: Membership) -> Quest:
+    async def create(self, data: QuestCreate, creator: Membership) -> Quest:
         """Create a new quest template."""
-        with self.uow as uow:
+        async with self.uow as uow:
             quest = Quest(**data.model_dump(), created_by_member=creator.id)
             uow.session.add(quest)
-            uow.commit()
+            if quest.status == QuestStatus.PUBLISHED:
+                # Создан сразу опубликованным — пишем первую версию
+                await uow.session.flush()
+                await write_version(uow.session, quest)
+            await uow.commit()
             return quest
 
-    def update(self, quest: Quest, data: QuestUpdate) -> Quest:
-        """Update fields of an existing quest."""
-        with self.uow as uow:
-            updates = data.model_dump(exclude_unset=True)
-            for field, value in updates.items():
-                setattr(quest, field, value)
-            uow.commit()
-            return quest
+    async def update(self, quest: Quest, data: QuestUpdate) -> Quest:
+        """Update fields of an existing quest.
 
-    def publish(self, quest: Quest) -> Quest:
-        """Publish a draft quest."""
-        if quest.status != QuestStatus.DRAFT:
+        The quest row is the working copy: editing a published quest turns it
+        back into a draft, while assignments keep their pinned version until
+        the next ``publish``.
+        """
+        updates = data.model_dump(exclude_unset=True)
+        if updates.get("status") == QuestStatus.PUBLISHED:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only draft quests can be published"
+                detail="Use the publish endpoint to publish a quest"
             )
-        with self.uow as uow:
-            quest.status = QuestStatus.PUBLISHED
-            uow.commit()
-            return quest
+        async with self.uow as uow:
+            for field, value in updates.items():
+                setattr(quest, field, value)
+            if updates and quest.status == QuestStatus.PUBLISHED:
+                quest.status = QuestStatus.DRAFT
+            await uow.commit()
+        quest_cache.invalidate(quest.id)
+        return quest
+
+    async def add_step(self, quest: Quest, data: QuestStepCreate) -> QuestStep:
+        """Add a step to a quest.
+
+        Pending submissions for existing assignments are created by
+        ``fan_out_step``, which the caller schedules as a background job.
+        """
+        async with self.uow as uow:
+            taken = await uow.session.scalar(
+                select(exists().where(
+                    QuestStep.quest_id == quest.id,
+                    QuestStep.sort_order == data.sort_order,
+                ))
+            )
+            if taken:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="A step with this sort_order already exists"
+                )
+            step = QuestStep(**data.model_dump(exclude={"quest_id"}), quest_id=quest.id)
+            uow.session.add(step)
+            # Шаги — часть документа квеста: двигаем его версию
+            quest.updated_at = now()
+            if quest.status == QuestStatus.PUBLISHED:
+                quest.status = QuestStatus.DRAFT
+            await uow.commit()
+        quest_cache.invalidate(quest.id)
+        return step
+
+    async def publish(self, quest: Quest) -> Quest:
+        """Publish a draft quest as its next immutable version.
 
-    def assign_quest(
+        New assignments pin that version; existing ones keep theirs.
+        """
+        async with self.uow as uow:
+            # Lock the row so concurrent publishes cannot take the same version number
+            await uow.session.refresh(quest, with_for_update=True)
+            if quest.status != QuestStatus.DRAFT:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Only draft quests can be published"
+                )
+            await write_version(uow.session, quest)
+            await uow.commit()
+        quest_cache.invalidate(quest.id)
+        return quest
+
+    async def version_document(self, version_id: UUID) -> QuestDocument | None:
+        """A published version as stored: one primary-key lookup, no serialisation."""
+        row = (await self.uow.session.execute(
+            select(QuestVersion.id, QuestVersion.published_at, cast(QuestVersion.snapshot, Text))
+            .where(QuestVersion.id == version_id)
+        )).first()
+        return QuestDocument.from_snapshot(*row) if row else None
+
+    async def assignment_document(self, assignment_id: UUID) -> QuestDocument | None:
+        """The quest version an assignment is pinned to, or None if there is no such assignment.
+
+        Assignments made before versioning follow the live quest.
+        """
+        row = (await self.uow.session.execute(
+            select(
+                QuestAssignment.quest_id,
+                QuestVersion.id,
+                QuestVersion.published_at,
+                cast(QuestVersion.snapshot, Text),
+            )
+            .outerjoin(QuestVersion, QuestVersion.id == QuestAssignment.quest_version_id)
+            .where(QuestAssignment.id == assignment_id)
+        )).first()
+        if row is None:
+            return None
+        quest_id, version_id, published_at, snapshot = row
+        if version_id is None:
+            return await self.document(quest_id)
+        return QuestDocument.from_snapshot(version_id, published_at, snapshot)
+
+    async def document(self, quest_id: UUID) -> QuestDocument | None:
+        """The quest with its steps as a serialized ``QuestDetail``, or None.
+
+        Published quests are served from ``quest_cache`` after a primary-key
+        probe of ``updated_at``, so a stale entry (e.g. written by another
+        process) is never returned. Drafts are always rebuilt.
+        """
+        session = self.uow.session
+        version = await session.scalar(select(Quest.updated_at).where(Quest.id == quest_id))
+        if version is None:
+            return None
+        cached = quest_cache.get(quest_id)
+        if cached is not None and cached.version == version:
+            return cached
+        quest = await session.scalar(
+            select(Quest)
+            .options(selectinload(Quest.steps))
+            .where(Quest.id == quest_id)
+            .execution_options(populate_existing=True)
+        )
+        if quest is None:
+            return None
+        body = QuestDetail.model_validate(quest).model_dump_json().encode()
+        document = QuestDocument(version=quest.updated_at, body=body, etag=strong_etag(body))
+        if quest.status == QuestStatus.PUBLISHED:
+            quest_cache.set(quest_id, document)
+        return document
+
+    async def assign_quest(
         self,
         data: QuestAssignmentCreate,
         assigned_by: Membership | None = None
     ) -> QuestAssignment:
         """Assign a quest to a member, auto-calculating due date."""
-        with self.uow as uow:
+        async with self.uow as uow:
+            duplicate = await uow.session.scalar(
+                select(exists().where(
+                    QuestAssignment.quest_id == data.quest_id,
+                    QuestAssignment.membership_id == data.membership_id,
+                ))
+            )
+            if duplicate:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Quest is already assigned to this member"
+                )
             assignment = QuestAssignment(**data.model_dump())
             assignment.assigned_by_member = assigned_by.id if assigned_by else None
+            quest = (await uow.session.execute(
+                select(Quest.current_version_id, Quest.company_id).where(Quest.id == data.quest_id)
+            )).one_or_none()
+            if quest is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Quest not found"
+                )
+            version_id, company_id = quest
+            assignment.quest_version_id = version_id
             uow.session.add(assignment)
             # due_at is set by model event listener
-            uow.commit()
+            await uow.session.flush()
+            await uow.session.execute(
+                materialise_submissions(QuestAssignment.id == assignment.id)
+            )
+            completed = await complete_empty_assignments(uow.session, QuestAssignment.id == assignment.id)
+            # Счётчики и статус выставил SQL выше — перечитываем строку
+            await uow.session.refresh(assignment)
+            event = {
+                "assignment_id": assignment.id,
+                "quest_id": assignment.quest_id,
+                "membership_id": assignment.membership_id,
+            }
+            record_event(uow.session, EventType.QUEST_ASSIGNED, assignment.id, {
+                **event,
+                "quest_version_id": version_id,
+                "due_at": assignment.due_at,
+            }, company_id=company_id)
+            if completed:
+                record_event(uow.session, EventType.QUEST_COMPLETED, assignment.id, event, company_id=company_id)
+            await uow.commit()
             return assignment
 
-    def complete_step(
+    async def assign_bulk(
+        self,
+        quest: Quest,
+        data: QuestBulkAssignCreate,
+        assigned_by: Membership | None = None
+    ) -> QuestBulkAssignResult:
+        """Assign a quest to a cohort with one INSERT ... SELECT.
+
+        due_at is computed in SQL for every row; members that already have the
+        quest are skipped by the unique constraint and reported back.
+        """
+        if data.membership_ids is None and not data.model_dump(
+            exclude={"membership_ids", "override_duration_days"}, exclude_none=True
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Provide membership_ids or at least one filter"
+            )
+        members = select(Membership.id).where(
+            Membership.company_id == quest.company_id,
+            Membership.status == MembershipStatus.ACTIVE,
+        )
+        if data.membership_ids is not None:
+            members = members.where(Membership.id.in_(data.membership_ids))
+        if data.role is not None:
+            members = members.where(Membership.role == data.role)
+        if data.manager_membership_id is not None:
+            subtree = closure_subquery(data.manager_membership_id)
+            members = members.where(Membership.id.in_(select(subtree.c.id)))
+        if data.probation_start_from is not None:
+            members = members.where(Membership.probation_start_at >= data.probation_start_from)
+        if data.probation_start_to is not None:
+            members = members.where(Membership.probation_start_at <= data.probation_start_to)
+
+        table = QuestAssignment.__table__
+        assigned_at = now()
+        days = assignment_duration_days(data.override_duration_days, literal(quest.duration_days, Integer))
+        rows = (
+            select(
+                func.gen_random_uuid(),
+                literal(quest.id),
+                literal(quest.current_version_id, table.c.quest_version_id.type),
+                Membership.id,
+                literal(assigned_by.id if assigned_by else None, table.c.assigned_by_member.type),
+                literal(data.override_duration_days, Integer),
+                literal(assigned_at),
+                literal(assigned_at) + days * literal(timedelta(days=1), Interval),
+                literal(QuestAssignmentStatus.ASSIGNED, table.c.status.type),
+                literal(0),
+            )
+            .join(Company, Company.id == Membership.company_id)
+            .where(Membership.id.in_(members))
+        )
+        stmt = (
+            insert(table)
+            .from_select(
+                ["id", "quest_id", "quest_version_id", "membership_id", "assigned_by_member", "override_duration_days",
+                 "assigned_at", "due_at", "status", "progress_percent"],
+                rows,
+            )
+            .on_conflict_do_nothing(constraint="uq_quest_assignments_quest_member")
+            .returning(table.c.id, table.c.membership_id, table.c.due_at)
+        )
+        async with self.uow as uow:
+            candidates = set(await uow.session.scalars(members))
+            inserted = (await uow.session.execute(stmt)).all()
+            assigned = {membership_id for _, membership_id, _ in inserted}
+            completed: set[UUID] = set()
+            if inserted:
+                new_assignments = QuestAssignment.id == any_(
+                    literal([id for id, _, _ in inserted], ARRAY(PG_UUID(as_uuid=True)))
+                )
+                await uow.session.execute(materialise_submissions(new_assignments))
+                completed = await complete_empty_assignments(uow.session, new_assignments)
+            for id, membership_id, due_at in inserted:
+                event = {"assignment_id": id, "quest_id": quest.id, "membership_id": membership_id}
+                record_event(uow.session, EventType.QUEST_ASSIGNED, id, {
+                    **event,
+                    "quest_version_id": quest.current_version_id,
+                    "due_at": due_at,
+                }, company_id=quest.company_id)
+                if id in completed:
+                    record_event(uow.session, EventType.QUEST_COMPLETED, id, event, company_id=quest.company_id)
+            await uow.commit()
+        return QuestBulkAssignResult(
+            assigned=sorted(assigned),
+            skipped=sorted(candidates - assigned),
+            not_found=sorted(set(data.membership_ids or ()) - candidates),
+        )
+
+    async def complete_step(
         self,
         submission: QuestStepSubmission,
         data: QuestStepSubmissionUpdate
     ) -> QuestStepSubmission:
-        """Submit or approve a quest step."""
-        with self.uow as uow:
+        """Submit or approve a quest step.
+
+        The assignment's approved counter, progress, status and completed_at
+        are moved in the same transaction by one atomic UPDATE.
+        """
+        async with self.uow as uow:
+            # Lock the row so concurrent reviews count a transition only once
+            await uow.session.refresh(submission, with_for_update=True)
+            was_approved = submission.status == StepSubmissionStatus.APPROVED
             updates = data.model_dump(exclude_unset=True)
             for field, value in updates.items():
                 setattr(submission, field, value)
             submission.submitted_at = datetime.utcnow()
             if submission.status == StepSubmissionStatus.APPROVED:
                 submission.reviewed_at = datetime.utcnow()
-            uow.commit()
+            required = await uow.session.scalar(
+                select(QuestStep.required).where(QuestStep.id == submission.quest_step_id)
+            )
+            delta = int(submission.status == StepSubmissionStatus.APPROVED) - int(was_approved)
+            table = QuestAssignment.__table__
+            assignment_id, membership_id, quest_id, company_id, assignment_status = (await uow.session.execute(
+                advance_assignment(submission.quest_assignment_id, delta if required else 0)
+                .returning(
+                    table.c.id, table.c.membership_id, table.c.quest_id,
+                    select(Quest.company_id).where(Quest.id == table.c.quest_id).scalar_subquery(),
+                    table.c.status,
+                )
+            )).one()
+            event = {
+                "assignment_id": assignment_id,
+                "quest_id": quest_id,
+                "membership_id": membership_id,
+            }
+            record_event(uow.session, EventType.QUEST_STEP_UPDATED, submission.id, {
+                **event,
+                "submission_id": submission.id,
+                "quest_step_id": submission.quest_step_id,
+                "status": submission.status,
+            }, company_id=company_id)
+            # Завершило квест именно это одобрение
+            if delta > 0 and required and assignment_status == QuestAssignmentStatus.COMPLETED:
+                record_event(uow.session, EventType.QUEST_COMPLETED, assignment_id, event, company_id=company_id)
+            await uow.commit()
             return submission
 
-    def compute_progress(self, assignment: QuestAssignment) -> float:
-        """Compute completion percentage for a quest assignment."""
-        total = len(assignment.submissions)
-        if total == 0:
-            return 0.0
-        completed = sum(1 for s in assignment.submissions if s.status == StepSubmissionStatus.APPROVED)
-        return (completed / total) * 100.0
+    async def compute_progress(self, assignment: QuestAssignment) -> float:
+        """Completion percentage of a quest assignment (maintained by complete_step)."""
+        await self.uow.session.refresh(assignment, attribute_names=["progress_percent"])
+        return float(assignment.progress_percent)
+
+
+def build_version(quest: Quest, steps: Sequence[QuestStep], number: int) -> QuestVersion:
+    """Version ``number`` of ``quest`` with its ``steps`` (in ``sort_order``) serialised.
+
+    The snapshot already shows the quest as published under this version.
+    """
+    version = QuestVersion(
+        id=uuid4(),
+        quest_id=quest.id,
+        version=number,
+        step_ids=[step.id for step in steps],
+        published_at=now(),
+    )
+    fields = QuestRead.model_validate(quest).model_dump()
+    fields.update(
+        status=QuestStatus.PUBLISHED,
+        current_version_id=version.id,
+        updated_at=version.published_at,
+    )
+    version.snapshot = QuestSnapshot(
+        **fields,
+        steps=[QuestStepRead.model_validate(step) for step in steps],
+        version_id=version.id,
+        version=number,
+        published_at=version.published_at,
+    ).model_dump(mode="json")
+    return version
+
+
+async def write_version(session: AsyncSession, quest: Quest) -> QuestVersion:
+    """Insert the next version of ``quest`` and make it current.
+
+    The caller holds the quest row (lock or fresh insert) and commits.
+    """
+    steps = list(await session.scalars(
+        select(QuestStep).where(QuestStep.quest_id == quest.id).order_by(QuestStep.sort_order)
+    ))
+    latest = await session.scalar(
+        select(func.max(QuestVersion.version)).where(QuestVersion.quest_id == quest.id)
+    )
+    version = build_version(quest, steps, (latest or 0) + 1)
+    session.add(version)
+    # Версия должна существовать до того, как на неё сошлётся quests.current_version_id
+    await session.flush()
+    quest.status = QuestStatus.PUBLISHED
+    quest.current_version_id = version.id
+    quest.updated_at = version.published_at
+    return version
+
+
+def _progress(required: ColumnElement[int], approved: ColumnElement[int]) -> ColumnElement:
+    return case((required > 0, func.round(cast(approved * 100, Numeric) / required, 2)), else_=0)
+
+
+def advance_assignment(assignment_id: UUID, approved_delta: int) -> Update:
+    """Atomic UPDATE moving an assignment's approved counter by ``approved_delta``.
+
+    Recomputes progress_percent and moves status ASSIGNED → IN_PROGRESS →
+    COMPLETED (and back when an approval is revoked), stamping completed_at.
+    """
+    table = QuestAssignment.__table__
+    approved = table.c.approved_steps_count + approved_delta
+    required = table.c.required_steps_count
+    done = and_(required > 0, approved >= required)
+    status_type = table.c.status.type
+    return (
+        update(table)
+        .where(table.c.id == assignment_id)
+        .values(
+            approved_steps_count=approved,
+            progress_percent=_progress(required, approved),
+            status=case(
+                (done, literal(QuestAssignmentStatus.COMPLETED, status_type)),
+                (
+                    table.c.status.in_([QuestAssignmentStatus.ASSIGNED, QuestAssignmentStatus.COMPLETED]),
+                    literal(QuestAssignmentStatus.IN_PROGRESS, status_type),
+                ),
+                else_=table.c.status,
+            ),
+            completed_at=case((done, func.coalesce(table.c.completed_at, func.now())), else_=None),
+        )
+    )
+
+
+def materialise_submissions(*criteria: ColumnElement[bool]) -> Update:
+    """Create a pending submission for every (assignment, step) pair, in one statement.
+
+    ``criteria`` filter the joined ``QuestAssignment`` × ``QuestStep`` rows;
+    an assignment pinned to a version only pairs with that version's steps,
+    and pairs that already have a submission are skipped. The INSERT runs as a
+    CTE whose output bumps ``required_steps_count`` (and progress) of the
+    affected assignments.
+    """
+    table = QuestStepSubmission.__table__
+    pairs = (
+        select(
+            func.gen_random_uuid(),
+            QuestAssignment.id,
+            QuestStep.id,
+            literal(StepSubmissionStatus.PENDING, table.c.status.type),
+            literal(now()),
+        )
+        .join(QuestStep, QuestStep.quest_id == QuestAssignment.quest_id)
+        .outerjoin(QuestVersion, QuestVersion.id == QuestAssignment.quest_version_id)
+        .where(
+            or_(QuestVersion.id.is_(None), QuestStep.id == any_(QuestVersion.step_ids)),
+            *criteria,
+        )
+    )
+    inserted = (
+        insert(table)
+        .from_select(["id", "quest_assignment_id", "quest_step_id", "status", "created_at"], pairs)
+        .on_conflict_do_nothing(constraint="uq_submission_unique")
+        .returning(table.c.quest_assignment_id, table.c.quest_step_id)
+        .cte("inserted")
+    )
+    added = (
+        select(inserted.c.quest_assignment_id, func.count().label("n"))
+        .join(QuestStep, QuestStep.id == inserted.c.quest_step_id)
+        .where(QuestStep.required)
+        .group_by(inserted.c.quest_assignment_id)
+        .subquery("added")
+    )
+    assignments = QuestAssignment.__table__
+    required = assignments.c.required_steps_count + added.c.n
+    return (
+        update(assignments)
+        .where(assignments.c.id == added.c.quest_assignment_id)
+        .values(
+            required_steps_count=required,
+            progress_percent=_progress(required, assignments.c.approved_steps_count),
+        )
+    )
+
+
+async def complete_empty_assignments(session: AsyncSession, *criteria: ColumnElement[bool]) -> set[UUID]:
+    """Complete fresh assignments that have no required steps; returns their ids.
+
+    ``advance_assignment`` only completes on an approval, and a quest without
+    required steps never gets one. Run after ``materialise_submissions``.
+    """
+    table = QuestAssignment.__table__
+    return set(await session.scalars(
+        update(table)
+        .where(
+            table.c.required_steps_count == 0,
+            table.c.status == QuestAssignmentStatus.ASSIGNED,
+            *criteria,
+        )
+        .values(
+            status=QuestAssignmentStatus.COMPLETED,
+            progress_percent=100,
+            completed_at=func.now(),
+        )
+        .returning(table.c.id)
+    ))
+
+
+def recount_assignment_progress(connection: Connection, quest_id: UUID | None = None) -> int:
+    """Recompute step counters and progress_percent from submissions.
+
+    Used to backfill existing assignments or repair drift after writes that
+    bypass QuestService. Status is left alone. Returns the number of rows updated.
+    """
+    counts = (
+        select(
+            QuestStepSubmission.quest_assignment_id.label("id"),
+            func.count().label("required"),
+            func.count().filter(QuestStepSubmission.status == StepSubmissionStatus.APPROVED).label("approved"),
+        )
+        .join(QuestStep, QuestStep.id == QuestStepSubmission.quest_step_id)
+        .where(QuestStep.required)
+        .group_by(QuestStepSubmission.quest_assignment_id)
+        .subquery("counts")
+    )
+    table = QuestAssignment.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == counts.c.id)
+        .values(
+            required_steps_count=counts.c.required,
+            approved_steps_count=counts.c.approved,
+            progress_percent=_progress(counts.c.required, counts.c.approved),
+        )
+    )
+    if quest_id is not None:
+        stmt = stmt.where(table.c.quest_id == quest_id)
+    return connection.execute(stmt, execution_options={"preserve_rowcount": True}).rowcount
+
+
+async def fan_out_step(step_id: UUID, batch_size: int = 1000) -> int:
+    """Background job: create pending submissions of a new step for live assignments.
+
+    Only assignments that follow the live quest (made before versioning) get
+    the step; pinned ones keep the steps of their version.
+
+    Walks assignments in id order, one short transaction per batch, so a
+    quest with many assignees never holds a long lock. Returns the number of
+    assignments visited.
+    """
+    visited = 0
+    last_id: UUID | None = None
+    while True:
+        async with AsyncSessionLocal() as session:
+            batch = (
+                select(QuestAssignment.id)
+                .join(QuestStep, QuestStep.quest_id == QuestAssignment.quest_id)
+                .where(
+                    QuestStep.id == step_id,
+                    QuestAssignment.status.in_(LIVE_ASSIGNMENT_STATUSES),
+                    QuestAssignment.quest_version_id.is_(None),
+                )
+                .order_by(QuestAssignment.id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                batch = batch.where(QuestAssignment.id > last_id)
+            ids = list(await session.scalars(batch))
+            if not ids:
+                return visited
+            await session.execute(materialise_submissions(
+                QuestStep.id == step_id,
+                QuestAssignment.id == any_(literal(ids, ARRAY(PG_UUID(as_uuid=True)))),
+            ))
+            await session.commit()
+            visited += len(ids)
+            last_id = ids[-1]
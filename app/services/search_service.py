@@ -0,0 +1,145 @@
+from __future__ import annotations
+import base64
+import json
+import re
+from typing import Iterable
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import Float, Select, String, cast, func, literal, null, or_, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from app.models.enums import MembershipStatus, SearchKind
+from app.models.models import Membership, ProbationTask, Quest, QuestStep, User
+from app.schemas.search import SearchHit
+from app.services.base import UnitOfWork
+
+# Длинные запросы режем: каждое слово — ещё одно условие в tsquery
+MAX_TERMS = 8
+# Нормализация ts_rank_cd: rank / (rank + 1), чтобы ранги документов, как и similarity, лежали в [0, 1)
+RANK_NORMALIZATION = 32
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def prefix_tsquery(q: str) -> str | None:
+    """``to_tsquery`` text matching every word of ``q`` as a prefix, or None without words.
+
+    Only letters and digits survive, so user input never reaches tsquery syntax.
+    """
+    words = _WORD.findall(q.lower())[:MAX_TERMS]
+    return " & ".join(f"{word}:*" for word in words) or None
+
+
+def encode_search_cursor(rank: float, kind: SearchKind, id: UUID) -> str:
+    """Opaque keyset cursor for the ``(rank desc, kind, id)`` position of a hit."""
+    raw = json.dumps([rank, kind.value, str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, str, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, kind, id = json.loads(raw)
+        return float(rank), SearchKind(kind).value, UUID(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+class SearchService:
+    """Tenant-scoped ranked search over quests, steps, probation tasks and people.
+
+    Documents match on their stored ``search_vector`` (GIN) with a prefix
+    tsquery and rank by ``ts_rank_cd``; people match on email through the
+    trigram index (substring or fuzzy word match) and rank by
+    ``word_similarity``. Every branch applies the keyset cursor and the page
+    limit itself, so only the top of each branch is merged.
+    """
+
+    def __init__(self, uow: UnitOfWork) -> None:
+        self.uow = uow
+
+    async def search(
+        self,
+        company_id: UUID,
+        q: str,
+        kinds: Iterable[SearchKind] | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+    ) -> tuple[list[SearchHit], str | None]:
+        q = q.strip()
+        if not q:
+            return [], None
+        kinds = set(kinds or SearchKind)
+        after = decode_search_cursor(cursor) if cursor else None
+        tsquery = prefix_tsquery(q)
+
+        branches: list[Select] = []
+        if tsquery:
+            query = func.to_tsquery("simple", tsquery)
+            if SearchKind.QUEST in kinds:
+                branches.append(_document_branch(
+                    SearchKind.QUEST, Quest.id, Quest.title, null(), Quest.search_vector, query,
+                    Quest.company_id == company_id,
+                ))
+            if SearchKind.QUEST_STEP in kinds:
+                branches.append(_document_branch(
+                    SearchKind.QUEST_STEP, QuestStep.id, QuestStep.title, QuestStep.quest_id, QuestStep.search_vector,
+                    query, QuestStep.quest_id == Quest.id, Quest.company_id == company_id,
+                ))
+            if SearchKind.PROBATION_TASK in kinds:
+                branches.append(_document_branch(
+                    SearchKind.PROBATION_TASK, ProbationTask.id, ProbationTask.title, null(),
+                    ProbationTask.search_vector, query, ProbationTask.company_id == company_id,
+                ))
+        if SearchKind.PERSON in kinds:
+            # Участник компании виден по email; id — членство, а не глобальный пользователь
+            branches.append(_branch(
+                SearchKind.PERSON, Membership.id, User.email, null(), func.word_similarity(q, User.email),
+                or_(User.email.icontains(q, autoescape=True), User.email.op("%>")(q)),
+                Membership.user_id == User.id,
+                Membership.company_id == company_id,
+                Membership.status == literal(MembershipStatus.ACTIVE, Membership.status.type),
+            ))
+        if not branches:
+            return [], None
+
+        # One extra row tells whether another page exists
+        branches = [_keyset(branch, after, limit + 1) for branch in branches]
+        hits = branches[0].subquery() if len(branches) == 1 else union_all(*branches).subquery()
+        rows = (await self.uow.session.execute(
+            select(hits).order_by(hits.c.rank.desc(), hits.c.kind, hits.c.id).limit(limit + 1)
+        )).all()
+        items = [SearchHit.model_validate(row, from_attributes=True) for row in rows[:limit]]
+        if len(rows) <= limit:
+            return items, None
+        last = items[-1]
+        return items, encode_search_cursor(last.rank, last.kind, last.id)
+
+
+def _branch(kind: SearchKind, id, title, parent_id, rank, *where) -> Select:
+    return select(
+        literal(kind.value, String).label("kind"),
+        id.label("id"),
+        title.label("title"),
+        cast(parent_id, PG_UUID(as_uuid=True)).label("parent_id"),
+        cast(rank, Float).label("rank"),
+    ).where(*where)
+
+
+def _document_branch(kind: SearchKind, id, title, parent_id, vector, query, *where) -> Select:
+    rank = func.ts_rank_cd(vector, query, RANK_NORMALIZATION)
+    return _branch(kind, id, title, parent_id, rank, vector.op("@@")(query), *where)
+
+
+def _keyset(branch: Select, after: tuple[float, str, UUID] | None, limit: int) -> Select:
+    """Order one branch like the merged result and cut it at the cursor and the limit."""
+    rank, kind, id = (branch.selected_columns[name] for name in ("rank", "kind", "id"))
+    if after:
+        after_rank, after_kind, after_id = after
+        # rank по убыванию: (-rank, kind, id) растёт вдоль выдачи
+        branch = branch.where(tuple_(-rank, kind, id) > (-after_rank, after_kind, after_id))
+    return branch.order_by(rank.desc(), kind, id).limit(limit)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from enum import Enum
+from typing import Awaitable, Callable
+
+from sqlalchemy import Table, Update, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import ProbationTask, QuestAssignment
+from app.models.enums import ProbationTaskStatus, QuestAssignmentStatus
+from app.services.auth_service import purge_expired_refresh_tokens
+from app.services.outbox_service import purge_published_events
+from app.services.webhook_service import purge_delivered_webhooks, purge_exhausted_webhooks
+from app.utils.metrics import SWEEPER_ROWS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SweepRule:
+    """Move rows of ``table`` from ``from_statuses`` to ``to_status`` once ``due_at + grace`` has passed."""
+    name: str
+    table: Table
+    from_statuses: tuple[Enum, ...]
+    to_status: Enum
+    grace: timedelta = timedelta(0)
+
+    def statement(self, batch_size: int) -> Update:
+        """One bounded batch; rows locked by another sweeper are skipped, not waited on."""
+        t = self.table
+        due = (
+            select(t.c.id)
+            .where(t.c.status.in_(self.from_statuses), t.c.due_at < func.now() - self.grace)
+            .order_by(t.c.due_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        return (
+            update(t)
+            .where(t.c.id.in_(due.scalar_subquery()))
+            .values(status=self.to_status)
+            .returning(t.c.id)
+        )
+
+
+# Порядок важен: назначение, просроченное давно, за один тик станет OVERDUE, затем EXPIRED
+RULES: tuple[SweepRule, ...] = (
+    SweepRule(
+        "quest_assignments_overdue",
+        QuestAssignment.__table__,
+        (QuestAssignmentStatus.ASSIGNED, QuestAssignmentStatus.IN_PROGRESS),
+        QuestAssignmentStatus.OVERDUE,
+    ),
+    SweepRule(
+        "quest_assignments_expired",
+        QuestAssignment.__table__,
+        (QuestAssignmentStatus.OVERDUE,),
+        QuestAssignmentStatus.EXPIRED,
+        timedelta(days=settings.QUEST_EXPIRE_AFTER_DAYS),
+    ),
+    SweepRule(
+        "probation_tasks_failed",
+        ProbationTask.__table__,
+        (ProbationTaskStatus.TODO, ProbationTaskStatus.IN_PROGRESS),
+        ProbationTaskStatus.FAILED,
+        timedelta(days=settings.PROBATION_TASK_FAIL_AFTER_DAYS),
+    ),
+)
+
+
+@dataclass
+class SweeperMetrics:
+    """Process-local counters of the sweeper, per rule."""
+    ticks: int = 0
+    moved_total: dict[str, int] = field(default_factory=dict)
+    last_moved: dict[str, int] = field(default_factory=dict)
+    last_tick_at: float | None = None
+    last_duration_seconds: float | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, moved: dict[str, int], duration: float) -> None:
+        with self._lock:
+            self.ticks += 1
+            for name, n in moved.items():
+                self.moved_total[name] = self.moved_total.get(name, 0) + n
+                SWEEPER_ROWS.labels(name).inc(n)
+            self.last_moved = dict(moved)
+            self.last_tick_at = time.time()
+            self.last_duration_seconds = duration
+
+
+sweeper_metrics = SweeperMetrics()
+
+
+async def _drain(
+    session_factory: Callable[[], AsyncSession],
+    batch: Callable[[AsyncSession], Awaitable[int]],
+    batch_size: int,
+) -> int:
+    # Пачки по одной короткой транзакции, пока очередная не окажется неполной
+    total = 0
+    while True:
+        async with session_factory() as session:
+            n = await batch(session)
+            await session.commit()
+        total += n
+        if n < batch_size:
+            return total
+
+
+async def sweep_once(
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    batch_size: int | None = None,
+) -> dict[str, int]:
+    """Run every rule, then the refresh-token, outbox and webhook purges, to completion
+    in batches, one short transaction per batch.
+
+    Safe to run concurrently from several replicas (``FOR UPDATE SKIP LOCKED``).
+    Returns the number of rows moved per rule.
+    """
+    batch_size = batch_size or settings.SWEEPER_BATCH_SIZE
+    started = time.perf_counter()
+    moved: dict[str, int] = {}
+    for rule in RULES:
+        async def move(session: AsyncSession, rule: SweepRule = rule) -> int:
+            return len((await session.execute(rule.statement(batch_size))).all())
+        moved[rule.name] = await _drain(session_factory, move, batch_size)
+    moved["refresh_tokens_purged"] = await _drain(
+        session_factory, lambda session: purge_expired_refresh_tokens(session, batch_size), batch_size
+    )
+    moved["outbox_events_purged"] = await _drain(
+        session_factory, lambda session: purge_published_events(session, batch_size), batch_size
+    )
+    moved["webhook_deliveries_purged"] = await _drain(
+        session_factory, lambda session: purge_delivered_webhooks(session, batch_size), batch_size
+    )
+    moved["webhook_deliveries_exhausted_purged"] = await _drain(
+        session_factory, lambda session: purge_exhausted_webhooks(session, batch_size), batch_size
+    )
+    duration = time.perf_counter() - started
+    sweeper_metrics.record(moved, duration)
+    logger.info("sweeper tick: %s in %.3fs", moved, duration)
+    return moved
+
+
+async def run_sweeper(interval: float) -> None:
+    """Sweep every ``interval`` seconds until cancelled; a failed tick is logged and retried."""
+    while True:
+        try:
+            await sweep_once()
+        except Exception:
+            logger.exception("sweeper tick failed")
+        await asyncio.sleep(interval)
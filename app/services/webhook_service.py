@@ -0,0 +1,450 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from datetime import timedelta
+from typing import Any, Callable, Sequence
+from uuid import UUID
+
+import httpx
+from fastapi import HTTPException, status
+from sqlalchemy import (
+    Integer, Interval, String, any_, cast, delete, func, literal, or_, select, update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.enums import EventType
+from app.models.models import OutboxEvent, WebhookDelivery, WebhookSubscription, now
+from app.schemas.webhook import WebhookSubscriptionCreate
+from app.services.base import UnitOfWork
+from app.services.outbox_service import event_bus
+from app.utils.metrics import WEBHOOK_DELIVERIES, WEBHOOK_REQUEST_SECONDS
+from app.utils.network import public_address
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+NOT_PUBLIC = "Webhook URL does not resolve to a public address"
+
+
+class WebhookService:
+    """Service for managing a company's webhook subscriptions."""
+
+    def __init__(self, uow: UnitOfWork) -> None:
+        self.uow = uow
+
+    async def create(
+        self,
+        company_id: UUID,
+        data: WebhookSubscriptionCreate,
+        creator_member: UUID | None = None,
+    ) -> WebhookSubscription:
+        url = httpx.URL(str(data.url))
+        if await public_address(url.host, url.port or 443) is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=NOT_PUBLIC)
+        async with self.uow as uow:
+            subscription = WebhookSubscription(
+                company_id=company_id,
+                url=str(data.url),
+                secret=secrets.token_hex(32),
+                event_types=[event_type.value for event_type in data.event_types],
+                is_active=True,
+                created_by_member=creator_member,
+            )
+            uow.session.add(subscription)
+            await uow.commit()
+            return subscription
+
+    async def for_company(self, company_id: UUID) -> list[WebhookSubscription]:
+        return list(await self.uow.session.scalars(
+            select(WebhookSubscription)
+            .where(WebhookSubscription.company_id == company_id)
+            .order_by(WebhookSubscription.created_at)
+        ))
+
+    async def delete(self, company_id: UUID, subscription_id: UUID) -> None:
+        async with self.uow as uow:
+            subscription = await uow.session.get(WebhookSubscription, subscription_id)
+            if subscription is None or subscription.company_id != company_id:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Webhook subscription not found"
+                )
+            await uow.session.delete(subscription)
+            await uow.commit()
+
+
+# ---------------------------------------------------------------------------
+# Постановка в очередь: обработчик событий outbox
+# ---------------------------------------------------------------------------
+
+def envelope(event: OutboxEvent) -> dict[str, Any]:
+    """The event as customers see it inside a batch."""
+    return {
+        "id": str(event.id),
+        "type": event.event_type,
+        "company_id": str(event.company_id),
+        "created_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }
+
+
+async def enqueue_deliveries(
+    event: OutboxEvent,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> int:
+    """Queue ``event`` for every active subscription of its company, in one INSERT ... SELECT.
+
+    Idempotent: the outbox may hand over the same event more than once.
+    """
+    if event.company_id is None:
+        return 0
+    table = WebhookDelivery.__table__
+    stamp = now()
+    targets = (
+        select(
+            func.gen_random_uuid(),
+            WebhookSubscription.id,
+            literal(event.id),
+            literal(event.event_type, String),
+            literal(envelope(event), JSONB),
+            literal(stamp),
+            literal(stamp),
+        )
+        .where(
+            WebhookSubscription.company_id == event.company_id,
+            WebhookSubscription.is_active,
+            or_(
+                func.cardinality(WebhookSubscription.event_types) == 0,
+                literal(event.event_type, String) == any_(WebhookSubscription.event_types),
+            ),
+        )
+    )
+    async with session_factory() as session:
+        result = await session.execute(
+            insert(table)
+            .from_select(
+                ["id", "subscription_id", "event_id", "event_type", "payload", "created_at", "available_at"],
+                targets,
+            )
+            .on_conflict_do_nothing(constraint="uq_webhook_deliveries_subscription_event"),
+            execution_options={"preserve_rowcount": True},
+        )
+        await session.commit()
+    return result.rowcount
+
+
+for _event_type in EventType:
+    event_bus.subscribe(_event_type)(enqueue_deliveries)
+
+
+# ---------------------------------------------------------------------------
+# Доставка
+# ---------------------------------------------------------------------------
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """``t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">``; the receiver recomputes it."""
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def batch_body(payloads: Sequence[dict[str, Any]]) -> bytes:
+    """One POST body for several events of the same endpoint, oldest first."""
+    return json.dumps({"events": list(payloads)}, separators=(",", ":")).encode()
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.host}:{parsed.port or (443 if parsed.scheme == 'https' else 80)}"
+
+
+async def pinned_request(url: str) -> tuple[httpx.URL, dict[str, str], dict[str, Any]] | None:
+    """URL, headers and extensions that send a request for ``url`` to a checked public address.
+
+    The name is resolved once here and the connection goes to that address,
+    with the original Host header and TLS server name, so a DNS answer that
+    changes after the check cannot point the request inside the network.
+    Returns None when the host has no public address.
+    """
+    parsed = httpx.URL(url)
+    address = await public_address(parsed.host, parsed.port or (443 if parsed.scheme == "https" else 80))
+    if address is None:
+        return None
+    headers = {"Host": parsed.netloc.decode("ascii")}
+    return parsed.copy_with(host=address), headers, {"sni_hostname": parsed.host}
+
+
+class WebhookDispatcher:
+    """Delivers queued webhook events, batching them per subscription.
+
+    Each subscription is served by at most one task at a time, so a slow or
+    failing endpoint only delays its own queue; the total number of POSTs in
+    flight is capped by ``max_concurrency``. Connections are pooled per
+    origin (scheme, host, port), at most ``max_connections_per_host`` each.
+
+    Claimed deliveries are leased rather than locked: no transaction stays
+    open during a POST, and a batch whose worker died is retried once the
+    lease expires. Failures back off exponentially until ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        *,
+        batch_size: int = settings.WEBHOOK_BATCH_SIZE,
+        max_concurrency: int = settings.WEBHOOK_MAX_CONCURRENCY,
+        max_connections_per_host: int = settings.WEBHOOK_MAX_CONNECTIONS_PER_HOST,
+        timeout: float = settings.WEBHOOK_TIMEOUT_SECONDS,
+        max_attempts: int = settings.WEBHOOK_MAX_ATTEMPTS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        # Аренда пачки: дольше любого запроса, чтобы не отправить её дважды
+        self.lease = timedelta(seconds=timeout * 3)
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._inflight: dict[UUID, asyncio.Task] = {}
+        # Источники, куда сейчас идут запросы: их клиенты не закрываем
+        self._busy: dict[UUID, str] = {}
+        self._pruned_at = time.monotonic()
+
+    def _client(self, url: str) -> httpx.AsyncClient:
+        origin = _origin(url)
+        client = self._clients.get(origin)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections_per_host,
+                    max_keepalive_connections=self.max_connections_per_host,
+                ),
+            )
+            self._clients[origin] = client
+        return client
+
+    def _due(self) -> Any:
+        return (
+            WebhookDelivery.delivered_at.is_(None),
+            WebhookDelivery.available_at <= func.now(),
+            WebhookDelivery.attempts < self.max_attempts,
+        )
+
+    async def prune_clients(self) -> int:
+        """Close the clients of origins that no active subscription points at any more."""
+        async with self.session_factory() as session:
+            urls = await session.scalars(
+                select(WebhookSubscription.url).where(WebhookSubscription.is_active).distinct()
+            )
+            keep = {_origin(url) for url in urls} | set(self._busy.values())
+        stale = [origin for origin in self._clients if origin not in keep]
+        for origin in stale:
+            await self._clients.pop(origin).aclose()
+        self._pruned_at = time.monotonic()
+        return len(stale)
+
+    async def tick(self) -> int:
+        """Start a delivery task for every idle subscription with due events."""
+        if time.monotonic() - self._pruned_at >= settings.WEBHOOK_CLIENT_PRUNE_SECONDS:
+            await self.prune_clients()
+        free = self.max_concurrency - len(self._inflight)
+        if free <= 0:
+            return 0
+        async with self.session_factory() as session:
+            due = list(await session.scalars(
+                select(WebhookDelivery.subscription_id)
+                .where(*self._due())
+                .group_by(WebhookDelivery.subscription_id)
+                .order_by(func.min(WebhookDelivery.available_at))
+            ))
+        started = 0
+        for subscription_id in due:
+            if started >= free:
+                break
+            if subscription_id in self._inflight:
+                continue
+            task = asyncio.create_task(self.deliver(subscription_id))
+            self._inflight[subscription_id] = task
+            task.add_done_callback(lambda _, key=subscription_id: self._inflight.pop(key, None))
+            started += 1
+        return started
+
+    async def drain(self) -> None:
+        """Wait for the delivery tasks started so far."""
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+
+    async def deliver(self, subscription_id: UUID) -> int:
+        """Send one batch of due events to a subscription; returns the batch size."""
+        try:
+            return await self._deliver(subscription_id)
+        except Exception:
+            logger.exception("webhook delivery to subscription %s failed", subscription_id)
+            return 0
+
+    async def _deliver(self, subscription_id: UUID) -> int:
+        table = WebhookDelivery.__table__
+        async with self.session_factory() as session:
+            subscription = await session.get(WebhookSubscription, subscription_id)
+            if subscription is None:
+                return 0
+            claimed = (
+                select(table.c.id)
+                .where(table.c.subscription_id == subscription_id, *self._due())
+                .order_by(table.c.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = (await session.execute(
+                update(table)
+                .where(table.c.id.in_(claimed.scalar_subquery()))
+                .values(available_at=func.now() + self.lease)
+                .returning(table.c.id, table.c.created_at, table.c.payload)
+            )).all()
+            url, secret, active = subscription.url, subscription.secret, subscription.is_active
+            await session.commit()
+        if not rows:
+            return 0
+        rows.sort(key=lambda row: row.created_at)
+        ids = [row.id for row in rows]
+        if not active:
+            # Подписку отключили: очередь не отправляем, а закрываем
+            await self._record(ids, delivered=False, status_code=None, error="subscription inactive", final=True)
+            return len(ids)
+
+        # DNS мог измениться после регистрации — проверяем адрес перед каждой отправкой
+        target = await pinned_request(url)
+        if target is None:
+            await self._record(ids, delivered=False, status_code=None, error=NOT_PUBLIC)
+            return len(ids)
+        target_url, headers, extensions = target
+
+        body = batch_body([row.payload for row in rows])
+        timestamp = int(time.time())
+        headers.update({
+            "Content-Type": "application/json",
+            SIGNATURE_HEADER: sign(secret, timestamp, body),
+            "X-Webhook-Subscription": str(subscription_id),
+        })
+        status_code: int | None = None
+        error: str | None = None
+        started = time.perf_counter()
+        self._busy[subscription_id] = _origin(url)
+        try:
+            response = await self._client(url).post(
+                target_url, content=body, headers=headers, extensions=extensions
+            )
+            status_code = response.status_code
+            if not response.is_success:
+                error = f"HTTP {status_code}"
+        except httpx.HTTPError as exc:
+            error = repr(exc)
+        finally:
+            self._busy.pop(subscription_id, None)
+            WEBHOOK_REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+        # 410 Gone — получатель просит больше не слать
+        gone = status_code == status.HTTP_410_GONE
+        await self._record(ids, delivered=error is None, status_code=status_code, error=error, final=gone)
+        if gone:
+            async with self.session_factory() as session:
+                await session.execute(
+                    update(WebhookSubscription)
+                    .where(WebhookSubscription.id == subscription_id)
+                    .values(is_active=False)
+                )
+                await session.commit()
+        return len(ids)
+
+    async def _record(
+        self,
+        ids: list[UUID],
+        *,
+        delivered: bool,
+        status_code: int | None,
+        error: str | None,
+        final: bool = False,
+    ) -> None:
+        table = WebhookDelivery.__table__
+        if delivered:
+            values = {"delivered_at": func.now(), "last_status": status_code, "last_error": None}
+            WEBHOOK_DELIVERIES.labels("delivered").inc(len(ids))
+        else:
+            attempts = self.max_attempts if final else table.c.attempts + 1
+            backoff = func.least(func.power(2, cast(attempts, Integer)), 3600)
+            values = {
+                "attempts": attempts,
+                "available_at": func.now() + backoff * literal(timedelta(seconds=1), Interval),
+                "last_status": status_code,
+                "last_error": error,
+            }
+            WEBHOOK_DELIVERIES.labels("dropped" if final else "failed").inc(len(ids))
+        async with self.session_factory() as session:
+            await session.execute(update(table).where(table.c.id.in_(ids)).values(**values))
+            await session.commit()
+
+    async def run(self, interval: float) -> None:
+        """Poll the queue every ``interval`` seconds until cancelled."""
+        try:
+            while True:
+                try:
+                    await self.tick()
+                except Exception:
+                    logger.exception("webhook dispatcher tick failed")
+                await asyncio.sleep(interval)
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+async def purge_delivered_webhooks(session: AsyncSession, batch_size: int = 1000) -> int:
+    """Delete one batch of deliveries completed more than ``OUTBOX_RETENTION_HOURS`` ago."""
+    t = WebhookDelivery.__table__
+    expired = (
+        select(t.c.id)
+        .where(t.c.delivered_at < func.now() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(t).where(t.c.id.in_(expired.scalar_subquery())),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
+
+
+async def purge_exhausted_webhooks(session: AsyncSession, batch_size: int = 1000) -> int:
+    """Delete one batch of deliveries that ran out of attempts more than
+    ``WEBHOOK_FAILED_RETENTION_HOURS`` ago."""
+    t = WebhookDelivery.__table__
+    expired = (
+        select(t.c.id)
+        .where(
+            t.c.delivered_at.is_(None),
+            t.c.attempts >= settings.WEBHOOK_MAX_ATTEMPTS,
+            # После последней попытки available_at — момент этой попытки плюс backoff
+            t.c.available_at < func.now() - timedelta(hours=settings.WEBHOOK_FAILED_RETENTION_HOURS),
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(t).where(t.c.id.in_(expired.scalar_subquery())),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
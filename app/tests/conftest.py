@@ -0,0 +1,35 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.models import Base
+
+
+# Тесты на настоящем Postgres: TEST_DATABASE_URL указывает на отдельную
+# базу (postgresql+psycopg://...), без неё они пропускаются
+@pytest.fixture(scope="session")
+def database_url() -> str:
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def run_db(database_url):
+    """Run ``scenario(session_factory)`` in a fresh event loop against the test database."""
+    def run(scenario):
+        async def main():
+            engine = create_async_engine(database_url)
+            try:
+                return await scenario(async_sessionmaker(engine, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,50 @@
+import time
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.models import User
+from app.utils.cache import TTLCache
+from app.utils.security import _collect_identity_changes, identity_cache
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" becomes least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_expiry_and_invalidate():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    cache.set("b", 2, ttl=60)
+    cache.invalidate("b")
+    assert cache.get("b") is None
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_identity_cache_evicted_on_commit_not_flush():
+    user = User(id=uuid.uuid4(), email="u@example.com")
+    identity_cache.set(str(user.id), ({}, []))
+    session = Session(create_engine("sqlite://"))
+    session.connection()  # открытая транзакция, как у запроса
+    session.add(user)
+    _collect_identity_changes(session, None)
+    session.expunge_all()
+    # До commit старая запись ещё видна другим запросам — кэш не трогаем
+    assert identity_cache.get(str(user.id)) is not None
+    session.commit()
+    assert identity_cache.get(str(user.id)) is None
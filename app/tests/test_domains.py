@@ -0,0 +1,51 @@
+import uuid
+
+from app.utils.domains import DomainTrie, VerifiedDomainIndex
+
+
+def test_trie_resolves_longest_verified_suffix():
+    corp, eu = uuid.uuid4(), uuid.uuid4()
+    trie = DomainTrie()
+    trie.add("corp.example", corp)
+    trie.add("eu.corp.example", eu)
+    assert trie.resolve("corp.example") == corp
+    assert trie.resolve("hr.corp.example") == corp
+    assert trie.resolve("team.eu.corp.example") == eu
+    assert trie.resolve("xcorp.example") is None
+    assert trie.resolve("example") is None
+    assert len(trie) == 2
+
+
+def test_trie_discard_keeps_other_branches():
+    corp, eu = uuid.uuid4(), uuid.uuid4()
+    trie = DomainTrie()
+    trie.add("corp.example", corp)
+    trie.add("eu.corp.example", eu)
+    trie.discard("corp.example")
+    assert trie.resolve("hr.corp.example") is None
+    assert trie.resolve("eu.corp.example") == eu
+    trie.discard("eu.corp.example")
+    trie.discard("missing.example")
+    assert len(trie) == 0
+    assert not trie._root.children
+
+
+def test_index_resolves_email_case_insensitively():
+    company = uuid.uuid4()
+    index = VerifiedDomainIndex()
+    index.replace_company(company, ["Corp.Example."])
+    assert index.resolve_email("Alice@EU.corp.example") == company
+    assert index.resolve_email("alice@other.example") is None
+
+
+def test_replace_company_drops_domains_no_longer_listed():
+    a, b = uuid.uuid4(), uuid.uuid4()
+    index = VerifiedDomainIndex()
+    index.replace_company(a, ["a.example", "a.test"])
+    index.replace_company(b, ["b.example"])
+    index.replace_company(a, ["a.test"])
+    assert index.resolve_email("x@a.example") is None
+    assert index.resolve_email("x@a.test") == a
+    index.replace_company(a, [])
+    assert len(index) == 1
+    assert index.resolve_email("x@b.example") == b
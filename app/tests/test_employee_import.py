@@ -0,0 +1,83 @@
+import io
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.enums import MembershipRole
+from app.models.models import Company, Membership, User
+from app.schemas.employee import EmployeeImportRow
+from app.services.base import UnitOfWork
+from app.services.import_service import (
+    CSV, NDJSON, EmployeeImportService, manageable_roles, membership_upsert, read_rows,
+)
+from app.utils.security import identity_cache
+
+
+def test_csv_rows_carry_line_numbers_and_skip_blank_cells():
+    stream = io.StringIO('email,role,manager_email\na@x.com,HR,\n"b@x.com",,a@x.com\nc@x.com,HR,,extra\n')
+    rows = list(read_rows(stream, CSV))
+    assert rows[0] == (2, {"email": "a@x.com", "role": "HR"})
+    assert rows[1] == (3, {"email": "b@x.com", "manager_email": "a@x.com"})
+    assert rows[2] == (4, "Too many fields")
+
+
+def test_ndjson_reports_unparsable_lines_and_skips_blank_ones():
+    stream = io.StringIO('{"email": "a@x.com"}\n\n[1]\n{bad\n')
+    rows = list(read_rows(stream, NDJSON))
+    assert rows[0] == (1, {"email": "a@x.com"})
+    assert rows[1] == (3, "Expected a JSON object")
+    assert rows[2][0] == 4 and rows[2][1].startswith("Invalid JSON")
+
+
+def test_row_defaults_and_rejections():
+    assert EmployeeImportRow(email="a@x.com").role == MembershipRole.EMPLOYEE
+    with pytest.raises(ValidationError):
+        EmployeeImportRow(email="a@x.com", role=MembershipRole.OWNER)
+    with pytest.raises(ValidationError):
+        EmployeeImportRow(email="a@x.com", manager_email="a@x.com")
+
+
+def test_importer_cannot_grant_a_role_above_their_own():
+    assert MembershipRole.ADMIN not in manageable_roles(MembershipRole.HR)
+    assert MembershipRole.HR in manageable_roles(MembershipRole.HR)
+    assert MembershipRole.ADMIN in manageable_roles(MembershipRole.ADMIN)
+    assert MembershipRole.OWNER not in manageable_roles(MembershipRole.OWNER)
+
+
+def test_upsert_keeps_existing_status_and_senior_roles():
+    row = EmployeeImportRow(email="a@x.com", role=MembershipRole.EMPLOYEE)
+    stmt = membership_upsert(
+        uuid4(), [(2, row)], {row.email: uuid4()}, manageable_roles(MembershipRole.HR), datetime.utcnow()
+    )
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    conflict = sql[sql.index("ON CONFLICT"):]
+    assert "status" not in conflict
+    assert "'HR'" in conflict and "'ADMIN'" not in conflict and "'OWNER'" not in conflict
+
+
+def test_import_evicts_cached_identities_of_rewritten_members(run_db):
+    async def scenario(session_factory):
+        async with session_factory() as session:
+            company = Company(name="Import")
+            user = User(email=f"{uuid4().hex}@example.com")
+            session.add_all([company, user])
+            await session.flush()
+            session.add(Membership(user_id=user.id, company_id=company.id, role=MembershipRole.MANAGER))
+            await session.commit()
+        identity_cache.set(str(user.id), ("stale", []))
+
+        async with session_factory() as session:
+            result = await EmployeeImportService(UnitOfWork(lambda: session)).import_rows(
+                company.id, [(1, {"email": user.email, "role": MembershipRole.EMPLOYEE.value})], MembershipRole.HR,
+            )
+        assert result.memberships_updated == 1
+        assert identity_cache.get(str(user.id)) is None
+        async with session_factory() as session:
+            role = await session.scalar(select(Membership.role).where(Membership.user_id == user.id))
+        assert role == MembershipRole.EMPLOYEE
+
+    run_db(scenario)
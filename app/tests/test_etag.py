@@ -0,0 +1,29 @@
+from starlette.requests import Request
+
+from app.utils.etag import etag_response, strong_etag
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_full_response_carries_strong_etag():
+    response = etag_response(_request(), b'{"a":1}')
+    assert response.status_code == 200
+    assert response.headers["etag"] == strong_etag(b'{"a":1}')
+    assert not response.headers["etag"].startswith("W/")
+
+
+def test_matching_if_none_match_gives_304():
+    etag = strong_etag(b"body")
+    for header in (etag, f'"other", {etag}', f"W/{etag}", "*"):
+        response = etag_response(_request(header), b"body")
+        assert response.status_code == 304
+        assert response.body == b""
+
+
+def test_changed_body_is_sent_again():
+    response = etag_response(_request(strong_etag(b"old")), b"new")
+    assert response.status_code == 200
+    assert response.body == b"new"
@@ -0,0 +1,33 @@
+import asyncio
+
+from fastapi import HTTPException
+
+from app.utils.hashing import PasswordHasher
+
+
+def test_hash_and_verify_roundtrip():
+    hasher = PasswordHasher(workers=0, max_pending=4)
+
+    async def run():
+        hashed = await hasher.hash("strongpass123")
+        return await hasher.verify_and_update("strongpass123", hashed)
+
+    valid, new_hash = asyncio.run(run())
+    assert valid
+    assert new_hash is None
+
+
+def test_backlog_limit_returns_503():
+    hasher = PasswordHasher(workers=0, max_pending=1)
+
+    async def run():
+        return await asyncio.gather(
+            hasher.hash("strongpass123"),
+            hasher.hash("strongpass123"),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, str)
+    assert isinstance(second, HTTPException)
+    assert second.status_code == 503
@@ -0,0 +1,88 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models.models import LINE_RELATION, Company, Membership, MembershipClosure, User
+from app.services.base import UnitOfWork
+from app.services.membership_service import MembershipService
+
+
+async def _hierarchy(session_factory, **managers):
+    """Create memberships named by ``managers`` (name -> manager name or None) in order."""
+    async with session_factory() as session:
+        company = Company(name="Closure")
+        session.add(company)
+        await session.flush()
+        members = {}
+        for name, manager in managers.items():
+            user = User(email=f"{name}-{uuid.uuid4().hex}@example.com")
+            session.add(user)
+            await session.flush()
+            members[name] = Membership(
+                user_id=user.id,
+                company_id=company.id,
+                manager_membership_id=members[manager].id if manager else None,
+            )
+            session.add(members[name])
+            await session.flush()
+        await session.commit()
+        return {name: member.id for name, member in members.items()}
+
+
+async def _ancestors(session, member_id):
+    rows = await session.execute(
+        select(MembershipClosure.ancestor_id, MembershipClosure.depth).where(
+            MembershipClosure.descendant_id == member_id,
+            MembershipClosure.relation == LINE_RELATION,
+        )
+    )
+    return dict(rows.all())
+
+
+async def _descendants(session, member_id):
+    rows = await session.execute(
+        select(MembershipClosure.descendant_id, MembershipClosure.depth).where(
+            MembershipClosure.ancestor_id == member_id,
+            MembershipClosure.relation == LINE_RELATION,
+        )
+    )
+    return dict(rows.all())
+
+
+def test_moving_a_subtree_rewrites_its_closure_rows(run_db):
+    async def scenario(session_factory):
+        ids = await _hierarchy(session_factory, a=None, b="a", c="b", e="c", d=None)
+        async with session_factory() as session:
+            service = MembershipService(UnitOfWork(lambda: session))
+            b, d = await session.get(Membership, ids["b"]), await session.get(Membership, ids["d"])
+            await service.set_manager(b, d)
+
+        async with session_factory() as session:
+            assert await _ancestors(session, ids["c"]) == {ids["c"]: 0, ids["b"]: 1, ids["d"]: 2}
+            assert await _ancestors(session, ids["e"]) == {ids["e"]: 0, ids["c"]: 1, ids["b"]: 2, ids["d"]: 3}
+            assert await _descendants(session, ids["d"]) == {ids["d"]: 0, ids["b"]: 1, ids["c"]: 2, ids["e"]: 3}
+            # Прежний руководитель больше не видит перенесённое поддерево
+            assert await _descendants(session, ids["a"]) == {ids["a"]: 0}
+
+    run_db(scenario)
+
+
+def test_set_manager_rejects_a_cycle(run_db):
+    async def scenario(session_factory):
+        ids = await _hierarchy(session_factory, a=None, b="a", c="b")
+        for member, manager in (("a", "c"), ("b", "b")):
+            async with session_factory() as session:
+                service = MembershipService(UnitOfWork(lambda: session))
+                with pytest.raises(HTTPException) as exc:
+                    await service.set_manager(
+                        await session.get(Membership, ids[member]), await session.get(Membership, ids[manager])
+                    )
+                assert exc.value.status_code == 400
+
+        async with session_factory() as session:
+            assert await _ancestors(session, ids["a"]) == {ids["a"]: 0}
+            assert await _ancestors(session, ids["c"]) == {ids["c"]: 0, ids["b"]: 1, ids["a"]: 2}
+
+    run_db(scenario)
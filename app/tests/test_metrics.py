@@ -0,0 +1,29 @@
+import asyncio
+
+from app.utils.metrics import InstrumentationMiddleware, current_stats, record_pool_wait
+
+
+async def _app(scope, receive, send):
+    # Pretend the handler ran two statements and waited for the pool
+    stats = current_stats()
+    stats.queries += 2
+    stats.db_seconds += 0.005
+    record_pool_wait("test", 0.001)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_server_timing_header():
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/x", "headers": []}
+    asyncio.run(InstrumentationMiddleware(_app)(scope, None, send))
+
+    headers = dict(messages[0]["headers"])
+    timing = headers[b"server-timing"].decode()
+    assert 'db;dur=5.0;desc="2 queries"' in timing
+    assert "pool;dur=1.0" in timing
+    assert current_stats() is None
@@ -0,0 +1,47 @@
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from app.models.enums import EventType
+from app.models.models import OutboxEvent
+from app.services.outbox_service import EventBus, retry_delay
+
+
+def _event(event_type):
+    return OutboxEvent(id=uuid.uuid4(), event_type=event_type.value, aggregate_id=uuid.uuid4(), payload={})
+
+
+def test_dispatch_calls_only_handlers_of_the_event_type():
+    bus = EventBus()
+    seen = []
+
+    @bus.subscribe(EventType.QUEST_ASSIGNED)
+    async def first(event):
+        seen.append(("first", event.event_type))
+
+    @bus.subscribe(EventType.QUEST_ASSIGNED)
+    async def second(event):
+        seen.append(("second", event.event_type))
+
+    asyncio.run(bus.dispatch(_event(EventType.QUEST_ASSIGNED)))
+    asyncio.run(bus.dispatch(_event(EventType.QUEST_COMPLETED)))
+    assert seen == [("first", "quest.assigned"), ("second", "quest.assigned")]
+
+
+def test_handler_failure_propagates_to_the_relay():
+    bus = EventBus()
+
+    @bus.subscribe(EventType.MEMBERSHIP_INVITED)
+    async def broken(event):
+        raise RuntimeError("smtp down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(bus.dispatch(_event(EventType.MEMBERSHIP_INVITED)))
+
+
+def test_retry_delay_backs_off_exponentially_up_to_an_hour():
+    assert retry_delay(1) == timedelta(seconds=2)
+    assert retry_delay(5) == timedelta(seconds=32)
+    assert retry_delay(20) == timedelta(hours=1)
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.base import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip():
+    created_at = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    id = uuid4()
+    assert decode_cursor(encode_cursor(created_at, id)) == (created_at, id)
+
+
+def test_invalid_cursor_is_bad_request():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
@@ -0,0 +1,14 @@
+from datetime import date
+
+from app.db.partitions import add_months, month_partition
+
+
+def test_add_months_returns_month_start_across_years():
+    assert add_months(date(2026, 10, 18), 0) == date(2026, 10, 1)
+    assert add_months(date(2026, 10, 18), 3) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 31), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 10, 18), -24) == date(2024, 10, 1)
+
+
+def test_month_partition_name():
+    assert month_partition("probation_reviews", date(2026, 3, 1)) == "probation_reviews_p202603"
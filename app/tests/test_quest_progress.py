@@ -0,0 +1,84 @@
+import uuid
+
+from sqlalchemy import select
+
+from app.models.enums import QuestAssignmentStatus, StepSubmissionStatus
+from app.models.models import Company, Membership, Quest, QuestAssignment, QuestStep, QuestStepSubmission, User
+from app.schemas.quest import QuestAssignmentCreate, QuestStepSubmissionUpdate
+from app.services.base import UnitOfWork
+from app.services.quest_service import QuestService
+
+
+async def _assign(session_factory, *required):
+    """Assign a fresh quest whose steps have the given ``required`` flags; returns the assignment and step ids."""
+    async with session_factory() as session:
+        company = Company(name="Progress")
+        user = User(email=f"{uuid.uuid4().hex}@example.com")
+        session.add_all([company, user])
+        await session.flush()
+        member = Membership(user_id=user.id, company_id=company.id)
+        quest = Quest(company_id=company.id, title="Onboarding")
+        session.add_all([member, quest])
+        await session.flush()
+        steps = [
+            QuestStep(quest_id=quest.id, sort_order=order, title=f"Step {order}", step_type="doc", required=flag)
+            for order, flag in enumerate(required)
+        ]
+        session.add_all(steps)
+        await session.commit()
+
+    async with session_factory() as session:
+        assignment = await QuestService(UnitOfWork(lambda: session)).assign_quest(
+            QuestAssignmentCreate(quest_id=quest.id, membership_id=member.id), assigned_by=member,
+        )
+    return assignment.id, [step.id for step in steps]
+
+
+async def _approve(session_factory, assignment_id, step_id):
+    async with session_factory() as session:
+        submission = await session.scalar(
+            select(QuestStepSubmission).where(
+                QuestStepSubmission.quest_assignment_id == assignment_id,
+                QuestStepSubmission.quest_step_id == step_id,
+            )
+        )
+        await QuestService(UnitOfWork(lambda: session)).complete_step(
+            submission, QuestStepSubmissionUpdate(status=StepSubmissionStatus.APPROVED),
+        )
+    async with session_factory() as session:
+        return await session.get(QuestAssignment, assignment_id)
+
+
+def test_approving_the_last_required_step_completes_the_assignment(run_db):
+    async def scenario(session_factory):
+        assignment_id, (first, optional, last) = await _assign(session_factory, True, False, True)
+
+        assignment = await _approve(session_factory, assignment_id, optional)
+        # Необязательный шаг не двигает прогресс
+        assert assignment.progress_percent == 0
+        assert assignment.approved_steps_count == 0
+
+        assignment = await _approve(session_factory, assignment_id, first)
+        assert assignment.progress_percent == 50
+        assert assignment.status == QuestAssignmentStatus.IN_PROGRESS
+        assert assignment.completed_at is None
+
+        assignment = await _approve(session_factory, assignment_id, last)
+        assert assignment.progress_percent == 100
+        assert assignment.status == QuestAssignmentStatus.COMPLETED
+        assert assignment.completed_at is not None
+
+    run_db(scenario)
+
+
+def test_quest_without_required_steps_is_completed_on_assignment(run_db):
+    async def scenario(session_factory):
+        assignment_id, _ = await _assign(session_factory, False, False)
+        async with session_factory() as session:
+            assignment = await session.get(QuestAssignment, assignment_id)
+        assert assignment.status == QuestAssignmentStatus.COMPLETED
+        assert assignment.progress_percent == 100
+        assert assignment.required_steps_count == 0
+        assert assignment.completed_at is not None
+
+    run_db(scenario)
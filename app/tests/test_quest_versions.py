@@ -0,0 +1,39 @@
+import uuid
+
+from app.models.enums import QuestStatus, QuestStepApprovalRole
+from app.models.models import Quest, QuestStep, now
+from app.services.quest_service import build_version
+
+
+def _quest():
+    stamp = now()
+    return Quest(
+        id=uuid.uuid4(), company_id=uuid.uuid4(), title="Welcome", is_mandatory=True,
+        status=QuestStatus.DRAFT, created_at=stamp, updated_at=stamp,
+    )
+
+
+def _step(quest, sort_order):
+    return QuestStep(
+        id=uuid.uuid4(), quest_id=quest.id, title=f"s{sort_order}", step_type="doc", required=True,
+        approval_required_role=QuestStepApprovalRole.NONE, sort_order=sort_order, created_at=now(),
+    )
+
+
+def test_snapshot_is_the_published_document():
+    quest = _quest()
+    steps = [_step(quest, 1), _step(quest, 2)]
+    version = build_version(quest, steps, 3)
+    snapshot = version.snapshot
+    assert version.version == snapshot["version"] == 3
+    assert snapshot["version_id"] == snapshot["current_version_id"] == str(version.id)
+    assert snapshot["status"] == QuestStatus.PUBLISHED.value
+    assert [s["id"] for s in snapshot["steps"]] == [str(s.id) for s in steps]
+    assert version.step_ids == [s.id for s in steps]
+
+
+def test_building_a_version_leaves_the_working_copy_alone():
+    quest = _quest()
+    build_version(quest, [], 1)
+    assert quest.status == QuestStatus.DRAFT
+    assert quest.current_version_id is None
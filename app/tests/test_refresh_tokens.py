@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models.models import RefreshToken, User
+from app.services.auth_service import AuthService, _hash_refresh_token
+from app.services.base import UnitOfWork
+
+
+async def _login(session_factory):
+    async with session_factory() as session:
+        user = User(email=f"{uuid.uuid4().hex}@example.com")
+        session.add(user)
+        await session.commit()
+        return user, await AuthService(UnitOfWork(lambda: session)).login(user)
+
+
+async def _refresh(session_factory, refresh_token):
+    async with session_factory() as session:
+        return await AuthService(UnitOfWork(lambda: session)).refresh(refresh_token)
+
+
+async def _family(session_factory, user):
+    async with session_factory() as session:
+        return {
+            row.token_hash: row
+            for row in await session.scalars(select(RefreshToken).where(RefreshToken.user_id == user.id))
+        }
+
+
+def test_refresh_rotates_the_token_within_its_family(run_db):
+    async def scenario(session_factory):
+        user, first = await _login(session_factory)
+        second = await _refresh(session_factory, first.refresh_token)
+        assert second.refresh_token != first.refresh_token
+        tokens = await _family(session_factory, user)
+        old = tokens[_hash_refresh_token(first.refresh_token)]
+        new = tokens[_hash_refresh_token(second.refresh_token)]
+        assert old.used_at is not None and new.used_at is None
+        assert old.family_id == new.family_id
+        # Ротация продолжается с нового токена
+        await _refresh(session_factory, second.refresh_token)
+
+    run_db(scenario)
+
+
+def test_replayed_refresh_token_revokes_its_family(run_db):
+    async def scenario(session_factory):
+        user, first = await _login(session_factory)
+        second = await _refresh(session_factory, first.refresh_token)
+        with pytest.raises(HTTPException) as exc:
+            await _refresh(session_factory, first.refresh_token)
+        assert exc.value.status_code == 401
+        assert await _family(session_factory, user) == {}
+        # Законный владелец тоже должен войти заново
+        with pytest.raises(HTTPException):
+            await _refresh(session_factory, second.refresh_token)
+
+    run_db(scenario)
@@ -0,0 +1,33 @@
+import math
+
+from app.db.replicas import ReplicaSet
+
+
+def _replicas(**lag):
+    replicas = ReplicaSet({name: object() for name in lag}, max_lag=5, pin_seconds=60)
+    replicas.lag.update(lag)
+    return replicas
+
+
+def test_unchecked_replicas_are_not_used():
+    replicas = ReplicaSet({"replica-1": object()}, max_lag=5, pin_seconds=60)
+    assert replicas.pick() is None
+
+
+def test_pick_skips_lagging_replicas():
+    replicas = _replicas(**{"replica-1": 0.5, "replica-2": 30.0, "replica-3": math.inf})
+    assert {id(replicas.pick()) for _ in range(4)} == {id(replicas.engines["replica-1"])}
+
+
+def test_pick_round_robins_healthy_replicas():
+    replicas = _replicas(**{"replica-1": 0.0, "replica-2": 1.0})
+    assert {id(replicas.pick()) for _ in range(4)} == {id(e) for e in replicas.engines.values()}
+
+
+def test_read_your_writes_pin():
+    replicas = _replicas(**{"replica-1": 0.0})
+    assert not replicas.is_pinned("user")
+    replicas.pin("user")
+    assert replicas.is_pinned("user")
+    assert not replicas.is_pinned("other")
+    assert not replicas.is_pinned(None)
@@ -0,0 +1,36 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.enums import SearchKind
+from app.services.search_service import (
+    MAX_TERMS, decode_search_cursor, encode_search_cursor, prefix_tsquery,
+)
+
+
+def test_prefix_tsquery_matches_every_word_as_prefix():
+    assert prefix_tsquery("Onboard  Secur") == "onboard:* & secur:*"
+    assert prefix_tsquery("охрана труда") == "охрана:* & труда:*"
+
+
+def test_prefix_tsquery_drops_tsquery_syntax():
+    assert prefix_tsquery("a|b & !c:*") == "a:* & b:* & c:*"
+    assert prefix_tsquery("john_doe@acme.com") == "john:* & doe:* & acme:* & com:*"
+    assert prefix_tsquery("!!! ()") is None
+
+
+def test_prefix_tsquery_caps_terms():
+    assert prefix_tsquery(" ".join(f"w{i}" for i in range(20))).count(":*") == MAX_TERMS
+
+
+def test_search_cursor_roundtrip():
+    id = uuid4()
+    rank = 0.8999999761581421
+    assert decode_search_cursor(encode_search_cursor(rank, SearchKind.QUEST_STEP, id)) == (rank, "quest_step", id)
+
+
+def test_invalid_search_cursor_is_bad_request():
+    with pytest.raises(HTTPException) as exc:
+        decode_search_cursor(encode_search_cursor(0.5, SearchKind.QUEST, uuid4())[:-6])
+    assert exc.value.status_code == 400
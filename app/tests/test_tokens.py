@@ -0,0 +1,71 @@
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.models.enums import GlobalRole, MembershipRole
+from app.utils.tokens import (
+    RevocationList, create_access_token, decode_access_token, embedded_claims,
+)
+
+
+def _token(**extra):
+    user = SimpleNamespace(id=uuid.uuid4(), global_role=GlobalRole.NONE)
+    member = SimpleNamespace(id=uuid.uuid4(), company_id=uuid.uuid4(), role=MembershipRole.HR)
+    data = {"sub": str(user.id), **embedded_claims(user, [member]), **extra}
+    return create_access_token(data), user, member
+
+
+def test_embedded_claims_round_trip():
+    token, user, member = _token()
+    claims = decode_access_token(token)
+    assert claims.embedded
+    assert claims.user_id == user.id
+    assert claims.global_role == GlobalRole.NONE
+    assert claims.active_membership.role == MembershipRole.HR
+    assert claims.membership_for(member.company_id).id == member.id
+    assert claims.membership_for(uuid.uuid4()) is None
+
+
+def test_token_without_claims_is_not_embedded():
+    claims = decode_access_token(create_access_token({"sub": str(uuid.uuid4())}))
+    assert not claims.embedded
+
+
+def test_unknown_kid_is_rejected():
+    token = jwt.encode(
+        {"sub": str(uuid.uuid4()), "exp": time.time() + 60},
+        settings.SECRET_KEY, algorithm=settings.ALGORITHM, headers={"kid": "retired"},
+    )
+    with pytest.raises(JWTError):
+        decode_access_token(token)
+
+
+def test_revoked_token():
+    claims = decode_access_token(_token()[0])
+    revocations = RevocationList()
+    assert not revocations.is_revoked(claims)
+    revocations.revoke_token(claims.jti, claims.expires_at)
+    assert revocations.is_revoked(claims)
+
+
+def test_stale_marker_covers_only_earlier_tokens():
+    claims = decode_access_token(_token()[0])
+    revocations = RevocationList()
+    revocations.mark_stale(str(claims.user_id), claims.issued_at - 10, claims.expires_at)
+    assert not revocations.claims_stale(claims)
+    revocations.mark_stale(str(claims.user_id), claims.issued_at + 1, claims.expires_at)
+    assert revocations.claims_stale(claims)
+
+
+def test_purge_drops_expired_entries():
+    revocations = RevocationList()
+    revocations.revoke_token("old", time.time() - 1)
+    revocations.mark_stale("user", time.time() - 100, time.time() - 1)
+    revocations.purge()
+    claims = SimpleNamespace(jti="old", user_id="user", issued_at=0)
+    assert not revocations.is_revoked(claims)
+    assert not revocations.claims_stale(claims)
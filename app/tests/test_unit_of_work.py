@@ -0,0 +1,46 @@
+import asyncio
+
+from app.services.base import UnitOfWork
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def test_only_outermost_block_commits():
+    session = FakeSession()
+    uow = UnitOfWork(lambda: session)
+
+    async def run():
+        async with uow as outer:
+            async with outer as inner:
+                assert inner.session is session
+            assert session.commits == 0
+        assert session.commits == 1
+
+    asyncio.run(run())
+
+
+def test_rollback_on_exception():
+    session = FakeSession()
+    uow = UnitOfWork(lambda: session)
+
+    async def run():
+        try:
+            async with uow as u:
+                u.session
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+
+    asyncio.run(run())
+    assert session.rollbacks == 1
+    assert session.commits == 0
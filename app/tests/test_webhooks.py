@@ -0,0 +1,60 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.webhook import WebhookSubscriptionCreate
+from app.services.webhook_service import _origin, batch_body, pinned_request, sign
+from app.utils.network import is_public_address
+
+
+def test_signature_covers_timestamp_and_body():
+    body = batch_body([{"id": "1", "type": "quest.completed"}])
+    header = sign("secret", 1700000000, body)
+    t, v1 = header.split(",")
+    assert t == "t=1700000000"
+    expected = hmac.new(b"secret", b"1700000000." + body, hashlib.sha256).hexdigest()
+    assert v1 == "v1=" + expected
+    assert sign("secret", 1700000001, body) != header
+    assert sign("other", 1700000000, body) != header
+
+
+def test_batch_body_keeps_event_order():
+    events = [{"id": str(i)} for i in range(3)]
+    assert json.loads(batch_body(events)) == {"events": events}
+
+
+def test_connections_are_pooled_per_origin():
+    assert _origin("https://hooks.example.com/a") == _origin("https://hooks.example.com:443/b")
+    assert _origin("http://hooks.example.com/a") != _origin("https://hooks.example.com/a")
+    assert _origin("http://127.0.0.1:8080/x") == "http://127.0.0.1:8080"
+
+
+def test_only_public_addresses_are_allowed():
+    for address in ("127.0.0.1", "10.1.2.3", "172.16.0.1", "192.168.1.1", "169.254.169.254",
+                    "100.64.0.1", "0.0.0.0", "240.0.0.1", "::1", "fe80::1", "fd00::1", "::ffff:10.0.0.1"):
+        assert not is_public_address(address), address
+    assert is_public_address("93.184.216.34")
+    assert is_public_address("2606:4700::1111")
+
+
+def test_subscription_url_must_be_public_https():
+    assert WebhookSubscriptionCreate(url="https://hooks.example.com/x").url.host == "hooks.example.com"
+    for url in ("http://hooks.example.com/x", "https://localhost/x", "https://db.internal/x",
+                "https://127.0.0.1/x", "https://[::1]/x", "https://169.254.169.254/latest"):
+        with pytest.raises(ValidationError):
+            WebhookSubscriptionCreate(url=url)
+
+
+def test_request_is_pinned_to_the_checked_address():
+    async def check():
+        assert await pinned_request("https://127.0.0.1/x") is None
+        url, headers, extensions = await pinned_request("https://93.184.216.34:8443/x")
+        assert str(url) == "https://93.184.216.34:8443/x"
+        assert headers == {"Host": "93.184.216.34:8443"}
+        assert extensions == {"sni_hostname": "93.184.216.34"}
+
+    asyncio.run(check())
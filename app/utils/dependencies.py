@@ -1,25 +1,24 @@
 from __future__ import annotations
-from typing import Callable
-
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
 
-from app.db.session import SessionLocal
-from app.utils.security import get_current_user          # JWT-валидация + User
+from app.db.session import get_async_db
+from app.utils.security import (                          # JWT-валидация + User
+    Principal,
+    get_current_principal,
+    get_current_user,
+    get_token_claims,
+)
+from app.utils.tokens import MembershipClaim, TokenClaims
 from app.models.models import Membership
-from app.models.enums import GlobalRole, MembershipRole, MembershipStatus
+from app.models.enums import GlobalRole, MembershipRole
 
 # ---------------------------------------------------------------------------
 # DB-сессия
 # ---------------------------------------------------------------------------
 
-def get_db() -> Callable[[], Session]:
-    """Yield SQLAlchemy session for request scope."""
-    db: Session = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Та же функция, что и в security: FastAPI кэширует зависимость по объекту,
+# поэтому принципал и роутеры работают на одной сессии запроса
+get_db = get_async_db
 
 # ---------------------------------------------------------------------------
 # Глобальные проверки ролей
@@ -53,18 +52,18 @@ def require_global_roles(*roles: GlobalRole):
 # ---------------------------------------------------------------------------
 
 def get_active_membership(
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ) -> Membership | None:
     """Возвращает первое ACTIVE-членство текущего пользователя."""
-    return (
-        db.query(Membership)
-        .filter(
-            Membership.user_id == current_user.id,
-            Membership.status == MembershipStatus.ACTIVE,
-        )
-        .first()
-    )
+    return principal.active_membership
+
+
+def get_active_membership_claim(
+    claims: TokenClaims = Depends(get_token_claims),
+) -> MembershipClaim | None:
+    """Как get_active_membership, но из claims токена: на GET без обращения к БД.
+    Годится, когда нужны только id/компания/роль членства."""
+    return claims.active_membership
 
 
 def require_membership_roles(*roles: MembershipRole):
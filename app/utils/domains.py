@@ -0,0 +1,156 @@
+from __future__ import annotations
+import asyncio
+import logging
+from typing import Callable, Iterable
+from uuid import UUID
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.models.enums import CompanyStatus, SignupMode
+from app.models.models import Company, CompanyDomain
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_domain(domain: str) -> str:
+    return domain.strip().rstrip(".").lower()
+
+
+def email_domain(email: str) -> str:
+    return normalize_domain(email.rpartition("@")[2])
+
+
+class _Node:
+    __slots__ = ("children", "company_id")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.company_id: UUID | None = None
+
+
+class DomainTrie:
+    """Suffix trie of domain names, walked label by label from the TLD down.
+
+    ``resolve`` returns the company of the longest registered suffix of a host,
+    so ``eu.corp.example`` falls back to ``corp.example``.
+    """
+
+    def __init__(self) -> None:
+        self._root = _Node()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, domain: str, company_id: UUID) -> None:
+        node = self._root
+        for label in reversed(normalize_domain(domain).split(".")):
+            node = node.children.setdefault(label, _Node())
+        if node.company_id is None:
+            self._size += 1
+        node.company_id = company_id
+
+    def discard(self, domain: str) -> None:
+        path = [self._root]
+        labels = list(reversed(normalize_domain(domain).split(".")))
+        for label in labels:
+            node = path[-1].children.get(label)
+            if node is None:
+                return
+            path.append(node)
+        if path[-1].company_id is None:
+            return
+        path[-1].company_id = None
+        self._size -= 1
+        # Срезаем опустевшую ветку снизу вверх
+        for label, node, parent in zip(reversed(labels), reversed(path[1:]), reversed(path[:-1])):
+            if node.children or node.company_id is not None:
+                break
+            del parent.children[label]
+
+    def resolve(self, host: str) -> UUID | None:
+        node, found = self._root, None
+        for label in reversed(normalize_domain(host).split(".")):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if node.company_id is not None:
+                found = node.company_id
+        return found
+
+
+def _routable_domains() -> Select:
+    # Только подтверждённые домены компаний, которые принимают регистрацию по домену
+    return (
+        select(CompanyDomain.domain, CompanyDomain.company_id)
+        .join(Company, Company.id == CompanyDomain.company_id)
+        .where(
+            CompanyDomain.is_verified.is_(True),
+            Company.signup_mode == SignupMode.DOMAIN,
+            Company.status.not_in((CompanyStatus.SUSPENDED, CompanyStatus.ARCHIVED)),
+        )
+    )
+
+
+class VerifiedDomainIndex:
+    """In-memory view of routable verified domains, resolved on signup without SQL.
+
+    A full ``load`` runs at startup and then periodically (other processes'
+    changes arrive that way); this process's own changes apply at once via
+    ``refresh_company`` after the commit that made them.
+    """
+
+    def __init__(self) -> None:
+        self._trie = DomainTrie()
+        self._by_company: dict[UUID, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._trie)
+
+    def resolve_email(self, email: str) -> UUID | None:
+        return self._trie.resolve(email_domain(email))
+
+    def replace_company(self, company_id: UUID, domains: Iterable[str]) -> None:
+        """Make ``domains`` the complete set of routable domains of one company."""
+        for domain in self._by_company.pop(company_id, ()):
+            self._trie.discard(domain)
+        domains = {normalize_domain(d) for d in domains}
+        for domain in domains:
+            self._trie.add(domain, company_id)
+        if domains:
+            self._by_company[company_id] = domains
+
+    async def load(self, session: AsyncSession) -> int:
+        """Rebuild the index from the database; swapped in whole, never half-built."""
+        trie, by_company = DomainTrie(), {}
+        for domain, company_id in await session.execute(_routable_domains()):
+            trie.add(domain, company_id)
+            by_company.setdefault(company_id, set()).add(normalize_domain(domain))
+        self._trie, self._by_company = trie, by_company
+        return len(trie)
+
+    async def refresh_company(self, session: AsyncSession, company_id: UUID) -> None:
+        """Re-read one company's routable domains (after a commit that changed them)."""
+        rows = await session.scalars(
+            _routable_domains().with_only_columns(CompanyDomain.domain).where(CompanyDomain.company_id == company_id)
+        )
+        self.replace_company(company_id, rows)
+
+
+verified_domains = VerifiedDomainIndex()
+
+
+async def run_domain_index_sync(
+    interval: float,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> None:
+    """Load ``verified_domains`` now and reload it every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            async with session_factory() as session:
+                await verified_domains.load(session)
+        except Exception:
+            logger.exception("verified domain index sync failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+import hashlib
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+# Клиент обязан перепроверять (If-None-Match) перед каждым использованием копии
+CACHE_CONTROL = "private, no-cache"
+
+
+def strong_etag(body: bytes) -> str:
+    """Strong validator of exact response bytes."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """``If-None-Match`` check (weak comparison, as RFC 9110 prescribes for it)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+
+def etag_response(request: Request, body: bytes, etag: str | None = None) -> Response:
+    """JSON ``body`` with a strong ETag, or an empty 304 when the client already has it."""
+    etag = etag or strong_etag(body)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def model_etag_response(request: Request, model: BaseModel) -> Response:
+    return etag_response(request, model.model_dump_json().encode())
@@ -0,0 +1,249 @@
+from __future__ import annotations
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Prometheus-метрики процесса
+# ---------------------------------------------------------------------------
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Handler time per request", ["method", "route"]
+)
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements per request", ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "db_time_per_request_seconds", "Time spent executing SQL per request", ["method", "route"]
+)
+POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REPLICA_LAG_SECONDS = Gauge(
+    "db_replica_lag_seconds", "Last measured replication lag (+Inf if unreachable)", ["pool"]
+)
+SWEEPER_ROWS = Counter(
+    "sweeper_rows_moved_total", "Rows moved past due_at by the sweeper", ["rule"]
+)
+OUTBOX_EVENTS = Counter(
+    "outbox_events_total", "Outbox events handled by the relay", ["event_type", "outcome"]
+)
+WEBHOOK_DELIVERIES = Counter(
+    "webhook_deliveries_total", "Webhook events by delivery outcome", ["outcome"]
+)
+WEBHOOK_REQUEST_SECONDS = Histogram(
+    "webhook_request_duration_seconds", "Time of one webhook POST (batch of events)"
+)
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+def render_metrics() -> bytes:
+    return generate_latest()
+
+
+# ---------------------------------------------------------------------------
+# Статистика текущего запроса
+# ---------------------------------------------------------------------------
+
+@dataclass
+class RequestStats:
+    """SQL counters of one request, filled by the engine hooks below."""
+    queries: int = 0
+    db_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+    statements: list[str] = field(default_factory=list)
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+def record_pool_wait(pool: str, seconds: float) -> None:
+    """Called by the instrumented pools for every checkout."""
+    POOL_WAIT_SECONDS.labels(pool).observe(seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    # Тексты запросов копим, только если включён порог логирования
+    if settings.SLOW_REQUEST_QUERY_THRESHOLD:
+        stats.statements.append(statement)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach statement counting/timing hooks to a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------------------------------------------------------
+# Состояние пулов соединений
+# ---------------------------------------------------------------------------
+
+# Движки по имени пула; engine.pool читаем при каждом сборе — dispose() меняет пул
+_engines: dict[str, Engine] = {}
+
+
+def register_engine(name: str, engine: Engine) -> None:
+    _engines[name] = engine
+
+
+def _wait_histogram(pool: str) -> tuple[dict[str, float], float, float]:
+    """Cumulative bucket counts, observation count and sum of pool wait."""
+    buckets: dict[str, float] = {}
+    count = total = 0.0
+    for metric in POOL_WAIT_SECONDS.collect():
+        for sample in metric.samples:
+            if sample.labels.get("pool") != pool:
+                continue
+            if sample.name.endswith("_bucket"):
+                buckets[sample.labels["le"]] = sample.value
+            elif sample.name.endswith("_count"):
+                count = sample.value
+            elif sample.name.endswith("_sum"):
+                total = sample.value
+    return buckets, count, total
+
+
+def pool_stats() -> list[dict]:
+    """Snapshot of every registered pool: occupancy, limits and wait histogram."""
+    stats = []
+    for name, engine in _engines.items():
+        pool = engine.pool
+        queued = hasattr(pool, "size")
+        buckets, count, total = _wait_histogram(name)
+        stats.append({
+            "name": name,
+            "pool_class": type(pool).__name__,
+            "size": pool.size() if queued else 0,
+            "max_overflow": getattr(pool, "_max_overflow", 0) if queued else 0,
+            "checked_in": pool.checkedin() if queued else 0,
+            "checked_out": pool.checkedout() if queued else 0,
+            "overflow": max(pool.overflow(), 0) if queued else 0,
+            "timeout": pool.timeout() if queued else None,
+            "wait_count": int(count),
+            "wait_seconds_total": total,
+            "wait_histogram": buckets,
+        })
+    return stats
+
+
+class _PoolCollector:
+    """Exposes pool occupancy gauges on /metrics at scrape time."""
+
+    def collect(self):
+        gauges = {
+            "checked_out": GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["pool"]),
+            "checked_in": GaugeMetricFamily("db_pool_checked_in", "Idle pooled connections", labels=["pool"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Connections above pool_size", labels=["pool"]),
+            "size": GaugeMetricFamily("db_pool_size", "Configured pool_size", labels=["pool"]),
+        }
+        for stats in pool_stats():
+            for key, gauge in gauges.items():
+                gauge.add_metric([stats["name"]], stats[key])
+        yield from gauges.values()
+
+
+REGISTRY.register(_PoolCollector())
+
+
+# ---------------------------------------------------------------------------
+# ASGI middleware
+# ---------------------------------------------------------------------------
+
+def _route_label(scope: Scope) -> str:
+    # Шаблон пути (/api/v1/quests/{quest_id}), а не сам путь: ограниченная кардинальность
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _server_timing(stats: RequestStats, handler_seconds: float) -> bytes:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+        f"pool;dur={stats.pool_wait_seconds * 1000:.1f}, "
+        f"app;dur={handler_seconds * 1000:.1f}"
+    ).encode()
+
+
+class InstrumentationMiddleware:
+    """Per-request SQL count, DB time, pool wait and handler time.
+
+    Figures go to the Prometheus histograms above and, for the part known
+    when headers are sent, to a ``Server-Timing`` response header. Requests
+    over ``SLOW_REQUEST_QUERY_THRESHOLD`` statements are logged with their SQL.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - started)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._observe(scope, stats, time.perf_counter() - started, status_code)
+
+    @staticmethod
+    def _observe(scope: Scope, stats: RequestStats, elapsed: float, status_code: int) -> None:
+        method, route = scope["method"], _route_label(scope)
+        REQUESTS.labels(method, route, str(status_code)).inc()
+        REQUEST_SECONDS.labels(method, route).observe(elapsed)
+        REQUEST_QUERIES.labels(method, route).observe(stats.queries)
+        REQUEST_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+        threshold = settings.SLOW_REQUEST_QUERY_THRESHOLD
+        if threshold and stats.queries > threshold:
+            logger.warning(
+                "%s %s issued %d SQL statements (threshold %d, %.1f ms in DB):\n%s",
+                method, route, stats.queries, threshold, stats.db_seconds * 1000,
+                "\n".join(stats.statements),
+            )
@@ -0,0 +1,52 @@
+from __future__ import annotations
+import asyncio
+import ipaddress
+import socket
+
+# Имена, которые по определению указывают на саму машину или локальную сеть
+_LOCAL_SUFFIXES = (".localhost", ".local", ".internal")
+
+
+def is_public_address(address: str) -> bool:
+    """True for a globally routable unicast IP: not loopback, private, link-local or reserved."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def is_local_hostname(host: str) -> bool:
+    host = host.rstrip(".").lower()
+    return host == "localhost" or host.endswith(_LOCAL_SUFFIXES)
+
+
+def ip_literal(host: str) -> str | None:
+    """``host`` itself if it is an IP address (with or without brackets), else None."""
+    candidate = host.strip("[]")
+    try:
+        ipaddress.ip_address(candidate.split("%", 1)[0])
+    except ValueError:
+        return None
+    return candidate
+
+
+async def public_address(host: str, port: int) -> str | None:
+    """An address to connect to for ``host``, or None if it is not safe to call.
+
+    Every address the name resolves to must be public: a name that also
+    points inside the network is refused as a whole. Callers connect to the
+    returned address, so a later DNS answer cannot redirect the request.
+    """
+    if is_local_hostname(host):
+        return None
+    literal = ip_literal(host)
+    if literal is not None:
+        return literal if is_public_address(literal) else None
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError:
+        return None
+    addresses = [info[4][0] for info in infos]
+    if not addresses or not all(is_public_address(address) for address in addresses):
+        return None
+    return addresses[0]
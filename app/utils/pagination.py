@@ -0,0 +1,34 @@
+from __future__ import annotations
+from typing import Any, AsyncIterator
+
+from fastapi import Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class PageParams(BaseModel):
+    cursor: str | None = None
+    limit: int = 50
+
+
+def page_params(
+    cursor: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    limit: int = Query(50, ge=1, le=500),
+) -> PageParams:
+    """Dependency: параметры keyset-пагинации для list-эндпоинтов."""
+    return PageParams(cursor=cursor, limit=limit)
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Клиент запросил потоковую выдачу (Accept: application/x-ndjson)."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(rows: AsyncIterator[Any], schema: type[BaseModel]) -> StreamingResponse:
+    """Stream rows as NDJSON, one validated ``schema`` object per line."""
+    async def body() -> AsyncIterator[str]:
+        async for row in rows:
+            yield schema.model_validate(row).model_dump_json() + "\n"
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
@@ -1,16 +1,20 @@
-from datetime import datetime, timedelta
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
 
-from jose import jwt, JWTError
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from jose import JWTError
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from pydantic import ValidationError
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.core.config import settings
-from app.models.models import User
-from app.db.session import SessionLocal
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.models.models import User, Membership
+from app.models.enums import MembershipStatus
+from app.db.session import READ_ONLY_METHODS, get_async_db
+from app.utils.cache import TTLCache
+from app.utils.hashing import pwd_context
+from app.utils.tokens import TokenClaims, create_access_token, decode_access_token, revocations
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -23,36 +27,145 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+async def get_user_by_id(db: AsyncSession, user_id: UUID):
+    return await db.get(User, user_id)
+
+
+# ---------------------------------------------------------------------------
+# Принципал запроса: User + его ACTIVE-членства, один раз на запрос
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Principal:
+    """Authenticated user together with their active memberships."""
+    user: User
+    memberships: list[Membership] = field(default_factory=list)
+
+    @property
+    def active_membership(self) -> Membership | None:
+        """The oldest active membership, or None."""
+        return self.memberships[0] if self.memberships else None
+
+    def membership_for(self, company_id: UUID) -> Membership | None:
+        """Active membership in the given company, or None."""
+        return next((m for m in self.memberships if m.company_id == company_id), None)
+
+
+# Снимок строк (значения колонок) по JWT sub; ORM-объекты не кэшируем,
+# чтобы не делить их между сессиями
+_Snapshot = tuple[dict[str, Any], list[dict[str, Any]]]
+
+identity_cache: TTLCache[str, _Snapshot] = TTLCache(
+    maxsize=settings.IDENTITY_CACHE_MAX_SIZE,
+    ttl=settings.IDENTITY_CACHE_TTL_SECONDS,
+)
+
+
+def _snapshot(obj: Any) -> dict[str, Any]:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+async def _attach(db: AsyncSession, model: type, values: dict[str, Any]) -> Any:
+    # Восстанавливаем «чистый» detached-объект и подключаем к сессии без SELECT
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    return await db.merge(obj, load=False)
+
 
+@event.listens_for(Session, "after_flush")
+def _collect_identity_changes(session: Session, flush_context: Any) -> None:
+    # Вытесняем только после commit: до него конкурентный запрос закэшировал
+    # бы старую строку из БД на весь TTL
+    stale = session.info.setdefault("identity_stale", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            stale.add(str(obj.id))
+        elif isinstance(obj, Membership):
+            stale.add(str(obj.user_id))
 
-def get_user_by_id(db, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
 
+@event.listens_for(Session, "after_commit")
+def _invalidate_identity_cache(session: Session) -> None:
+    for user_id in session.info.pop("identity_stale", ()):
+        identity_cache.invalidate(user_id)
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+
+@event.listens_for(Session, "after_rollback")
+def _forget_identity_changes(session: Session) -> None:
+    session.info.pop("identity_stale", None)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Не удалось проверить токен",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def verify_token(token: str = Depends(oauth2_scheme)) -> TokenClaims:
+    """Signature/kid/exp check (cached per token) plus the in-memory revocation list."""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except (JWTError, ValidationError):
-        raise credentials_exception
+        claims = decode_access_token(token)
+    except JWTError:
+        raise _credentials_exception()
+    if revocations.is_revoked(claims):
+        raise _credentials_exception()
+    return claims
+
+
+async def get_current_principal(
+    claims: TokenClaims = Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    user_id = str(claims.user_id)
 
-    db = SessionLocal()
-    user = get_user_by_id(db, user_id=int(user_id))
-    db.close()
+    # Ключ read-your-writes: после записи пользователь какое-то время читает с primary
+    db.info["user_key"] = user_id
 
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        user_values, membership_values = cached
+        user = await _attach(db, User, user_values)
+        memberships = [await _attach(db, Membership, values) for values in membership_values]
+        return Principal(user=user, memberships=memberships)
+
+    # Загрузка на сессии запроса (тот же get_db, что и у роутеров)
+    user = await get_user_by_id(db, user_id=claims.user_id)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+    memberships = list(
+        await db.scalars(
+            select(Membership)
+            .where(
+                Membership.user_id == user.id,
+                Membership.status == MembershipStatus.ACTIVE,
+            )
+            .order_by(Membership.created_at)
+        )
+    )
+    identity_cache.set(user_id, (_snapshot(user), [_snapshot(m) for m in memberships]))
+    return Principal(user=user, memberships=memberships)
+
+
+async def get_current_user(principal: Principal = Depends(get_current_principal)):
+    return principal.user
+
+
+async def get_token_claims(
+    request: Request,
+    claims: TokenClaims = Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db),
+) -> TokenClaims:
+    """Authorization data for hot read paths, without SQL when the token allows it.
+
+    GET/HEAD requests trust the role and memberships embedded in the token
+    unless they were marked stale after it was issued (role or membership
+    change, deletion). Everything else is answered from the database, as
+    ``get_current_principal`` does.
+    """
+    if request.method in READ_ONLY_METHODS and claims.embedded and not revocations.claims_stale(claims):
+        db.info["user_key"] = str(claims.user_id)
+        return claims
+    principal = await get_current_principal(claims, db)
+    return claims.with_identity(principal.user, principal.memberships)
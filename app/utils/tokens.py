@@ -0,0 +1,308 @@
+from __future__ import annotations
+import asyncio
+import dataclasses
+import hashlib
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable
+from uuid import UUID
+
+from jose import JWTError, jwt
+from sqlalchemy import Connection, delete, event, func, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.enums import GlobalRole, MembershipRole, MembershipStatus
+from app.models.models import Membership, TokenRevocation, User
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_TTL = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+# ---------------------------------------------------------------------------
+# Ключи подписи: kid в заголовке токена выбирает ключ проверки
+# ---------------------------------------------------------------------------
+
+_SIGNING_KEYS = settings.signing_keys
+if settings.JWT_ACTIVE_KID and settings.JWT_ACTIVE_KID not in _SIGNING_KEYS:
+    raise RuntimeError(f"JWT_ACTIVE_KID {settings.JWT_ACTIVE_KID!r} is not in JWT_SIGNING_KEYS")
+
+
+def _verification_key(token: str) -> str:
+    # Токены без kid (выпущенные до ротации) проверяем SECRET_KEY
+    kid = jwt.get_unverified_header(token).get("kid")
+    if kid is None:
+        return settings.SECRET_KEY
+    try:
+        return _SIGNING_KEYS[kid]
+    except KeyError:
+        raise JWTError(f"Unknown signing key {kid!r}")
+
+
+def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
+    """Sign ``data`` with the active key, adding ``exp``, ``iat`` and a ``jti``."""
+    issued = datetime.now(timezone.utc)
+    to_encode = {"jti": uuid.uuid4().hex, **data, "iat": issued, "exp": issued + (expires_delta or ACCESS_TOKEN_TTL)}
+    kid = settings.JWT_ACTIVE_KID or None
+    key = _SIGNING_KEYS[kid] if kid else settings.SECRET_KEY
+    return jwt.encode(to_encode, key, algorithm=settings.ALGORITHM, headers={"kid": kid} if kid else None)
+
+
+# ---------------------------------------------------------------------------
+# Claims: роль и активные членства внутри токена
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class MembershipClaim:
+    """Active membership as embedded in an access token."""
+    id: UUID
+    company_id: UUID
+    role: MembershipRole
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    """A verified access token.
+
+    ``global_role`` and ``memberships`` are None for tokens issued without
+    embedded claims; such tokens always take the database path.
+    """
+    user_id: UUID
+    jti: str | None
+    issued_at: int | None
+    expires_at: int
+    global_role: GlobalRole | None = None
+    memberships: tuple[MembershipClaim, ...] | None = None
+
+    @property
+    def embedded(self) -> bool:
+        return self.global_role is not None and self.memberships is not None
+
+    @property
+    def active_membership(self) -> MembershipClaim | None:
+        """The oldest active membership, or None."""
+        return self.memberships[0] if self.memberships else None
+
+    def membership_for(self, company_id: UUID) -> MembershipClaim | None:
+        return next((m for m in self.memberships or () if m.company_id == company_id), None)
+
+    def with_identity(self, user: User, memberships: Iterable[Membership]) -> TokenClaims:
+        """Copy with role and memberships taken from freshly loaded rows."""
+        return dataclasses.replace(
+            self,
+            global_role=user.global_role,
+            memberships=tuple(MembershipClaim(m.id, m.company_id, m.role) for m in memberships),
+        )
+
+
+def embedded_claims(user: User, memberships: Iterable[Membership]) -> dict[str, Any]:
+    """Compact JWT claims of the user's global role and active memberships (oldest first)."""
+    return {
+        "role": user.global_role.value,
+        "mem": [[str(m.id), str(m.company_id), m.role.value] for m in memberships],
+    }
+
+
+def _parse(payload: dict[str, Any]) -> TokenClaims:
+    try:
+        claims = TokenClaims(
+            user_id=UUID(payload["sub"]),
+            jti=payload.get("jti"),
+            issued_at=payload.get("iat"),
+            expires_at=payload["exp"],
+        )
+        if "role" in payload and "mem" in payload:
+            claims = dataclasses.replace(
+                claims,
+                global_role=GlobalRole(payload["role"]),
+                memberships=tuple(
+                    MembershipClaim(UUID(id), UUID(company_id), MembershipRole(role))
+                    for id, company_id, role in payload["mem"]
+                ),
+            )
+        return claims
+    except (KeyError, TypeError, ValueError) as exc:
+        raise JWTError("Malformed token claims") from exc
+
+
+# Разобранные токены по sha256 токена, каждый живёт до своего exp
+_decoded: TTLCache[str, TokenClaims] = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=ACCESS_TOKEN_TTL.total_seconds(),
+)
+
+
+def decode_access_token(token: str) -> TokenClaims:
+    """Verify ``token`` (signature, kid, exp) once and serve repeats from the LRU.
+
+    Raises ``JWTError``; revocation is checked separately on every use.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    claims = _decoded.get(key)
+    if claims is None:
+        payload = jwt.decode(token, _verification_key(token), algorithms=[settings.ALGORITHM])
+        claims = _parse(payload)
+        _decoded.set(key, claims, ttl=claims.expires_at - time.time())
+    return claims
+
+
+# ---------------------------------------------------------------------------
+# Список отзыва: в памяти процесса, источник — таблица token_revocations
+# ---------------------------------------------------------------------------
+
+class RevocationList:
+    """In-memory view of ``token_revocations``, consulted on every request without SQL.
+
+    Revoked jtis are rejected outright. A user marker only withdraws trust in
+    the *embedded claims* of that user's tokens issued up to the marker: those
+    requests take the database path, which sees the current role and status.
+    Entries are dropped once every token they could affect has expired.
+    """
+
+    # Перечитываем с нахлёстом: строка могла закоммититься позже своего revoked_at
+    SYNC_OVERLAP = timedelta(minutes=1)
+
+    def __init__(self) -> None:
+        self._tokens: dict[str, float] = {}
+        self._users: dict[str, tuple[float, float]] = {}
+        self._synced_to: datetime | None = None
+
+    def revoke_token(self, jti: str, expires_at: float) -> None:
+        self._tokens[jti] = expires_at
+
+    def mark_stale(self, user_id: str, since: float, expires_at: float) -> None:
+        current = self._users.get(user_id)
+        if current is None or current[0] < since:
+            self._users[user_id] = (since, expires_at)
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        return claims.jti is not None and claims.jti in self._tokens
+
+    def claims_stale(self, claims: TokenClaims) -> bool:
+        marker = self._users.get(str(claims.user_id))
+        return marker is not None and (claims.issued_at is None or claims.issued_at <= marker[0])
+
+    def apply(self, row: TokenRevocation) -> None:
+        expires_at = row.expires_at.timestamp()
+        if row.jti is not None:
+            self.revoke_token(row.jti, expires_at)
+        elif row.user_id is not None:
+            self.mark_stale(str(row.user_id), row.revoked_at.timestamp(), expires_at)
+
+    def purge(self, now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._users = {uid: marker for uid, marker in self._users.items() if marker[1] > now}
+
+    async def sync(self, session: AsyncSession) -> int:
+        """Load revocations recorded since the last sync (by any process)."""
+        stmt = select(TokenRevocation).where(TokenRevocation.expires_at > func.now())
+        if self._synced_to is not None:
+            stmt = stmt.where(TokenRevocation.revoked_at > self._synced_to - self.SYNC_OVERLAP)
+        rows = list(await session.scalars(stmt))
+        for row in rows:
+            self.apply(row)
+            if self._synced_to is None or row.revoked_at > self._synced_to:
+                self._synced_to = row.revoked_at
+        if self._synced_to is None:
+            self._synced_to = datetime.now(timezone.utc)
+        self.purge()
+        return len(rows)
+
+
+revocations = RevocationList()
+
+
+def _utc(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+
+def revoke(session: AsyncSession, claims: TokenClaims) -> None:
+    """Revoke one token (logout); takes effect here at once, elsewhere after the next sync."""
+    if claims.jti is None:
+        return
+    session.add(TokenRevocation(
+        jti=claims.jti, user_id=claims.user_id, revoked_at=datetime.now(timezone.utc),
+        expires_at=_utc(claims.expires_at),
+    ))
+    revocations.revoke_token(claims.jti, claims.expires_at)
+
+
+def mark_claims_stale(connection: Connection, *user_ids: UUID) -> None:
+    """Withdraw trust in the embedded claims of every token the users hold now."""
+    if not user_ids:
+        return
+    since = time.time()
+    expires_at = since + ACCESS_TOKEN_TTL.total_seconds()
+    connection.execute(
+        insert(TokenRevocation).values([
+            {"id": uuid.uuid4(), "user_id": user_id, "revoked_at": _utc(since), "expires_at": _utc(expires_at)}
+            for user_id in user_ids
+        ])
+    )
+    for user_id in user_ids:
+        revocations.mark_stale(str(user_id), since, expires_at)
+
+
+# Изменения, после которых claims в уже выданных токенах устарели:
+# глобальная роль, удаление пользователя, роль/статус/компания членства
+@event.listens_for(User, "after_update")
+def _user_claims_on_update(mapper, connection, target):  # type: ignore
+    if inspect(target).attrs.global_role.history.has_changes():
+        mark_claims_stale(connection, target.id)
+
+@event.listens_for(User, "after_delete")
+def _user_claims_on_delete(mapper, connection, target):  # type: ignore
+    mark_claims_stale(connection, target.id)
+
+@event.listens_for(Membership, "after_insert")
+def _membership_claims_on_insert(mapper, connection, target):  # type: ignore
+    if target.status == MembershipStatus.ACTIVE:
+        mark_claims_stale(connection, target.user_id)
+
+@event.listens_for(Membership, "after_update")
+def _membership_claims_on_update(mapper, connection, target):  # type: ignore
+    attrs = inspect(target).attrs
+    if any(attrs[key].history.has_changes() for key in ("role", "status", "company_id", "user_id")):
+        mark_claims_stale(connection, target.user_id)
+
+@event.listens_for(Membership, "after_delete")
+def _membership_claims_on_delete(mapper, connection, target):  # type: ignore
+    mark_claims_stale(connection, target.user_id)
+
+
+async def purge_expired_revocations(session: AsyncSession, batch_size: int = 1000) -> int:
+    """Delete one batch of rows whose tokens have all expired."""
+    t = TokenRevocation.__table__
+    expired = (
+        select(t.c.id)
+        .where(t.c.expires_at < func.now())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(t).where(t.c.id.in_(expired.scalar_subquery())),
+        execution_options={"preserve_rowcount": True},
+    )
+    return result.rowcount
+
+
+async def run_revocation_sync(
+    interval: float,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> None:
+    """Keep ``revocations`` in step with the table until cancelled."""
+    while True:
+        try:
+            async with session_factory() as session:
+                await revocations.sync(session)
+                await purge_expired_revocations(session)
+                await session.commit()
+        except Exception:
+            logger.exception("token revocation sync failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,134 @@
+"""Benchmark: latency of GET /api/v1/search on a large seeded dataset.
+
+Seeds ``--companies`` throwaway companies with ``--rows`` searchable documents
+in total (split evenly between quests, quest steps and probation tasks) and
+``--people`` members, built server-side with ``generate_series``. Then runs
+``--queries`` searches of random words and prefixes as one tenant through
+SearchService and reports p50/p95/p99 latency per kind of query.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, insert, select, text
+
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models.enums import SearchKind
+from app.models.models import Company, Membership, ProbationTask, Quest, User
+from app.services.base import UnitOfWork
+from app.services.search_service import SearchService
+
+VOCABULARY = [
+    "onboarding", "security", "policy", "benefits", "payroll", "laptop", "access", "training",
+    "welcome", "handbook", "compliance", "mentor", "review", "checklist", "office", "vacation",
+    "безопасность", "инструктаж", "охрана", "труда", "документы", "наставник", "отпуск", "доступ",
+]
+
+
+def seed(rows: int, people: int, companies: int) -> list[uuid.UUID]:
+    company_ids = [uuid.uuid4() for _ in range(companies)]
+    words = "ARRAY[" + ", ".join(f"'{w}'" for w in VOCABULARY) + "]"
+    # Фраза из трёх случайных слов словаря
+    phrase = " || ' ' || ".join([f"({words})[1 + floor(random() * {len(VOCABULARY)})::int]"] * 3)
+    per_table = rows // 3
+    with SessionLocal() as db:
+        db.execute(insert(Company), [{"id": cid, "name": f"bench-{cid.hex[:8]}"} for cid in company_ids])
+        params = {"companies": company_ids, "people": people, "rows": per_table}
+        db.execute(text("""
+            INSERT INTO users (id, email, global_role, created_at, updated_at)
+            SELECT gen_random_uuid(), 'bench-' || g || '-' || substr(md5(random()::text), 1, 6) || '@example.com',
+                   'NONE', now(), now()
+            FROM generate_series(1, :people) g
+        """), params)
+        db.execute(text("""
+            INSERT INTO memberships (id, user_id, company_id, role, status, probation_status, created_at, updated_at)
+            SELECT gen_random_uuid(), u.id, (:companies)[1 + (row_number() OVER () % cardinality(:companies))],
+                   'EMPLOYEE', 'ACTIVE', 'ONGOING', now(), now()
+            FROM users u WHERE u.email LIKE 'bench-%@example.com'
+        """), params)
+        db.execute(text(f"""
+            INSERT INTO quests (id, company_id, title, description, is_mandatory, status, created_at, updated_at)
+            SELECT gen_random_uuid(), (:companies)[1 + g % cardinality(:companies)], {phrase}, {phrase},
+                   true, 'DRAFT', now(), now()
+            FROM generate_series(1, :rows) g
+        """), params)
+        db.execute(text(f"""
+            INSERT INTO quest_steps (id, quest_id, sort_order, title, step_type, required, approval_required_role, created_at)
+            SELECT gen_random_uuid(), q.id, 1, {phrase}, 'doc', true, 'NONE', now()
+            FROM quests q WHERE q.company_id = ANY(:companies)
+        """), params)
+        db.execute(text(f"""
+            INSERT INTO probation_tasks (id, company_id, created_by_member, assigned_to_member, title, description,
+                                         status, created_at, updated_at)
+            SELECT gen_random_uuid(), m.company_id, m.id, m.id, {phrase}, {phrase}, 'TODO', now(), now()
+            FROM generate_series(1, :rows) g
+            JOIN LATERAL (
+                SELECT id, company_id FROM memberships
+                WHERE company_id = (:companies)[1 + g % cardinality(:companies)] LIMIT 1
+            ) m ON true
+        """), params)
+        db.commit()
+        db.execute(text("ANALYZE users, memberships, quests, quest_steps, probation_tasks"))
+        db.commit()
+    return company_ids
+
+
+def cleanup(company_ids: list[uuid.UUID]) -> None:
+    with SessionLocal() as db:
+        # Задачи и квесты — первыми: иначе каскад с memberships ищет их по неиндексированным FK
+        db.execute(delete(ProbationTask).where(ProbationTask.company_id.in_(company_ids)))
+        db.execute(delete(Quest).where(Quest.company_id.in_(company_ids)))
+        user_ids = select(Membership.user_id).where(Membership.company_id.in_(company_ids))
+        db.execute(delete(User).where(User.id.in_(user_ids)))
+        db.execute(delete(Company).where(Company.id.in_(company_ids)))
+        db.commit()
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(company_id: uuid.UUID, queries: int, limit: int) -> None:
+    shapes = {
+        "word": lambda: random.choice(VOCABULARY),
+        "prefix": lambda: random.choice(VOCABULARY)[:4],
+        "two words": lambda: " ".join(random.sample(VOCABULARY, 2)),
+        "person": lambda: f"bench-{random.randint(1, 1000)}",
+    }
+    for name, make in shapes.items():
+        kinds = [SearchKind.PERSON] if name == "person" else None
+        samples: list[float] = []
+        for _ in range(queries):
+            async with AsyncSessionLocal() as session:
+                service = SearchService(UnitOfWork(lambda: session))
+                q = make()
+                # Первая страница и следующая по курсору — типичный запрос из UI
+                started = time.perf_counter()
+                hits, next_cursor = await service.search(company_id, q, kinds=kinds, limit=limit)
+                if next_cursor:
+                    await service.search(company_id, q, kinds=kinds, cursor=next_cursor, limit=limit)
+                samples.append((time.perf_counter() - started) * 1000)
+        print(f"{name:>10}: p50 {statistics.median(samples):8.1f} ms, "
+              f"p95 {percentile(samples, 0.95):8.1f} ms, p99 {percentile(samples, 0.99):8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--people", type=int, default=100_000)
+    parser.add_argument("--companies", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    company_ids = seed(args.rows, args.people, args.companies)
+    try:
+        asyncio.run(run(company_ids[0], args.queries, args.limit))
+    finally:
+        cleanup(company_ids)
+
+#PYTHONPATH=. python scripts/bench_search.py --rows 1000000 --people 100000 --queries 200
@@ -0,0 +1,102 @@
+"""Benchmark: recursive CTE vs. the old per-node loop in get_subordinates.
+
+Seeds a throwaway company with ``--size`` memberships arranged as a tree with
+``--branching`` direct reports per manager, then times both strategies for the
+root manager and reports wall time and number of SQL statements.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import delete, event, insert, select
+
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine
+from app.models.enums import MembershipRole, MembershipStatus
+from app.models.models import Company, Membership, User
+from app.services.base import UnitOfWork
+from app.services.membership_service import MembershipService
+
+
+def seed(size: int, branching: int) -> tuple[uuid.UUID, uuid.UUID]:
+    company_id = uuid.uuid4()
+    user_ids = [uuid.uuid4() for _ in range(size)]
+    member_ids = [uuid.uuid4() for _ in range(size)]
+    with SessionLocal() as db:
+        db.execute(insert(Company), [{"id": company_id, "name": f"bench-{company_id.hex[:8]}"}])
+        db.execute(insert(User), [
+            {"id": uid, "email": f"bench-{uid.hex}@example.com"} for uid in user_ids
+        ])
+        db.execute(insert(Membership), [
+            {
+                "id": member_ids[i],
+                "user_id": user_ids[i],
+                "company_id": company_id,
+                "role": MembershipRole.EMPLOYEE,
+                "status": MembershipStatus.ACTIVE,
+                # i-й сотрудник подчиняется (i-1)//branching-му
+                "manager_membership_id": member_ids[(i - 1) // branching] if i else None,
+            }
+            for i in range(size)
+        ])
+        db.commit()
+    return company_id, member_ids[0]
+
+
+def cleanup(company_id: uuid.UUID) -> None:
+    with SessionLocal() as db:
+        user_ids = select(Membership.user_id).where(Membership.company_id == company_id)
+        db.execute(delete(User).where(User.id.in_(user_ids)))
+        db.execute(delete(Company).where(Company.id == company_id))
+        db.commit()
+
+
+async def legacy_loop(session, manager: Membership) -> list[Membership]:
+    # Прежняя реализация: один SELECT на каждый узел дерева
+    subs: list[Membership] = []
+    stack = [manager]
+    while stack:
+        current = stack.pop()
+        direct = (await session.scalars(
+            select(Membership).where(Membership.manager_membership_id == current.id)
+        )).all()
+        subs.extend(direct)
+        stack.extend(direct)
+    return subs
+
+
+async def run(root_id: uuid.UUID) -> None:
+    statements = 0
+
+    def count(*_args) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    for name in ("loop", "cte"):
+        async with AsyncSessionLocal() as session:
+            manager = await session.get(Membership, root_id)
+            statements = 0
+            started = time.perf_counter()
+            if name == "loop":
+                result = await legacy_loop(session, manager)
+            else:
+                result = await MembershipService(UnitOfWork(lambda: session)).get_subordinates(manager)
+            elapsed = time.perf_counter() - started
+        print(f"{name:>4}: {len(result):>6} subordinates, {statements:>6} statements, {elapsed * 1000:9.1f} ms")
+    event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--branching", type=int, default=3)
+    args = parser.parse_args()
+
+    company_id, root_id = seed(args.size, args.branching)
+    try:
+        asyncio.run(run(root_id))
+    finally:
+        cleanup(company_id)
+
+#PYTHONPATH=. python scripts/bench_subordinates.py --size 5000 --branching 3
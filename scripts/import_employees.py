@@ -0,0 +1,43 @@
+"""Bulk import of employees into a company from a CSV (with header) or NDJSON file.
+
+Columns / keys: email, role, manager_email, employment_type,
+probation_start_at, probation_end_at, reactivate. Existing users and
+memberships are updated in place, keeping their status unless reactivate is
+set; per-row errors are reported and do not stop the import.
+"""
+import argparse
+import asyncio
+from uuid import UUID
+
+from app.db.session import AsyncSessionLocal
+from app.models.enums import MembershipRole
+from app.services.base import UnitOfWork
+from app.services.import_service import CSV, NDJSON, EmployeeImportService, read_rows
+
+
+async def import_file(company_id: UUID, path: str, fmt: str):
+    async with AsyncSessionLocal() as session:
+        service = EmployeeImportService(UnitOfWork(lambda: session))
+        # Файл читается потоком, построчно
+        with open(path, encoding="utf-8-sig", errors="replace", newline="") as stream:
+            # Запуск с доступом к БД — права владельца компании
+            return await service.import_rows(company_id, read_rows(stream, fmt), MembershipRole.OWNER)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("company_id", type=UUID)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=[CSV, NDJSON], help="by default taken from the file extension")
+    args = parser.parse_args()
+
+    fmt = args.format or (NDJSON if args.path.endswith((".ndjson", ".jsonl")) else CSV)
+    result = asyncio.run(import_file(args.company_id, args.path, fmt))
+    print(f"✅ Пользователей создано: {result.users_created}, членств создано: {result.memberships_created}, "
+          f"обновлено: {result.memberships_updated}, руководителей связано: {result.managers_linked}")
+    if result.error_count:
+        print(f"❌ Ошибок: {result.error_count}")
+        for error in result.errors:
+            print(f"  строка {error.line}: {error.email or ''} {error.detail}")
+
+#PYTHONPATH=. python scripts/import_employees.py <company_id> employees.csv [--format csv|ndjson]
@@ -0,0 +1,28 @@
+"""Standalone partition maintenance worker.
+
+Pre-creates the next PARTITION_PREMAKE_MONTHS monthly partitions of
+probation_reviews and detaches those older than
+PROBATION_REVIEW_RETENTION_MONTHS. Run it next to API processes started with
+PARTITION_MAINTENANCE_INTERVAL_SECONDS=0, or from cron with ``--once``.
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.services.partition_service import maintain_partitions, run_partition_maintenance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--interval", type=float, default=settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS or 6 * 3600)
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        print(asyncio.run(maintain_partitions()))
+    else:
+        asyncio.run(run_partition_maintenance(args.interval))
+
+#PYTHONPATH=. python scripts/maintain_partitions.py [--once] [--interval 21600]
@@ -0,0 +1,23 @@
+import sys
+from uuid import UUID
+
+from app.db.session import SessionLocal
+from app.services.membership_service import rebuild_membership_closure
+
+
+def rebuild(company_id: UUID | None = None):
+    db = SessionLocal()
+    try:
+        rows = rebuild_membership_closure(db.connection(), company_id)
+        db.commit()
+        print(f"✅ Пересчитано строк membership_closure: {rows}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка при пересчёте: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild(UUID(sys.argv[1]) if len(sys.argv) > 1 else None)
+
+#PYTHONPATH=. python scripts/rebuild_org_closure.py [company_id]
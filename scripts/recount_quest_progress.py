@@ -0,0 +1,23 @@
+import sys
+from uuid import UUID
+
+from app.db.session import SessionLocal
+from app.services.quest_service import recount_assignment_progress
+
+
+def recount(quest_id: UUID | None = None):
+    db = SessionLocal()
+    try:
+        rows = recount_assignment_progress(db.connection(), quest_id)
+        db.commit()
+        print(f"✅ Пересчитан прогресс назначений: {rows}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка при пересчёте: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    recount(UUID(sys.argv[1]) if len(sys.argv) > 1 else None)
+
+#PYTHONPATH=. python scripts/recount_quest_progress.py [quest_id]
@@ -0,0 +1,27 @@
+"""Standalone outbox relay: dispatches domain events to the registered handlers.
+
+Run it next to API processes started with OUTBOX_RELAY_INTERVAL_SECONDS=0, or
+as several replicas: batches are claimed with FOR UPDATE SKIP LOCKED.
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.services.outbox_service import relay_once, run_outbox_relay
+import app.services.webhook_service  # noqa: F401  регистрирует обработчики событий
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--interval", type=float, default=settings.OUTBOX_RELAY_INTERVAL_SECONDS or 1)
+    parser.add_argument("--once", action="store_true", help="drain due events once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        print(asyncio.run(relay_once()))
+    else:
+        asyncio.run(run_outbox_relay(args.interval))
+
+#PYTHONPATH=. python scripts/run_outbox_relay.py [--once] [--interval 1]
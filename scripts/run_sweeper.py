@@ -0,0 +1,26 @@
+"""Standalone sweeper worker: moves overdue quest assignments and probation tasks.
+
+Run it next to API processes started with SWEEPER_INTERVAL_SECONDS=0, or as
+several replicas: batches are claimed with FOR UPDATE SKIP LOCKED.
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.services.sweeper_service import run_sweeper, sweep_once
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--interval", type=float, default=settings.SWEEPER_INTERVAL_SECONDS or 60)
+    parser.add_argument("--once", action="store_true", help="run a single tick and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        print(asyncio.run(sweep_once()))
+    else:
+        asyncio.run(run_sweeper(args.interval))
+
+#PYTHONPATH=. python scripts/run_sweeper.py [--once] [--interval 60]
@@ -0,0 +1,35 @@
+"""Standalone webhook dispatcher: POSTs queued events to company endpoints.
+
+Run it next to API processes started with WEBHOOK_DELIVERY_INTERVAL_SECONDS=0,
+or as several replicas: batches are leased with FOR UPDATE SKIP LOCKED.
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.services.webhook_service import WebhookDispatcher
+
+
+async def deliver_once() -> None:
+    dispatcher = WebhookDispatcher()
+    try:
+        await dispatcher.tick()
+        await dispatcher.drain()
+    finally:
+        await dispatcher.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--interval", type=float, default=settings.WEBHOOK_DELIVERY_INTERVAL_SECONDS or 1)
+    parser.add_argument("--once", action="store_true", help="send one batch per due subscription and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        asyncio.run(deliver_once())
+    else:
+        asyncio.run(WebhookDispatcher().run(args.interval))
+
+#PYTHONPATH=. python scripts/run_webhook_dispatcher.py [--once] [--interval 1]
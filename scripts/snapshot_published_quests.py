@@ -0,0 +1,45 @@
+from sqlalchemy import func, select, update
+
+from app.db.session import SessionLocal
+from app.models.enums import QuestStatus
+from app.models.models import Quest, QuestAssignment, QuestStep, QuestVersion
+from app.services.quest_service import build_version
+
+
+def snapshot_published():
+    # Опубликованные до версионирования квесты получают версию,
+    # их назначения закрепляются за ней (шаги те же, что и сейчас)
+    db = SessionLocal()
+    try:
+        quests = db.scalars(
+            select(Quest)
+            .where(Quest.status == QuestStatus.PUBLISHED, Quest.current_version_id.is_(None))
+            .with_for_update()
+        ).all()
+        for quest in quests:
+            steps = db.scalars(
+                select(QuestStep).where(QuestStep.quest_id == quest.id).order_by(QuestStep.sort_order)
+            ).all()
+            latest = db.scalar(select(func.max(QuestVersion.version)).where(QuestVersion.quest_id == quest.id))
+            version = build_version(quest, steps, (latest or 0) + 1)
+            db.add(version)
+            db.flush()
+            quest.current_version_id = version.id
+            quest.updated_at = version.published_at
+            db.execute(
+                update(QuestAssignment)
+                .where(QuestAssignment.quest_id == quest.id, QuestAssignment.quest_version_id.is_(None))
+                .values(quest_version_id=version.id)
+            )
+        db.commit()
+        print(f"✅ Создано версий квестов: {len(quests)}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка при создании версий: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    snapshot_published()
+
+#PYTHONPATH=. python scripts/snapshot_published_quests.py